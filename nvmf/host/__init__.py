@@ -21,3 +21,13 @@
 from .host import NVMFHost
 from .host_subsystem import NVMFHostController
 from .host_ns import NVMFHostNamespace
+from .host_fabrics import NVMFFabrics
+from .host_sysfs import NVMFSysfsIndex
+from .host_admin import NVMeAdmin
+from .host_admin import FakeAdminBackend
+from .host_smart import SmartSampler
+from .host_id_cache import IdentifyCache
+from .host_async import NVMFAsyncOrchestrator
+from .host_scheduler import NVMFWorkloadScheduler
+from .host_perf import NVMFPerfReport
+from .host_perf_history import NVMFPerfHistory
@@ -20,13 +20,21 @@
 """ Represents NVMe Over Fabric Host Subsystem.
 """
 
-import json
-import random
+import time
 from nose.tools import assert_equal
 
-from utils.shell import Cmd
+from utils.const import Const
 from utils.log import Log
+from utils.kmod import ModuleManager
+from utils.misc import Parallel
+from utils.misc import LatencyStats
+from utils.diskio import IOResultSet
 from nvmf.host.host_subsystem import NVMFHostController
+from nvmf.host.host_smart import SmartSampler
+from nvmf.host.host_async import NVMFAsyncOrchestrator
+from nvmf.host.host_scheduler import NVMFWorkloadScheduler
+from nvmf.host.host_perf import NVMFPerfReport
+from nvmf.target.target_model import TargetModel
 
 
 class NVMFHost(object):
@@ -37,11 +45,31 @@ class NVMFHost(object):
         - Attributes :
               - target_type : rdma/loop/fc. (only loop supported now)
               - ctrl_list : list of the host controllers.
+              - nr_workers : max concurrent controller operations.
+              - connect_stats : per controller connect latency.
+              - smart_sampler : background SMART counter sampler.
+              - io_mode : thread (per namespace jobs on the shared
+                          executor) or async (one asyncio loop).
+              - async_max_jobs : max concurrent jobs in async mode.
+              - async_ctrl_jobs : max concurrent jobs per controller in
+                                  async mode.
+              - orchestrator : asyncio orchestrator of the running IOs.
+              - scheduler : seeded workload scheduler of random IOs.
+              - perf_report : perf report of the last run_perf_parallel().
     """
-    def __init__(self, target_type):
+    def __init__(self, target_type, nr_workers=Const.HOST_NR_WORKERS):
         self.target_type = target_type
+        self.nr_workers = nr_workers
         self.ctrl_list = []
         self.ctrl_list_index = 0
+        self.connect_stats = LatencyStats("host connect")
+        self.smart_sampler = None
+        self.io_mode = Const.IO_MODE_THREAD
+        self.async_max_jobs = Const.HOST_ASYNC_MAX_JOBS
+        self.async_ctrl_jobs = Const.HOST_ASYNC_CTRL_JOBS
+        self.orchestrator = None
+        self.scheduler = NVMFWorkloadScheduler()
+        self.perf_report = None
         self.logger = Log.get_logger(__name__, 'host')
         assert_equal(self.load_modules(), True)
 
@@ -67,35 +95,72 @@ class NVMFHost(object):
             - Returns :
                 - True on success, False on failure.
         """
-        if Cmd.exec_cmd("modprobe nvme-fabrics") is False:
+        if ModuleManager.load("nvme_core") is False:
+            self.logger.error("unable to load nvme_core.")
+            return False
+        if ModuleManager.load("nvme-fabrics") is False:
             self.logger.error("unable to load nvme-fabrics.")
             return False
         return True
 
+    def connect_ctrl(self, ctrl):
+        """ Connect, identify and initialize one controller, account
+            its latency.
+            - Args :
+                - ctrl : host controller.
+            - Returns :
+                - True on success, False on failure.
+        """
+        start = time.monotonic()
+        ret = ctrl.init_ctrl()
+        ctrl.connect_latency = time.monotonic() - start
+        self.connect_stats.record(ctrl.connect_latency)
+        if ret is False:
+            self.logger.error("ctrl init " + ctrl.nqn + " " +
+                              str(ctrl.ctrl_dev) + ".")
+        return ret
+
     def config_loop(self, config_file):
         """ Configure host for loop target :-
-            1. Load config from json file.
-            2. Create Controller list.
+            1. Load shared config model of json file.
+            2. Create Controller list in config order, each controller
+               connects through one of the ports its subsystem is linked
+               to.
+            3. Connect and initialize controllers in parallel on
+               nr_workers threads, delete all of them if one fails.
             - Args :
                 - config_file : json config file.
             -Returns :
                 - True on success, False on failure.
         """
         try:
-            config_file_handle = open(config_file, "r")
-            config = json.loads(config_file_handle.read())
-            config_file_handle.close()
-        except Exception, err:
+            config = TargetModel.load(config_file)
+        except (IOError, ValueError, KeyError, TypeError) as err:
             self.logger.error(str(err) + ".")
             return False
 
-        for sscfg in config['subsystems']:
-            ctrl = NVMFHostController(sscfg['nqn'], "loop")
-            if ctrl.init_ctrl()is False:
-                self.logger.error("ctrl init " + str(ctrl.ctrl_dev) + ".")
-                return False
-            self.ctrl_list.append(ctrl)
-        return True
+        # spread controllers over the ports each subsystem is linked to
+        traddr_list = {}
+        for pcfg in config.ports:
+            for nqn in pcfg.subsystems:
+                traddr_list.setdefault(nqn, []).append(
+                    pcfg.addr['addr_traddr'])
+
+        for i, sscfg in enumerate(config.subsystems):
+            traddr = traddr_list.get(sscfg.nqn, [""])
+            nr_ns = len([nscfg for nscfg in sscfg.namespaces
+                         if nscfg.enable == '1'])
+            self.ctrl_list.append(
+                NVMFHostController(sscfg.nqn, "loop",
+                                   traddr[i % len(traddr)], nr_ns))
+
+        self.connect_stats.reset()
+        ret = Parallel.run(self.connect_ctrl, self.ctrl_list,
+                           self.nr_workers)
+        self.logger.info(self.connect_stats.report())
+        if ret is False:
+            self.delete()
+        return ret
 
     def run_traffic_parallel(self, iocfg):
         """ Run parallel IO traffic on all host controller(s) and
@@ -128,6 +193,62 @@ class NVMFHost(object):
 
         return ret
 
+    def set_io_mode(self, io_mode, max_jobs=Const.HOST_ASYNC_MAX_JOBS,
+                    ctrl_jobs=Const.HOST_ASYNC_CTRL_JOBS):
+        """ Select how parallel IOs are run.
+            - Args :
+                - io_mode : Const.IO_MODE_THREAD or Const.IO_MODE_ASYNC.
+                - max_jobs : max concurrent jobs in async mode.
+                - ctrl_jobs : max concurrent jobs per controller in async
+                              mode.
+            - Returns :
+                - True on success, False on failure.
+        """
+        if io_mode not in (Const.IO_MODE_THREAD, Const.IO_MODE_ASYNC):
+            self.logger.error("invalid io mode " + str(io_mode))
+            return False
+        self.io_mode = io_mode
+        self.async_max_jobs = max_jobs
+        self.async_ctrl_jobs = ctrl_jobs
+        return True
+
+    def run_traffic_async(self, iocfg, timeout=None, fail_fast=False):
+        """ Run IO traffic on all namespaces from one asyncio loop and
+            wait for completion.
+            - Args :
+                - iocfg : io configuration, dd/fio jobs run as
+                          subprocesses, iocfg['ASYNC'] coroutine function
+                          runs as a native job.
+                - timeout : seconds before remaining jobs are cancelled.
+                - fail_fast : cancel remaining jobs on first failure.
+            - Returns :
+                - True on success, False on failure.
+        """
+        jobs = NVMFAsyncOrchestrator.build_jobs(self.ctrl_list, iocfg)
+        if jobs is None:
+            return False
+        self.logger.info("Starting %d io jobs on one event loop ...",
+                         len(jobs))
+        self.orchestrator = NVMFAsyncOrchestrator(self.async_max_jobs,
+                                                  self.async_ctrl_jobs,
+                                                  timeout, fail_fast)
+        try:
+            return self.orchestrator.run(jobs)
+        finally:
+            self.orchestrator = None
+
+    def cancel_traffic_async(self):
+        """ Cancel IO traffic started by run_traffic_async(), running
+            dd/fio processes are killed.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        orchestrator = self.orchestrator
+        if orchestrator is not None:
+            orchestrator.cancel()
+
     def run_ios_parallel(self, iocfg):
         """ Run parallel IOs on all host controller(s) and
             wait for completion.
@@ -136,6 +257,9 @@ class NVMFHost(object):
             - Returns :
                 - None.
         """
+        if self.io_mode == Const.IO_MODE_ASYNC:
+            return self.run_traffic_async(iocfg)
+
         if self.run_traffic_parallel(iocfg) is False:
             return False
 
@@ -144,20 +268,81 @@ class NVMFHost(object):
 
         return True
 
-    def run_perf_parallel(self, iocfg):
+    def run_perf_parallel(self, iocfg, report_path=None):
         """ Run parallel IO traffic on all host controller(s) and
-            wait for completion.
+            wait for completion, log throughput and wall time of the run
+            and the perf report of the fio metrics.
             - Args :
                 - iocfg : io configuration.
+                - report_path : json perf report file, None to only log.
             - Returns :
-                - None.
+                - True on success, False on failure.
         """
-        if self.run_ios_parallel(iocfg) is False:
-            return False
+        sampler = self.smart_sampler
+        if sampler is None:
+            sampler = SmartSampler([ctrl.ctrl_dev for ctrl in self.ctrl_list],
+                                   0)
+        self.reset_io_results()
+        sampler.begin_phase("perf")
+        ret = self.run_ios_parallel(iocfg)
+        stats = sampler.end_phase("perf")
+        for ctrl in self.ctrl_list:
+            self.logger.debug(ctrl.io_results().report())
+        self.logger.info(self.io_results("perf").report())
+        self.perf_report = NVMFPerfReport.build("perf", self.ctrl_list)
+        if len(self.perf_report.rows):
+            self.logger.info(self.perf_report.table())
+            if report_path is not None:
+                self.perf_report.save(report_path)
+        if stats is not None:
+            self.logger.info(SmartSampler.report("perf", stats))
+        return ret
 
-        # add perf report generation mechanism here
+    def io_results(self, name="run"):
+        """ Result records of the IO jobs of all controllers.
+            - Args :
+                - name : aggregate name.
+            - Returns :
+                - IOResultSet of this host.
+        """
+        return IOResultSet.merge(name, [ctrl.io_results()
+                                        for ctrl in self.ctrl_list])
 
-        return True
+    def reset_io_results(self):
+        """ Drop result records of all controllers.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        for ctrl in self.ctrl_list:
+            ctrl.reset_io_results()
+
+    def start_smart_sampler(self, interval=Const.SMART_SAMPLE_INTERVAL,
+                            ring_size=Const.SMART_RING_SIZE):
+        """ Start sampling SMART counters of all controllers.
+            - Args :
+                - interval : seconds between samples.
+                - ring_size : samples kept per controller.
+            - Returns :
+                - SmartSampler object.
+        """
+        self.stop_smart_sampler()
+        self.smart_sampler = SmartSampler(
+            [ctrl.ctrl_dev for ctrl in self.ctrl_list], interval, ring_size)
+        self.smart_sampler.start()
+        return self.smart_sampler
+
+    def stop_smart_sampler(self):
+        """ Stop sampling SMART counters.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        if self.smart_sampler is not None:
+            self.smart_sampler.stop()
+            self.smart_sampler = None
 
     def run_ios_seq(self, iocfg):
         """ Run IOs on all host controllers sequentially.
@@ -177,25 +362,16 @@ class NVMFHost(object):
                 break
         return ret
 
-    def run_ios_random(self, iocfg):
-        """ Select a controller from the list of controllers
-            randomly and run IOs. Exhaust entire list.
+    def run_ios_random(self, iocfg, nr_ops=0):
+        """ Run IOs on controllers and namespaces picked by the workload
+            scheduler, keeping scheduler.nr_jobs jobs in flight.
             - Args :
                 - iocfg : io configuration.
+                - nr_ops : number of jobs, 0 for one per namespace.
             - Returns :
-                - None.
+                - True on success, False on failure.
         """
-        ctrl_list = range(0, len(self.ctrl_list))
-
-        ret = True
-        for i in range(0, len(self.ctrl_list)):
-            random.shuffle(ctrl_list)
-            ctrl_id = ctrl_list.pop()
-            ctrl = self.ctrl_list[ctrl_id]
-            if ctrl.run_io_random(iocfg) is False:
-                ret = False
-                break
-        return ret
+        return self.scheduler.run(self.ctrl_list, iocfg, nr_ops)
 
     def ctrl_rescan(self):
         """ Run controller_rescan on all host controllers sequentially.
@@ -352,14 +528,15 @@ class NVMFHost(object):
         return ret
 
     def delete(self):
-        """ Delete all the Host Controllers.
+        """ Delete all the Host Controllers in parallel on nr_workers
+            threads.
             - Args :
                 - None.
             - Returns :
                 - True on success, False on failure.
         """
-        ret = True
-        for subsys in iter(self):
-            if subsys.delete() is False:
-                ret = False
+        self.stop_smart_sampler()
+        ret = Parallel.run(lambda ctrl: ctrl.delete(), self.ctrl_list,
+                           self.nr_workers)
+        self.ctrl_list = []
         return ret
@@ -0,0 +1,373 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe admin command engine over ioctl.
+"""
+
+import os
+import errno
+import fcntl
+import struct
+import ctypes
+import threading
+
+from utils.const import Const
+from utils.log import Log
+from nvmf.host.host_admin_data import IdCtrl
+from nvmf.host.host_admin_data import IdNs
+from nvmf.host.host_admin_data import NSDescriptor
+from nvmf.host.host_admin_data import SmartLog
+
+
+class AdminCmd(object):
+
+    """
+    Represents struct nvme_admin_cmd passed to NVME_IOCTL_ADMIN_CMD.
+        - Attributes :
+            - FORMAT : struct layout, opcode, flags, rsvd1, nsid, cdw2,
+                       cdw3, metadata, addr, metadata_len, data_len,
+                       cdw10 - cdw15, timeout_ms, result.
+    """
+    FORMAT = struct.Struct("<BBHIIIQQII6III")
+
+    @staticmethod
+    def pack(opcode, nsid, addr, data_len, cdw10=0, cdw11=0):
+        """ Build admin command.
+            - Args :
+                - opcode : admin opcode.
+                - nsid : namespace id.
+                - addr : data buffer address.
+                - data_len : data buffer length.
+                - cdw10 : command dword 10.
+                - cdw11 : command dword 11.
+            - Returns :
+                - mutable command buffer.
+        """
+        return bytearray(AdminCmd.FORMAT.pack(opcode, 0, 0, nsid, 0, 0, 0,
+                                              addr, 0, data_len, cdw10,
+                                              cdw11, 0, 0, 0, 0, 0, 0))
+
+    @staticmethod
+    def unpack(cmd):
+        """ Decode admin command.
+            - Args :
+                - cmd : command buffer.
+            - Returns :
+                - tuple of command fields in FORMAT order.
+        """
+        return AdminCmd.FORMAT.unpack(bytes(cmd))
+
+
+class IoctlBackend(object):
+
+    """
+    Represents the kernel NVMe character and block device ioctl interface.
+    """
+
+    def open(self, dev):
+        """ Open NVMe device.
+            - Args :
+                - dev : device path.
+            - Returns :
+                - file descriptor.
+        """
+        return os.open(dev, os.O_RDONLY | os.O_CLOEXEC)
+
+    def close(self, fd):
+        """ Close NVMe device.
+            - Args :
+                - fd : file descriptor.
+            - Returns :
+                - None.
+        """
+        os.close(fd)
+
+    def ioctl(self, fd, request, arg=None):
+        """ Issue ioctl.
+            - Args :
+                - fd : file descriptor.
+                - request : ioctl request.
+                - arg : mutable argument buffer, None for no argument.
+            - Returns :
+                - ioctl return value, NVMe status for admin commands.
+        """
+        if arg is None:
+            return fcntl.ioctl(fd, request)
+        return fcntl.ioctl(fd, request, arg, True)
+
+
+class FakeAdminBackend(object):
+
+    """
+    Represents a pure Python NVMe device backend for tests. It decodes the
+    admin command buffer the way the kernel does and copies the data of
+    the addressed page into the command data buffer.
+        - Attributes :
+            - devices : device path to (nsid, pages).
+            - fds : open file descriptor to device path.
+            - commands : list of (device, opcode, nsid, cdw10) issued.
+            - lock : protects fds and commands.
+    """
+
+    def __init__(self):
+        self.devices = {}
+        self.fds = {}
+        self.next_fd = 1000
+        self.commands = []
+        self.lock = threading.Lock()
+
+    def add_device(self, dev, nsid=None):
+        """ Add fake controller or namespace device.
+            - Args :
+                - dev : device path.
+                - nsid : namespace id of block device, None for controller.
+            - Returns :
+                - None.
+        """
+        self.devices[dev] = (nsid, {})
+
+    def add_page(self, dev, opcode, cns, nsid, data):
+        """ Add data returned by identify or get log page.
+            - Args :
+                - dev : device path.
+                - opcode : admin opcode.
+                - cns : identify CNS or log page id.
+                - nsid : namespace id of the command.
+                - data : page bytes.
+            - Returns :
+                - None.
+        """
+        self.devices[dev][1][(opcode, cns, nsid)] = bytes(data)
+
+    def open(self, dev):
+        """ Open fake device.
+            - Args :
+                - dev : device path.
+            - Returns :
+                - fake file descriptor.
+        """
+        if dev not in self.devices:
+            raise OSError(errno.ENOENT, os.strerror(errno.ENOENT), dev)
+        with self.lock:
+            fd = self.next_fd
+            self.next_fd += 1
+            self.fds[fd] = dev
+        return fd
+
+    def close(self, fd):
+        """ Close fake device.
+            - Args :
+                - fd : fake file descriptor.
+            - Returns :
+                - None.
+        """
+        with self.lock:
+            del self.fds[fd]
+
+    def ioctl(self, fd, request, arg=None):
+        """ Emulate NVME_IOCTL_ID and NVME_IOCTL_ADMIN_CMD.
+            - Args :
+                - fd : fake file descriptor.
+                - request : ioctl request.
+                - arg : admin command buffer.
+            - Returns :
+                - namespace id or NVMe status.
+        """
+        dev = self.fds[fd]
+        nsid, pages = self.devices[dev]
+        if request == Const.NVME_IOCTL_ID:
+            if nsid is None:
+                raise OSError(errno.ENOTTY, os.strerror(errno.ENOTTY), dev)
+            return nsid
+        if request != Const.NVME_IOCTL_ADMIN_CMD:
+            raise OSError(errno.ENOTTY, os.strerror(errno.ENOTTY), dev)
+
+        fields = AdminCmd.unpack(arg)
+        opcode, cmd_nsid, addr, data_len, cdw10 = \
+            fields[0], fields[3], fields[7], fields[9], fields[10]
+        with self.lock:
+            self.commands.append((dev, opcode, cmd_nsid, cdw10))
+        if opcode == Const.NVME_ADMIN_GET_LOG_PAGE:
+            # numd is a zero based dword count
+            data_len = min(data_len, ((cdw10 >> 16) + 1) * 4)
+        data = pages.get((opcode, cdw10 & 0xff, cmd_nsid))
+        if data is None:
+            return Const.NVME_SC_INVALID_FIELD
+        ctypes.memmove(addr, data, min(len(data), data_len))
+        return 0
+
+
+class NVMeAdmin(object):
+
+    """
+    Represents NVMe admin commands issued in process through ioctl on a
+    controller character device or namespace block device, decoded into
+    typed structures.
+        - Attributes :
+            - dev : device path.
+            - status : NVMe status of the last command, None on ioctl
+                       failure.
+            - backend : shared ioctl backend.
+    """
+    backend = IoctlBackend()
+
+    def __init__(self, dev):
+        self.dev = dev
+        self.status = None
+        self.logger = Log.get_logger(__name__, 'host_admin')
+
+    @staticmethod
+    def set_backend(backend):
+        """ Replace shared backend, e.g. with FakeAdminBackend in tests.
+            - Args :
+                - backend : ioctl backend, None for the kernel interface.
+            - Returns :
+                - None.
+        """
+        NVMeAdmin.backend = IoctlBackend() if backend is None else backend
+
+    def ioctl(self, request, arg=None):
+        """ Open device, issue ioctl and close it.
+            - Args :
+                - request : ioctl request.
+                - arg : mutable argument buffer.
+            - Returns :
+                - ioctl return value, None on failure.
+        """
+        backend = NVMeAdmin.backend
+        try:
+            fd = backend.open(self.dev)
+            try:
+                return backend.ioctl(fd, request, arg)
+            finally:
+                backend.close(fd)
+        except (IOError, OSError) as err:
+            self.logger.error(self.dev + " ioctl " + hex(request) + " : " +
+                              str(err) + ".")
+            return None
+
+    def submit(self, opcode, nsid, data_len, cdw10=0, cdw11=0):
+        """ Submit admin command with a data buffer.
+            - Args :
+                - opcode : admin opcode.
+                - nsid : namespace id.
+                - data_len : data buffer length.
+                - cdw10 : command dword 10.
+                - cdw11 : command dword 11.
+            - Returns :
+                - data bytes on success, None on failure.
+        """
+        buf = ctypes.create_string_buffer(data_len)
+        cmd = AdminCmd.pack(opcode, nsid, ctypes.addressof(buf), data_len,
+                            cdw10, cdw11)
+        self.status = self.ioctl(Const.NVME_IOCTL_ADMIN_CMD, cmd)
+        if self.status is None:
+            return None
+        if self.status != 0:
+            self.logger.error(self.dev + " admin opcode " + hex(opcode) +
+                              " status " + hex(self.status) + ".")
+            return None
+        return buf.raw
+
+    def identify(self, cns, nsid=0):
+        """ Issue identify command.
+            - Args :
+                - cns : controller or namespace structure.
+                - nsid : namespace id.
+            - Returns :
+                - identify data on success, None on failure.
+        """
+        return self.submit(Const.NVME_ADMIN_IDENTIFY, nsid, IdCtrl.SIZE, cns)
+
+    def get_log_page(self, lid, nsid, size):
+        """ Issue get log page command.
+            - Args :
+                - lid : log page id.
+                - nsid : namespace id.
+                - size : log page size, multiple of 4.
+            - Returns :
+                - log page on success, None on failure.
+        """
+        numd = size // 4 - 1
+        return self.submit(Const.NVME_ADMIN_GET_LOG_PAGE, nsid, size,
+                           lid | ((numd & 0xffff) << 16), numd >> 16)
+
+    def nsid(self):
+        """ Namespace id of namespace block device.
+            - Args :
+                - None.
+            - Returns :
+                - namespace id on success, None on failure.
+        """
+        return self.ioctl(Const.NVME_IOCTL_ID)
+
+    def identify_ctrl(self):
+        """ Identify controller.
+            - Args :
+                - None.
+            - Returns :
+                - IdCtrl object on success, None on failure.
+        """
+        data = self.identify(Const.NVME_ID_CNS_CTRL)
+        return None if data is None else IdCtrl.decode(data)
+
+    def ns_or_own(self, nsid):
+        """ Namespace id to address, namespace of device if None.
+            - Args :
+                - nsid : namespace id or None.
+            - Returns :
+                - namespace id, None on failure.
+        """
+        return self.nsid() if nsid is None else nsid
+
+    def identify_ns(self, nsid=None):
+        """ Identify namespace.
+            - Args :
+                - nsid : namespace id, None for the device namespace.
+            - Returns :
+                - IdNs object on success, None on failure.
+        """
+        nsid = self.ns_or_own(nsid)
+        if nsid is None:
+            return None
+        data = self.identify(Const.NVME_ID_CNS_NS, nsid)
+        return None if data is None else IdNs.decode(data)
+
+    def ns_descs(self, nsid=None):
+        """ Namespace identification descriptor list.
+            - Args :
+                - nsid : namespace id, None for the device namespace.
+            - Returns :
+                - list of NSDescriptor objects on success, None on failure.
+        """
+        nsid = self.ns_or_own(nsid)
+        if nsid is None:
+            return None
+        data = self.identify(Const.NVME_ID_CNS_NS_DESC_LIST, nsid)
+        return None if data is None else NSDescriptor.decode_list(data)
+
+    def smart_log(self, nsid=Const.NVME_NSID_ALL):
+        """ SMART / Health Information log page.
+            - Args :
+                - nsid : namespace id, all namespaces by default.
+            - Returns :
+                - SmartLog object on success, None on failure.
+        """
+        data = self.get_log_page(Const.NVME_LOG_SMART, nsid, SmartLog.SIZE)
+        return None if data is None else SmartLog.decode(data)
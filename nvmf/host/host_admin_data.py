@@ -0,0 +1,309 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe admin command data structures.
+"""
+
+
+class AdminData(object):
+
+    """
+    Represents an admin command data structure decoded from its little
+    endian layout. Subclasses describe the layout in FIELDS.
+        - Attributes :
+            - FIELDS : list of (name, offset, size, kind), kind is 'u' for
+                       unsigned integer, 's' for space padded ASCII string
+                       and 'b' for raw bytes.
+            - SIZE : structure size in bytes.
+    """
+    FIELDS = []
+    SIZE = 0
+    __slots__ = []
+
+    @staticmethod
+    def decode_field(data, offset, size, kind):
+        """ Decode one field.
+            - Args :
+                - data : structure bytes.
+                - offset : field offset.
+                - size : field size.
+                - kind : field kind.
+            - Returns :
+                - decoded value.
+        """
+        raw = bytes(data[offset:offset + size])
+        if kind == 'u':
+            return int.from_bytes(raw, 'little')
+        if kind == 's':
+            return raw.decode('ascii', 'replace').rstrip(' \0')
+        return raw
+
+    @staticmethod
+    def encode_field(buf, offset, size, kind, value):
+        """ Encode one field.
+            - Args :
+                - buf : structure bytearray.
+                - offset : field offset.
+                - size : field size.
+                - kind : field kind.
+                - value : field value.
+            - Returns :
+                - None.
+        """
+        if kind == 'u':
+            raw = int(value).to_bytes(size, 'little')
+        elif kind == 's':
+            raw = value.encode('ascii').ljust(size, b' ')
+        else:
+            raw = bytes(value).ljust(size, b'\0')
+        buf[offset:offset + size] = raw[:size]
+
+    @classmethod
+    def decode(cls, data):
+        """ Decode structure.
+            - Args :
+                - data : structure bytes, at least SIZE long.
+            - Returns :
+                - decoded object, None if data is too short.
+        """
+        if len(data) < cls.SIZE:
+            return None
+        obj = cls.__new__(cls)
+        for name, offset, size, kind in cls.FIELDS:
+            setattr(obj, name,
+                    AdminData.decode_field(data, offset, size, kind))
+        return obj
+
+    @classmethod
+    def encode(cls, **values):
+        """ Encode structure, e.g. to build fake device data.
+            - Args :
+                - values : field values, missing fields are zero.
+            - Returns :
+                - structure bytes.
+        """
+        buf = bytearray(cls.SIZE)
+        for name, offset, size, kind in cls.FIELDS:
+            if name in values:
+                AdminData.encode_field(buf, offset, size, kind,
+                                       values[name])
+        return bytes(buf)
+
+    def to_dict(self):
+        """ Field name to value dictionary.
+            - Args :
+                - None.
+            - Returns :
+                - dictionary of decoded fields.
+        """
+        return dict((field[0], getattr(self, field[0]))
+                    for field in self.FIELDS)
+
+
+def slots(fields):
+    """ Slot names of field layout """
+    return [field[0] for field in fields]
+
+
+class IdCtrl(AdminData):
+
+    """
+    Represents Identify Controller data (CNS 01h).
+    """
+    FIELDS = [('vid', 0, 2, 'u'), ('ssvid', 2, 2, 'u'),
+              ('sn', 4, 20, 's'), ('mn', 24, 40, 's'), ('fr', 64, 8, 's'),
+              ('rab', 72, 1, 'u'), ('ieee', 73, 3, 'b'),
+              ('cmic', 76, 1, 'u'), ('mdts', 77, 1, 'u'),
+              ('cntlid', 78, 2, 'u'), ('ver', 80, 4, 'u'),
+              ('rtd3r', 84, 4, 'u'), ('rtd3e', 88, 4, 'u'),
+              ('oaes', 92, 4, 'u'), ('ctratt', 96, 4, 'u'),
+              ('oacs', 256, 2, 'u'), ('acl', 258, 1, 'u'),
+              ('aerl', 259, 1, 'u'), ('frmw', 260, 1, 'u'),
+              ('lpa', 261, 1, 'u'), ('elpe', 262, 1, 'u'),
+              ('npss', 263, 1, 'u'), ('sqes', 512, 1, 'u'),
+              ('cqes', 513, 1, 'u'), ('maxcmd', 514, 2, 'u'),
+              ('nn', 516, 4, 'u'), ('oncs', 520, 2, 'u'),
+              ('fuses', 522, 2, 'u'), ('fna', 524, 1, 'u'),
+              ('vwc', 525, 1, 'u'), ('awun', 526, 2, 'u'),
+              ('awupf', 528, 2, 'u'), ('sgls', 536, 4, 'u'),
+              ('subnqn', 768, 256, 's'), ('ioccsz', 1792, 4, 'u'),
+              ('iorcsz', 1796, 4, 'u'), ('icdoff', 1800, 2, 'u'),
+              ('ctrattr', 1802, 1, 'u'), ('msdbd', 1803, 1, 'u')]
+    SIZE = 4096
+    __slots__ = slots(FIELDS)
+
+
+class IdNs(AdminData):
+
+    """
+    Represents Identify Namespace data (CNS 00h).
+        - Attributes :
+            - lbaf : list of (ms, lbads, rp) LBA formats.
+    """
+    FIELDS = [('nsze', 0, 8, 'u'), ('ncap', 8, 8, 'u'),
+              ('nuse', 16, 8, 'u'), ('nsfeat', 24, 1, 'u'),
+              ('nlbaf', 25, 1, 'u'), ('flbas', 26, 1, 'u'),
+              ('mc', 27, 1, 'u'), ('dpc', 28, 1, 'u'), ('dps', 29, 1, 'u'),
+              ('nmic', 30, 1, 'u'), ('rescap', 31, 1, 'u'),
+              ('nguid', 104, 16, 'b'), ('eui64', 120, 8, 'b')]
+    LBAF_OFFSET = 128
+    NR_LBAF = 16
+    SIZE = 4096
+    __slots__ = slots(FIELDS) + ['lbaf']
+
+    @classmethod
+    def decode(cls, data):
+        """ Decode identify namespace data and its LBA formats.
+            - Args :
+                - data : structure bytes.
+            - Returns :
+                - IdNs object, None if data is too short.
+        """
+        obj = super(IdNs, cls).decode(data)
+        if obj is None:
+            return None
+        obj.lbaf = []
+        for i in range(obj.nlbaf + 1):
+            offset = IdNs.LBAF_OFFSET + i * 4
+            obj.lbaf.append((AdminData.decode_field(data, offset, 2, 'u'),
+                             data[offset + 2], data[offset + 3] & 0x3))
+        return obj
+
+    @classmethod
+    def encode(cls, lbaf=((0, 9, 0),), **values):
+        """ Encode identify namespace data.
+            - Args :
+                - lbaf : list of (ms, lbads, rp) LBA formats.
+                - values : field values, missing fields are zero.
+            - Returns :
+                - structure bytes.
+        """
+        values.setdefault('nlbaf', len(lbaf) - 1)
+        buf = bytearray(super(IdNs, cls).encode(**values))
+        for i, (ms, lbads, rp) in enumerate(lbaf):
+            offset = IdNs.LBAF_OFFSET + i * 4
+            buf[offset:offset + 4] = bytes([ms & 0xff, ms >> 8, lbads, rp])
+        return bytes(buf)
+
+    def lba_size(self):
+        """ Size of the formatted LBA.
+            - Args :
+                - None.
+            - Returns :
+                - LBA size in bytes.
+        """
+        return 1 << self.lbaf[self.flbas & 0xf][1]
+
+    def to_dict(self):
+        """ Field name to value dictionary including LBA formats.
+            - Args :
+                - None.
+            - Returns :
+                - dictionary of decoded fields.
+        """
+        ret = super(IdNs, self).to_dict()
+        ret['lbaf'] = list(self.lbaf)
+        return ret
+
+
+class NSDescriptor(object):
+
+    """
+    Represents one Namespace Identification Descriptor (CNS 03h).
+        - Attributes :
+            - nidt : namespace identifier type.
+            - nid : namespace identifier bytes.
+    """
+    TYPES = {1: 'eui64', 2: 'nguid', 3: 'uuid', 4: 'csi'}
+    HEADER_SIZE = 4
+    SIZE = 4096
+    __slots__ = ['nidt', 'nid']
+
+    def __init__(self, nidt, nid):
+        self.nidt = nidt
+        self.nid = nid
+
+    def type_name(self):
+        """ Namespace identifier type name.
+            - Args :
+                - None.
+            - Returns :
+                - type name, "nidt<N>" for unknown types.
+        """
+        return NSDescriptor.TYPES.get(self.nidt, "nidt" + str(self.nidt))
+
+    def __str__(self):
+        return self.type_name() + " : " + self.nid.hex()
+
+    @staticmethod
+    def decode_list(data):
+        """ Decode descriptor list, it ends at the first zero type.
+            - Args :
+                - data : descriptor list bytes.
+            - Returns :
+                - list of NSDescriptor objects.
+        """
+        desc_list = []
+        offset = 0
+        while offset + NSDescriptor.HEADER_SIZE <= len(data):
+            nidt, nidl = data[offset], data[offset + 1]
+            if nidt == 0:
+                break
+            offset += NSDescriptor.HEADER_SIZE
+            desc_list.append(NSDescriptor(nidt,
+                                          bytes(data[offset:offset + nidl])))
+            offset += nidl
+        return desc_list
+
+    @staticmethod
+    def encode_list(desc_list):
+        """ Encode descriptor list.
+            - Args :
+                - desc_list : list of NSDescriptor objects.
+            - Returns :
+                - descriptor list bytes.
+        """
+        buf = bytearray()
+        for desc in desc_list:
+            buf += bytes([desc.nidt, len(desc.nid), 0, 0]) + desc.nid
+        return bytes(buf.ljust(NSDescriptor.SIZE, b'\0'))
+
+
+class SmartLog(AdminData):
+
+    """
+    Represents SMART / Health Information log page (LID 02h).
+    """
+    FIELDS = [('critical_warning', 0, 1, 'u'), ('temperature', 1, 2, 'u'),
+              ('avail_spare', 3, 1, 'u'), ('spare_thresh', 4, 1, 'u'),
+              ('percent_used', 5, 1, 'u'),
+              ('data_units_read', 32, 16, 'u'),
+              ('data_units_written', 48, 16, 'u'),
+              ('host_read_commands', 64, 16, 'u'),
+              ('host_write_commands', 80, 16, 'u'),
+              ('ctrl_busy_time', 96, 16, 'u'),
+              ('power_cycles', 112, 16, 'u'),
+              ('power_on_hours', 128, 16, 'u'),
+              ('unsafe_shutdowns', 144, 16, 'u'),
+              ('media_errors', 160, 16, 'u'),
+              ('num_err_log_entries', 176, 16, 'u'),
+              ('warning_temp_time', 192, 4, 'u'),
+              ('critical_comp_time', 196, 4, 'u')]
+    SIZE = 512
+    __slots__ = slots(FIELDS)
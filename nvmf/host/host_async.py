@@ -0,0 +1,272 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric host asyncio IO orchestration.
+"""
+
+import os
+import asyncio
+import threading
+
+from utils.const import Const
+from utils.log import Log
+from utils.diskio import DD
+from utils.diskio import FIO
+from utils.diskio import IOResult
+
+
+class AsyncIOJob(object):
+
+    """
+    Represents one IO job of a namespace.
+        - Attributes :
+            - ctrl_dev : controller device, key of the controller limit.
+            - ns_dev : namespace device, jobs of one namespace run in order.
+            - iocfg : io configuration bound to ns_dev.
+            - results : IOResultSet the job result is added to, or None.
+            - result : IOResult of the dd/fio process or returned by a
+                       native job, None otherwise.
+            - rc : exit code of the dd/fio process, None for native jobs.
+            - ret : True on success, False on failure, None if not run.
+    """
+    def __init__(self, ctrl_dev, ns_dev, iocfg, results=None):
+        self.ctrl_dev = ctrl_dev
+        self.ns_dev = ns_dev
+        self.iocfg = iocfg
+        self.results = results
+        self.result = None
+        self.rc = None
+        self.ret = None
+
+
+class NVMFAsyncOrchestrator(object):
+
+    """
+    Represents asyncio based IO orchestrator, dd/fio jobs run as asyncio
+    subprocesses and native jobs (iocfg['ASYNC'] coroutine function) run
+    as tasks of one event loop, no thread is used per namespace. Process
+    exit is awaited through a pidfd and reaped with os.wait4() so each
+    job records its resource usage.
+        - Attributes :
+            - TOOLS : IO type to dd/fio wrapper.
+            - max_jobs : maximum number of jobs running at once.
+            - ctrl_jobs : maximum number of jobs running on one controller.
+            - timeout : seconds after which running jobs are cancelled,
+                        None waits forever.
+            - fail_fast : cancel remaining jobs on first failure.
+            - loop : event loop while jobs run.
+            - tasks : job tasks of the current run.
+            - cancelled : cancel() was called.
+            - lock : protects loop and cancelled.
+    """
+    TOOLS = {'dd': DD, 'fio': FIO}
+
+    def __init__(self, max_jobs=Const.HOST_ASYNC_MAX_JOBS,
+                 ctrl_jobs=Const.HOST_ASYNC_CTRL_JOBS, timeout=None,
+                 fail_fast=False):
+        self.max_jobs = max_jobs
+        self.ctrl_jobs = ctrl_jobs
+        self.timeout = timeout
+        self.fail_fast = fail_fast
+        self.loop = None
+        self.tasks = []
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self.logger = Log.get_logger(__name__, 'host')
+
+    @staticmethod
+    def build_jobs(ctrl_list, iocfg):
+        """ Build one job per namespace of each controller.
+            - Args :
+                - ctrl_list : list of host controllers.
+                - iocfg : io configuration.
+            - Returns :
+                - list of AsyncIOJob on success, None on failure.
+        """
+        jobs = []
+        for ctrl in ctrl_list:
+            for host_ns in ctrl.ns_list:
+                ns_iocfg = host_ns.bind_iocfg(iocfg)
+                if ns_iocfg is None:
+                    return None
+                jobs.append(AsyncIOJob(ctrl.ctrl_dev, host_ns.ns_dev,
+                                       ns_iocfg, host_ns.io_results))
+        return jobs
+
+    @staticmethod
+    async def wait_child(pid):
+        """ Wait for child exit without blocking the loop.
+            - Args :
+                - pid : child process id.
+            - Returns :
+                - wait status and resource usage of the reaped child.
+        """
+        if not hasattr(os, 'pidfd_open'):
+            while True:
+                ret = os.wait4(pid, os.WNOHANG)
+                if ret[0] == pid:
+                    return ret[1:]
+                await asyncio.sleep(Const.HOST_ASYNC_POLL_INTERVAL)
+        loop = asyncio.get_running_loop()
+        exited = loop.create_future()
+        pidfd = os.pidfd_open(pid)
+        loop.add_reader(pidfd, lambda: exited.done() or
+                        exited.set_result(None))
+        try:
+            await exited
+        finally:
+            loop.remove_reader(pidfd)
+            os.close(pidfd)
+        return os.wait4(pid, 0)[1:]
+
+    async def run_cmd(self, job):
+        """ Run dd/fio job as a subprocess, the process is killed if the
+            job is cancelled.
+            - Args :
+                - job : AsyncIOJob object.
+            - Returns :
+                - process exit code.
+        """
+        tool = NVMFAsyncOrchestrator.TOOLS[job.iocfg['IO_TYPE']]
+        job.result = tool.new_result(job.iocfg)
+        proc = job.result.spawn(tool.build_cmd(job.iocfg), tool.CAPTURE)
+        try:
+            status, rusage = await self.wait_child(proc.pid)
+        except asyncio.CancelledError:
+            proc.kill()
+            status, rusage = os.wait4(proc.pid, 0)[1:]
+            job.result.finish(proc, status, rusage, tool.parse_output)
+            raise
+        job.result.finish(proc, status, rusage, tool.parse_output)
+        return job.result.rc
+
+    async def run_job(self, job, job_sem, ctrl_sem, ns_lock):
+        """ Run job once its namespace, controller and global slots are
+            free.
+            - Args :
+                - job : AsyncIOJob object.
+                - job_sem : global job semaphore.
+                - ctrl_sem : semaphore of the job controller.
+                - ns_lock : lock of the job namespace.
+            - Returns :
+                - True on success, False on failure.
+        """
+        # namespace first so queued jobs of one namespace hold no slot
+        try:
+            async with ns_lock, ctrl_sem, job_sem:
+                if 'ASYNC' in job.iocfg:
+                    ret = await job.iocfg['ASYNC'](job.iocfg)
+                    if isinstance(ret, IOResult):
+                        job.result, ret = ret, ret.ok
+                    job.ret = ret is True
+                else:
+                    job.rc = await self.run_cmd(job)
+                    job.ret = job.result.ok
+        finally:
+            # killed jobs are recorded too
+            if job.result is not None and job.results is not None:
+                job.results.add(job.result)
+        if job.ret is False:
+            self.logger.error("%s io on %s failed, rc %s",
+                              job.iocfg['IO_TYPE'], job.ns_dev, job.rc)
+            if self.fail_fast:
+                self.cancel_tasks()
+        return job.ret
+
+    def cancel_tasks(self):
+        """ Cancel all unfinished job tasks, called from the loop.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        for task in self.tasks:
+            task.cancel()
+
+    def cancel(self):
+        """ Cancel the current run, safe to call from any thread.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        with self.lock:
+            self.cancelled = True
+            loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.cancel_tasks)
+
+    async def run_all(self, jobs):
+        """ Run all jobs on the running loop and wait for completion.
+            - Args :
+                - jobs : list of AsyncIOJob.
+            - Returns :
+                - True if all jobs succeeded, False otherwise.
+        """
+        with self.lock:
+            self.loop = asyncio.get_running_loop()
+            cancelled = self.cancelled
+        job_sem = asyncio.Semaphore(self.max_jobs)
+        ctrl_sems = {}
+        ns_locks = {}
+        self.tasks = []
+        for job in jobs:
+            if job.ctrl_dev not in ctrl_sems:
+                ctrl_sems[job.ctrl_dev] = asyncio.Semaphore(self.ctrl_jobs)
+            if job.ns_dev not in ns_locks:
+                ns_locks[job.ns_dev] = asyncio.Lock()
+            self.tasks.append(asyncio.ensure_future(
+                self.run_job(job, job_sem, ctrl_sems[job.ctrl_dev],
+                             ns_locks[job.ns_dev])))
+        if cancelled:
+            self.cancel_tasks()
+        try:
+            if self.tasks:
+                pending = (await asyncio.wait(self.tasks,
+                                              timeout=self.timeout))[1]
+                if pending:
+                    self.logger.error(str(len(pending)) + " io jobs timed "
+                                      "out after " + str(self.timeout) + " s.")
+                    self.cancel_tasks()
+                    await asyncio.wait(pending)
+        finally:
+            with self.lock:
+                self.loop = None
+
+        ret = True
+        for task in self.tasks:
+            if task.cancelled():
+                ret = False
+            elif task.exception() is not None:
+                self.logger.error("io job raised " + repr(task.exception()))
+                ret = False
+            elif task.result() is not True:
+                ret = False
+        return ret
+
+    def run(self, jobs):
+        """ Run all jobs on a new event loop and wait for completion.
+            - Args :
+                - jobs : list of AsyncIOJob.
+            - Returns :
+                - True if all jobs succeeded, False otherwise.
+        """
+        with self.lock:
+            self.cancelled = False
+        return asyncio.run(self.run_all(jobs))
@@ -0,0 +1,98 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric host fabrics device.
+"""
+
+import os
+
+from utils.const import Const
+
+
+class NVMFFabrics(object):
+
+    """
+    Represents the /dev/nvme-fabrics misc device. A connect writes the
+    options to the device, the kernel creates the controller synchronously
+    and answers the read on the same file descriptor with
+    "instance=N,cntlid=M", which names the new controller /dev/nvmeN.
+        - Attributes :
+            - fabrics_dev : fabrics device path.
+    """
+
+    fabrics_dev = Const.NVME_FABRICS_DEV
+
+    @staticmethod
+    def parse_reply(reply):
+        """ Parse connect reply of fabrics device.
+            - Args :
+                - reply : "instance=N,cntlid=M" string.
+            - Returns :
+                - dictionary of reply fields with integer values, None if
+                  reply is invalid or has no instance.
+        """
+        fields = {}
+        for field in reply.strip().split(","):
+            key, sep, val = field.partition("=")
+            if sep == "" or not val.strip().isdigit():
+                return None
+            fields[key.strip()] = int(val)
+        if "instance" not in fields:
+            return None
+        return fields
+
+    @staticmethod
+    def connect(options):
+        """ Connect fabric controller and read back its identity.
+            - Args :
+                - options : comma separated connect options.
+            - Returns :
+                - dictionary with "instance" and "cntlid", None on invalid
+                  reply. OSError from the device is passed to the caller.
+        """
+        fd = os.open(NVMFFabrics.fabrics_dev, os.O_RDWR | os.O_CLOEXEC)
+        try:
+            os.write(fd, options.encode())
+            reply = os.read(fd, Const.NVME_FABRICS_REPLY_SIZE)
+        finally:
+            os.close(fd)
+        return NVMFFabrics.parse_reply(reply.decode())
+
+    @staticmethod
+    def ctrl_name(reply):
+        """ Controller name for connect reply.
+            - Args :
+                - reply : parsed connect reply.
+            - Returns :
+                - controller name (nvmeN).
+        """
+        return "nvme" + str(reply["instance"])
+
+    @staticmethod
+    def disconnect(ctrl, sysfs_ctl=Const.SYSFS_NVME_FABRICS_CTL):
+        """ Disconnect single fabric controller.
+            - Args :
+                - ctrl : controller name (nvmeN).
+                - sysfs_ctl : sysfs fabrics controller class directory.
+            - Returns :
+                - None. OSError is passed to the caller.
+        """
+        with open(sysfs_ctl + ctrl + "/delete_controller",
+                  "w") as delete_file:
+            delete_file.write("1")
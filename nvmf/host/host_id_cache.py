@@ -0,0 +1,189 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric host identify data cache.
+"""
+
+import re
+import os
+import threading
+
+from utils.uevent import UEventMonitor
+
+
+class IdentifyCache(object):
+
+    """
+    Represents process wide cache of decoded identify data keyed by
+    controller instance (nvmeN), namespace device name (None for
+    controller data) and CNS. Every controller has a generation, entries
+    of an older generation are never returned. Reset, rescan and delete of
+    a controller, controller change uevents and uevent overruns bump the
+    generation, namespace uevents drop the entries of that namespace.
+        - Attributes :
+            - entries : (ctrl, ns, cns) to (generation, data).
+            - generations : controller to generation.
+            - hits : number of lookups served from the cache.
+            - misses : number of lookups which issued the command.
+            - listening : uevent listener is registered.
+            - lock : protects all attributes.
+    """
+    DEV_PAT = re.compile("^(nvme[0-9]+)(c[0-9]+)?(n[0-9]+)?$")
+
+    entries = {}
+    generations = {}
+    hits = 0
+    misses = 0
+    listening = False
+    lock = threading.Lock()
+
+    @staticmethod
+    def split(dev):
+        """ Split device into controller and namespace name.
+            - Args :
+                - dev : device path or name, e.g. /dev/nvme1n2.
+            - Returns :
+                - (controller, namespace name or None), None if dev is not
+                  a NVMe device.
+        """
+        name = os.path.basename(dev)
+        match = IdentifyCache.DEV_PAT.match(name)
+        if match is None:
+            return None
+        return match.group(1), name if match.group(3) else None
+
+    @staticmethod
+    def get(ctrl, ns, cns, loader):
+        """ Cached identify data, load it on miss.
+            - Args :
+                - ctrl : controller name.
+                - ns : namespace device name, None for controller data.
+                - cns : identify CNS.
+                - loader : function issuing the command, returns None on
+                           failure which is not cached.
+            - Returns :
+                - identify data, None on failure.
+        """
+        key = (ctrl, ns, cns)
+        with IdentifyCache.lock:
+            generation = IdentifyCache.generations.get(ctrl, 0)
+            entry = IdentifyCache.entries.get(key)
+            if entry is not None and entry[0] == generation:
+                IdentifyCache.hits += 1
+                return entry[1]
+            IdentifyCache.misses += 1
+
+        data = loader()
+        if data is not None:
+            with IdentifyCache.lock:
+                # don't store data read across an invalidation
+                if IdentifyCache.generations.get(ctrl, 0) == generation:
+                    IdentifyCache.entries[key] = (generation, data)
+        return data
+
+    @staticmethod
+    def invalidate(ctrl=None):
+        """ Invalidate identify data of controller and its namespaces.
+            - Args :
+                - ctrl : controller name, None for all controllers.
+            - Returns :
+                - None.
+        """
+        with IdentifyCache.lock:
+            if ctrl is None:
+                ctrl_list = set(key[0] for key in IdentifyCache.entries)
+                ctrl_list.update(IdentifyCache.generations)
+            else:
+                ctrl_list = [ctrl]
+            for name in ctrl_list:
+                IdentifyCache.generations[name] = \
+                    IdentifyCache.generations.get(name, 0) + 1
+            IdentifyCache.entries = dict(
+                (key, entry) for key, entry in IdentifyCache.entries.items()
+                if key[0] not in ctrl_list)
+
+    @staticmethod
+    def invalidate_ns(ctrl, ns):
+        """ Invalidate identify data of one namespace.
+            - Args :
+                - ctrl : controller name.
+                - ns : namespace device name.
+            - Returns :
+                - None.
+        """
+        with IdentifyCache.lock:
+            for key in [key for key in IdentifyCache.entries
+                        if key[0] == ctrl and key[1] == ns]:
+                del IdentifyCache.entries[key]
+
+    @staticmethod
+    def on_uevent(event):
+        """ Invalidate identify data on controller and namespace uevents.
+            - Args :
+                - event : UEvent object.
+            - Returns :
+                - None.
+        """
+        if event.action == "overrun":
+            IdentifyCache.invalidate()
+            return
+        dev = IdentifyCache.split(event.env.get('DEVNAME', event.devpath))
+        if dev is None:
+            return
+        if dev[1] is None:
+            IdentifyCache.invalidate(dev[0])
+        else:
+            IdentifyCache.invalidate_ns(dev[0], dev[1])
+
+    @staticmethod
+    def listen():
+        """ Register uevent listener once.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        with IdentifyCache.lock:
+            if IdentifyCache.listening:
+                return
+            IdentifyCache.listening = True
+        UEventMonitor.add_listener(IdentifyCache.on_uevent)
+
+    @staticmethod
+    def reset_stats():
+        """ Reset hit and miss accounting.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        with IdentifyCache.lock:
+            IdentifyCache.hits = 0
+            IdentifyCache.misses = 0
+
+    @staticmethod
+    def get_stats():
+        """ Hit and miss accounting.
+            - Args :
+                - None.
+            - Returns :
+                - (hits, misses).
+        """
+        with IdentifyCache.lock:
+            return IdentifyCache.hits, IdentifyCache.misses
@@ -20,52 +20,18 @@
 """ Represents NVMe Over Fabric Host Namespace.
 """
 
-import Queue
-import time
 import copy
 import threading
+from concurrent.futures import wait
 
 from utils.fs import Ext4FS
 from utils.log import Log
-from utils.shell import Cmd
-
-
-class NVMFNSThread(threading.Thread):
-    """
-    Represents a worker thread.
-
-        - Attributes :
-            - target : thread Target.
-            - workq : workqueue shared between producer and worker thread.
-    """
-    def __init__(self, group=None, target=None, name=None,
-                 args=[], kwargs=None, verbose=None):
-        """Default Thread Constructor."""
-        super(NVMFNSThread, self).__init__()
-        self.target = target
-        self.name = name
-        self.workq = args[0]
-        self.q_cond_var = args[1]
-
-    def run(self):
-        """ Default Thread Function """
-        while True:
-            with self.q_cond_var:
-                # if queue is empty wait
-                if self.workq.empty():
-                    self.q_cond_var.wait()
-
-                # get the item from the queue if None exit
-                # use None as signal to exit worker queue
-                item = self.workq.get()
-                if item is None:
-                    break
-
-                ret = item['THREAD'](item)
-                # On Error just shutdown the worker thread
-                # complete all the remaining operations and quit
-                if ret is False:
-                    self.workq.put(None)
+from utils.misc import KeyedExecutor
+from utils.diskio import IOResult
+from utils.diskio import IOResultSet
+from utils.const import Const
+from nvmf.host.host_admin import NVMeAdmin
+from nvmf.host.host_id_cache import IdentifyCache
 
 
 class NVMFHostNamespace(object):
@@ -75,67 +41,128 @@ class NVMFHostNamespace(object):
         - Attributes :
             - ns_dev : block device associated with this namespace.
             - mount_path : mounted directory.
-            - worker_thread : handle for io worker thread.
-            - workq : workqueue shared between producer and worker thread.
-            - q_cond_var : condition variable for queue operations.
+            - futures : IO jobs submitted since the last wait_io().
+            - lock : protects futures.
+            - io_results : result records of the finished IO jobs.
             - fs_type : file system type for mkfs.
             - fs : file system object.
+            - nqn : subsystem nqn, used to rate limit per IO messages.
+            - nsid : namespace id read from the block device.
+            - id_ns_data : decoded identify namespace data.
     """
-    def __init__(self, ns_dev):
+    def __init__(self, ns_dev, nqn=None):
         self.ns_dev = ns_dev
+        self.nqn = nqn
+        self.nsid = None
+        self.id_ns_data = None
         self.mount_path = None
-        self.worker_thread = None
-        self.workq = Queue.Queue()
-        self.q_cond_var = threading.Condition()
+        self.futures = []
+        self.lock = threading.Lock()
+        self.io_results = IOResultSet(ns_dev)
         self.fs_type = None
         self.fs = None
         self.logger = Log.get_logger(__name__, 'host_ns')
 
     def init(self):
-        """ Create worker thread.
+        """ Identify namespace.
             - Args :
                 - None.
             - Returns :
                 - True on success, False on failure.
         """
-        if self.id_ns() is False:
-            return False
+        return self.id_ns()
 
-        # Create worker thread for this ns
-        self.worker_thread = NVMFNSThread(args=[self.workq, self.q_cond_var])
-        self.worker_thread.setDaemon(True)
-        self.worker_thread.start()
+    def submit_io(self, iocfg):
+        """ Queue IO job on the shared IO executor, jobs of this namespace
+            run one at a time in submission order.
+            - Args :
+                - iocfg : io configuration, iocfg['THREAD'] runs the job.
+            - Returns :
+                - True on success, False on failure.
+        """
+        try:
+            future = KeyedExecutor.shared().submit(self.ns_dev,
+                                                   iocfg['THREAD'], iocfg)
+        except RuntimeError as err:
+            self.logger.error("IO executor is not running : " + str(err))
+            return False
+        with self.lock:
+            self.futures.append(future)
         return True
 
+    def identify(self, cns, loader):
+        """ Identify data of this namespace through the identify cache.
+            - Args :
+                - cns : identify CNS.
+                - loader : function issuing the command on cache miss.
+            - Returns :
+                - identify data, None on failure.
+        """
+        dev = IdentifyCache.split(self.ns_dev)
+        if dev is None:
+            return loader()
+        return IdentifyCache.get(dev[0], dev[1], cns, loader)
+
     def id_ns(self):
-        """ Wrapper for id-ns command.
+        """ Identify namespace.
             - Args :
                 - None.
             - Returns :
                 - True on success, False on failure.
         """
-        id_ns_cmd = "nvme id-ns " + self.ns_dev
-        return Cmd.exec_cmd(id_ns_cmd)
+        id_ns = self.identify(Const.NVME_ID_CNS_NS,
+                              NVMeAdmin(self.ns_dev).identify_ns)
+        if id_ns is None:
+            self.logger.error("nvme id-ns " + self.ns_dev + " failed.")
+            return False
+        self.id_ns_data = id_ns
+        self.logger.info("%s nsze %d lba size %d", self.ns_dev, id_ns.nsze,
+                         id_ns.lba_size(), extra={'subsys': self.nqn})
+        return True
 
     def ns_descs(self):
-        """ Wrapper for ns-descs command.
+        """ Read namespace identification descriptors.
             - Args :
                 - None.
             - Returns :
                 - True on success, False on failure.
         """
-        ns_descs_cmd = "nvme ns-descs " + self.ns_dev
-        return Cmd.exec_cmd(ns_descs_cmd)
+        desc_list = self.identify(Const.NVME_ID_CNS_NS_DESC_LIST,
+                                  NVMeAdmin(self.ns_dev).ns_descs)
+        if desc_list is None:
+            self.logger.error("nvme ns-descs " + self.ns_dev + " failed.")
+            return False
+        for desc in desc_list:
+            self.logger.info("%s %s", self.ns_dev, desc,
+                             extra={'subsys': self.nqn})
+        return True
 
     def get_ns_id(self):
-        """ Wrapper for get-ns-id command.
+        """ Read namespace id of the namespace block device.
             - Args :
                 - None.
             - Returns :
                 - True on success, False on failure.
         """
-        get_ns_id_cmd = "nvme get-ns-id " + self.ns_dev
-        return Cmd.exec_cmd(get_ns_id_cmd)
+        nsid = NVMeAdmin(self.ns_dev).nsid()
+        if nsid is None:
+            self.logger.error("nvme get-ns-id " + self.ns_dev + " failed.")
+            return False
+        self.nsid = nsid
+        self.logger.info("%s nsid %d", self.ns_dev, nsid,
+                         extra={'subsys': self.nqn})
+        return True
+
+    def capacity(self):
+        """ Namespace size from the identify namespace data.
+            - Args :
+                - None.
+            - Returns :
+                - size in bytes, None if the namespace is not identified.
+        """
+        if self.id_ns_data is None:
+            return None
+        return self.id_ns_data.nsze * self.id_ns_data.lba_size()
 
     def mkfs(self, fs_type):
         """ Format namespace with file system and mount on the unique
@@ -167,68 +194,78 @@ class NVMFHostNamespace(object):
         if self.fs.is_mounted() is False:
             return False
 
+        iocfg = copy.deepcopy(iocfg)
         mount_path = self.fs.get_mount_path()
         iocfg['directory'] = mount_path + "/"
+        return self.submit_io(iocfg)
 
-        if self.worker_thread.is_alive():
-            with self.q_cond_var:
-                self.workq.put(iocfg)
-                self.q_cond_var.notifyAll()
-        else:
-            self.logger.error("worker thread is not running.")
-            return False
-        return True
-
-    def start_io(self, iocfg):
-        """ Add new work IO item to workqueue and notify worker thread.
+    def bind_iocfg(self, iocfg):
+        """ Copy IO configuration and point it to this namespace.
             - Args :
-                - IO Configuration passed to worker thread.
+                - IO Configuration of the job.
             - Returns :
-                - True on success, False on failure.
+                - copy of iocfg on success, None on failure.
         """
         iocfg = copy.deepcopy(iocfg)
-        self.logger.info(iocfg)
         if iocfg['IO_TYPE'] == 'dd':
             if iocfg['IODIR'] == "read":
                 iocfg['IF'] = self.ns_dev
             elif iocfg['IODIR'] == "write":
                 iocfg['OF'] = self.ns_dev
             else:
-                self.logger.error("io config " + iocfg + " not supported.")
-                return False
+                self.logger.error("io config " + str(iocfg) +
+                                  " not supported.")
+                return None
         elif iocfg['IO_TYPE'] == 'fio':
             iocfg['filename'] = self.ns_dev
         else:
             self.logger.error("invalid IO type " + iocfg['IO_TYPE'])
-        if self.worker_thread.is_alive():
-            with self.q_cond_var:
-                self.workq.put(iocfg)
-                self.q_cond_var.notifyAll()
-        else:
-            self.logger.error("worker thread is not running.")
-            return False
+            return None
+        return iocfg
 
-        return True
+    def start_io(self, iocfg):
+        """ Queue new IO job for this namespace.
+            - Args :
+                - IO Configuration passed to the job.
+            - Returns :
+                - True on success, False on failure.
+        """
+        iocfg = self.bind_iocfg(iocfg)
+        if iocfg is None:
+            return False
+        # formatted by the log listener, iocfg is not modified once queued
+        self.logger.info("start %s io on %s : %s", iocfg['IO_TYPE'],
+                         self.ns_dev, iocfg, extra={'subsys': self.nqn})
+        return self.submit_io(iocfg)
 
     def wait_io(self):
-        """ Wait until queue is empty.
+        """ Wait until the IO jobs submitted since the last wait finish.
             - Args :
                 - None.
             - Returns :
-                - True on success, False otherwise.
+                - True if all jobs succeeded, False otherwise.
         """
-        self.logger.info("Checking for worker thread " + self.ns_dev + ".")
-        if self.worker_thread.is_alive():
-            self.logger.info("Waiting for thread " + self.ns_dev + ".")
-            while not self.workq.empty() and \
-                    self.worker_thread.is_alive() is True:
-                # Wait till waorker thread is alive.
-                time.sleep(1)
-        else:
-            self.logger.error("worker thread is not alive")
-            return False
-        self.logger.info("# WAIT COMPLETE " + self.ns_dev + ".")
-        return True
+        with self.lock:
+            futures = self.futures
+            self.futures = []
+        self.logger.info("Waiting for %d IO jobs on %s.", len(futures),
+                         self.ns_dev, extra={'subsys': self.nqn})
+        wait(futures)
+        ret = True
+        for future in futures:
+            if future.exception() is not None:
+                self.logger.error("IO job on " + self.ns_dev + " failed : " +
+                                  str(future.exception()) + ".")
+                ret = False
+            elif isinstance(future.result(), IOResult):
+                self.io_results.add(future.result())
+                if future.result().ok is False:
+                    ret = False
+            elif future.result() is False:
+                ret = False
+        self.logger.info("# WAIT COMPLETE %s.", self.ns_dev,
+                         extra={'subsys': self.nqn})
+        return ret
 
     def unmount_cleanup(self):
         """ Unmount the namespace and cleanup the mount path.
@@ -249,14 +286,6 @@ class NVMFHostNamespace(object):
             - Returns :
                 - None.
         """
-        self.logger.info("delete ns waiting for workq to finish all items")
-        if self.worker_thread.is_alive():
-            with self.q_cond_var:
-                self.workq.put(None)
-                self.q_cond_var.notifyAll()
-
-            while not self.workq.empty() and \
-                    self.worker_thread.is_alive() is True:
-                time.sleep(1)
-
+        self.logger.info("delete ns waiting for IO jobs to finish")
+        self.wait_io()
         self.unmount_cleanup()
@@ -0,0 +1,213 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric host perf report.
+"""
+
+import json
+import math
+
+from utils.const import Const
+from utils.diskio import FIO
+from utils.diskio import IOResultSet
+
+
+class NVMFPerfReport(object):
+
+    """
+    Represents perf report of one run, built from the fio metrics of the
+    namespace result records and merged per controller and run.
+        - Attributes :
+            - METRICS : per namespace metrics of each direction.
+            - name : run name.
+            - rows : per namespace rows, controller, namespace, rc,
+                     elapsed and direction metrics.
+            - wall : seconds from the first job start to the last end.
+    """
+    METRICS = ['iops', 'bw', 'lat_mean'] + \
+        [name for name, key in FIO.PERCENTILES]
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = []
+        self.wall = 0
+
+    @staticmethod
+    def build(name, ctrl_list):
+        """ Build report from the result records of all namespaces.
+            - Args :
+                - name : run name.
+                - ctrl_list : list of host controllers.
+            - Returns :
+                - NVMFPerfReport object.
+        """
+        report = NVMFPerfReport(name)
+        result_sets = []
+        for ctrl in ctrl_list:
+            for host_ns in ctrl.ns_list:
+                result_sets.append(host_ns.io_results)
+                for result in host_ns.io_results.snapshot():
+                    report.add(ctrl.ctrl_dev, result)
+        report.wall = IOResultSet.merge(name, result_sets).summary()['wall']
+        return report
+
+    @staticmethod
+    def spread(values):
+        """ Spread of a metric across namespaces.
+            - Args :
+                - values : metric values.
+            - Returns :
+                - dictionary with min, max, mean and stddev (population).
+        """
+        if len(values) == 0:
+            return {'min': 0, 'max': 0, 'mean': 0, 'stddev': 0}
+        mean = sum(values) / float(len(values))
+        return {'min': min(values), 'max': max(values), 'mean': mean,
+                'stddev': math.sqrt(sum((value - mean) ** 2
+                                        for value in values) / len(values))}
+
+    def add(self, ctrl_dev, result):
+        """ Add namespace row of a finished job with metrics.
+            - Args :
+                - ctrl_dev : controller device.
+                - result : IOResult object.
+            - Returns :
+                - True if the row was added, False otherwise.
+        """
+        if result.end is None or len(result.metrics) == 0:
+            return False
+        row = {'ctrl': ctrl_dev, 'ns': result.dev, 'rc': result.rc,
+               'elapsed': result.elapsed()}
+        for direction, stats in result.metrics.items():
+            row[direction] = dict(stats)
+        self.rows.append(row)
+        return True
+
+    def directions(self):
+        """ Directions present in the report.
+            - Args :
+                - None.
+            - Returns :
+                - list of directions in FIO.DIRS order.
+        """
+        return [direction for direction in FIO.DIRS
+                if any(direction in row for row in self.rows)]
+
+    def totals(self):
+        """ Aggregate totals and spread across namespaces.
+            - Args :
+                - None.
+            - Returns :
+                - dictionary direction to iops, bw and io_bytes totals and
+                  spread of each metric.
+        """
+        totals = {}
+        for direction in self.directions():
+            rows = [row[direction] for row in self.rows if direction in row]
+            totals[direction] = {
+                'iops': sum(stats['iops'] for stats in rows),
+                'bw': sum(stats['bw'] for stats in rows),
+                'io_bytes': sum(stats['io_bytes'] for stats in rows),
+                'spread': dict((metric, NVMFPerfReport.spread(
+                    [stats[metric] for stats in rows]))
+                    for metric in NVMFPerfReport.METRICS)}
+        return totals
+
+    def controllers(self):
+        """ Totals per controller.
+            - Args :
+                - None.
+            - Returns :
+                - dictionary controller to direction to iops, bw and
+                  io_bytes.
+        """
+        ctrls = {}
+        for row in self.rows:
+            ctrl = ctrls.setdefault(row['ctrl'], {})
+            for direction in FIO.DIRS:
+                if direction not in row:
+                    continue
+                total = ctrl.setdefault(direction, {'iops': 0, 'bw': 0,
+                                                    'io_bytes': 0})
+                for key in total:
+                    total[key] += row[direction][key]
+        return ctrls
+
+    def to_dict(self):
+        """ Report as dictionary.
+            - Args :
+                - None.
+            - Returns :
+                - dictionary with name, wall, namespaces, controllers and
+                  totals.
+        """
+        return {'name': self.name, 'wall': self.wall,
+                'namespaces': self.rows, 'controllers': self.controllers(),
+                'totals': self.totals()}
+
+    def save(self, path):
+        """ Write the report as json.
+            - Args :
+                - path : report file.
+            - Returns :
+                - None.
+        """
+        with open(path, "w") as report_file:
+            json.dump(self.to_dict(), report_file, indent=1, sort_keys=True)
+
+    def table(self):
+        """ Text table of the report, one line per namespace and direction
+            followed by controller and run totals and the spread across
+            namespaces.
+            - Args :
+                - None.
+            - Returns :
+                - report string.
+        """
+        line = "%-16s %-6s %10.0f %10.2f %10.1f %10.1f %10.1f %10.1f"
+        lines = [self.name + " : %d namespaces in %.3f s" %
+                 (len(self.rows), self.wall),
+                 "%-16s %-6s %10s %10s %10s %10s %10s %10s" %
+                 ("device", "dir", "IOPS", "MB/s", "mean us", "p50 us",
+                  "p99 us", "p99.9 us")]
+        for row in self.rows:
+            for direction in self.directions():
+                if direction in row:
+                    stats = row[direction]
+                    lines.append(line % (
+                        row['ns'].split('/')[-1], direction, stats['iops'],
+                        stats['bw'] / float(Const.ONE_MB), stats['lat_mean'],
+                        stats['p50'], stats['p99'], stats['p99.9']))
+        total_line = "%-16s %-6s %10.0f %10.2f"
+        for ctrl_dev, ctrl in sorted(self.controllers().items()):
+            for direction, total in sorted(ctrl.items()):
+                lines.append(total_line % (ctrl_dev.split('/')[-1],
+                                           direction, total['iops'],
+                                           total['bw'] / float(Const.ONE_MB)))
+        for direction, total in sorted(self.totals().items()):
+            lines.append(total_line % ("total", direction, total['iops'],
+                                       total['bw'] / float(Const.ONE_MB)))
+            for stat in ['min', 'max', 'stddev']:
+                spread = total['spread']
+                lines.append(line % (
+                    stat, direction, spread['iops'][stat],
+                    spread['bw'][stat] / float(Const.ONE_MB),
+                    spread['lat_mean'][stat], spread['p50'][stat],
+                    spread['p99'][stat], spread['p99.9'][stat]))
+        return "\n".join(lines)
@@ -0,0 +1,330 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric host perf history.
+"""
+
+import os
+import json
+import fcntl
+import math
+import time
+import random
+import hashlib
+import itertools
+
+from utils.const import Const
+from utils.kmod import ModuleManager
+
+
+class NVMFPerfHistory(object):
+
+    """
+    Represents append only JSONL history of perf reports. Each line is
+    one run keyed by test, topology, workload and environment
+    fingerprint, runs are compared per direction and metric with a one
+    sided permutation test on the per namespace values of every
+    repetition of the run. A comparison with too few samples to ever
+    reach significance is reported as insufficient.
+        - Attributes :
+            - METRICS : compared metrics, 1 if higher is better, -1 if
+                        lower is better.
+            - WORKLOAD_SKIP : iocfg keys not describing the workload.
+            - path : history file.
+    """
+    METRICS = [('iops', 1), ('bw', 1), ('lat_mean', -1), ('p99', -1)]
+    WORKLOAD_SKIP = ['THREAD', 'ASYNC', 'RC', 'filename', 'directory',
+                     'IF', 'OF', 'OUTPUT']
+
+    def __init__(self, path=Const.PERF_HISTORY_FILE):
+        self.path = path
+
+    @staticmethod
+    def fingerprint(modules=Const.PERF_ENV_MODULES):
+        """ Environment fingerprint of this host.
+            - Args :
+                - modules : kernel modules whose parameters are recorded.
+            - Returns :
+                - dictionary with kernel release, cpu count and module
+                  parameters.
+        """
+        return {'kernel': os.uname()[2], 'cpus': os.cpu_count(),
+                'modules': dict((name, ModuleManager.get_params(name))
+                                for name in sorted(modules))}
+
+    @staticmethod
+    def workload(iocfg):
+        """ Workload parameters of an io configuration.
+            - Args :
+                - iocfg : io configuration.
+            - Returns :
+                - dictionary of the workload parameters.
+        """
+        return dict((key, value) for key, value in iocfg.items()
+                    if key not in NVMFPerfHistory.WORKLOAD_SKIP and
+                    isinstance(value, (str, int, float)))
+
+    @staticmethod
+    def key(test, topology, workload, env):
+        """ History key of a run.
+            - Args :
+                - test : test name.
+                - topology : topology dictionary.
+                - workload : workload dictionary.
+                - env : environment fingerprint.
+            - Returns :
+                - hex digest of the canonical json of all arguments.
+        """
+        data = json.dumps([test, topology, workload, env], sort_keys=True)
+        return hashlib.sha1(data.encode()).hexdigest()[:16]
+
+    def load(self):
+        """ Read all runs of the history, unreadable lines are skipped.
+            - Args :
+                - None.
+            - Returns :
+                - list of run dictionaries in file order.
+        """
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as history:
+            return NVMFPerfHistory.read(history)
+
+    @staticmethod
+    def read(history):
+        """ Read runs from an open history file, unreadable lines are
+            skipped.
+            - Args :
+                - history : history file object.
+            - Returns :
+                - list of run dictionaries in file order.
+        """
+        entries = []
+        for line in history:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries
+
+    def record(self, test, topology, workload, reports, env=None):
+        """ Append perf reports of a run to the history.
+            - Args :
+                - test : test name.
+                - topology : topology dictionary, e.g. controllers and
+                             namespaces.
+                - workload : workload dictionary, see workload().
+                - reports : list of NVMFPerfReport, one per repetition of
+                            the run.
+                - env : environment fingerprint, fingerprint() if None.
+            - Returns :
+                - run dictionary.
+        """
+        if env is None:
+            env = NVMFPerfHistory.fingerprint()
+        samples = {}
+        totals = {}
+        for report in reports:
+            for direction in report.directions():
+                direction_samples = samples.setdefault(direction, dict(
+                    (metric, []) for metric, sign in NVMFPerfHistory.METRICS))
+                for metric, sign in NVMFPerfHistory.METRICS:
+                    direction_samples[metric].extend(
+                        row[direction][metric] for row in report.rows
+                        if direction in row)
+            for direction, total in report.totals().items():
+                del total['spread']
+                for name, value in total.items():
+                    totals.setdefault(direction, {}).setdefault(
+                        name, []).append(value)
+        # totals and wall time are the mean of the repetitions
+        for direction in totals:
+            for name in totals[direction]:
+                totals[direction][name] = NVMFPerfHistory.mean(
+                    totals[direction][name])
+        wall = NVMFPerfHistory.mean([report.wall for report in reports])
+        entry = {'time': time.time(),
+                 'key': NVMFPerfHistory.key(test, topology, workload, env),
+                 'test': test, 'topology': topology, 'workload': workload,
+                 'env': env, 'wall': wall, 'repeat': len(reports),
+                 'totals': totals, 'samples': samples}
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        # the lock keeps the id unique and the line whole between
+        # concurrent writers, it is released when the file is closed
+        with open(self.path, "a+") as history:
+            fcntl.flock(history, fcntl.LOCK_EX)
+            history.seek(0)
+            ids = [run['id'] for run in NVMFPerfHistory.read(history)
+                   if isinstance(run, dict) and 'id' in run]
+            entry['id'] = max(ids) + 1 if ids else 1
+            history.write(json.dumps(entry, sort_keys=True) + "\n")
+        return entry
+
+    @staticmethod
+    def mean(values):
+        """ Mean of values.
+            - Args :
+                - values : list of numbers.
+            - Returns :
+                - mean, 0 if there are no values.
+        """
+        return sum(values) / float(len(values)) if len(values) else 0
+
+    @staticmethod
+    def p_value(base, cur, sign, seed=0):
+        """ One sided permutation test that cur is worse than base.
+            - Args :
+                - base : baseline samples.
+                - cur : current samples.
+                - sign : 1 if higher is better, -1 if lower is better.
+                - seed : seed of the sampled permutations.
+            - Returns :
+                - p value, None if there are too few samples.
+        """
+        if len(base) == 0 or len(cur) == 0 or len(base) + len(cur) < 3:
+            return None
+        pool = list(base) + list(cur)
+        worse = sign * (sum(base) / len(base) - sum(cur) / len(cur))
+        nr_pool = len(pool)
+        nr_cur = len(cur)
+        total = sum(pool)
+
+        def diff(cur_sum):
+            return sign * ((total - cur_sum) / (nr_pool - nr_cur) -
+                           cur_sum / nr_cur)
+
+        # tolerance, float sums of the same values may differ slightly
+        eps = 1e-9 * max(1.0, abs(worse))
+        if math.comb(nr_pool, nr_cur) <= Const.PERF_PERMUTATIONS:
+            diffs = [diff(sum(pool[i] for i in idx))
+                     for idx in itertools.combinations(range(nr_pool),
+                                                       nr_cur)]
+            return len([d for d in diffs if d >= worse - eps]) / \
+                float(len(diffs))
+        rng = random.Random(seed)
+        hits = 1
+        for i in range(Const.PERF_PERMUTATIONS):
+            if diff(sum(rng.sample(pool, nr_cur))) >= worse - eps:
+                hits += 1
+        return hits / float(Const.PERF_PERMUTATIONS + 1)
+
+    @staticmethod
+    def min_p_value(nr_base, nr_cur):
+        """ Smallest p value p_value() can return for the sample counts.
+            - Args :
+                - nr_base : number of baseline samples.
+                - nr_cur : number of current samples.
+            - Returns :
+                - smallest p value, None if there are too few samples.
+        """
+        if nr_base == 0 or nr_cur == 0 or nr_base + nr_cur < 3:
+            return None
+        nr_perm = math.comb(nr_base + nr_cur, nr_cur)
+        if nr_perm <= Const.PERF_PERMUTATIONS:
+            return 1.0 / nr_perm
+        return 1.0 / (Const.PERF_PERMUTATIONS + 1)
+
+    def compare(self, current_id=None, baseline_id=None,
+                alpha=Const.PERF_ALPHA, threshold=Const.PERF_THRESHOLD):
+        """ Compare a run against a baseline. The baseline is one run or
+            all earlier runs with the same key.
+            - Args :
+                - current_id : run id, latest run if None.
+                - baseline_id : baseline run id, None for all earlier runs
+                                with the key of the current run.
+                - alpha : significance level.
+                - threshold : minimum change in percent to flag.
+            - Returns :
+                - (current run, baseline runs, findings), findings are
+                  dictionaries with direction, metric, base, cur, change
+                  (percent), p, insufficient (p can't get below alpha
+                  with these samples) and regression, None if there is
+                  nothing to compare.
+        """
+        entries = self.load()
+        if len(entries) == 0:
+            return None
+        by_id = dict((entry['id'], entry) for entry in entries)
+        current = entries[-1] if current_id is None else \
+            by_id.get(current_id)
+        if current is None:
+            return None
+        if baseline_id is not None:
+            baseline = [by_id[baseline_id]] if baseline_id in by_id else []
+        else:
+            baseline = [entry for entry in entries
+                        if entry['key'] == current['key'] and
+                        entry['id'] < current['id']]
+        if len(baseline) == 0:
+            return None
+
+        findings = []
+        for direction in sorted(current['samples']):
+            for metric, sign in NVMFPerfHistory.METRICS:
+                cur = current['samples'][direction][metric]
+                base = [value for entry in baseline
+                        for value in entry['samples'].get(direction, {})
+                        .get(metric, [])]
+                if len(base) == 0 or len(cur) == 0:
+                    continue
+                base_mean = NVMFPerfHistory.mean(base)
+                cur_mean = NVMFPerfHistory.mean(cur)
+                change = 0
+                if base_mean:
+                    change = (cur_mean - base_mean) * 100.0 / base_mean
+                p = NVMFPerfHistory.p_value(base, cur, sign)
+                min_p = NVMFPerfHistory.min_p_value(len(base), len(cur))
+                findings.append({
+                    'direction': direction, 'metric': metric,
+                    'base': base_mean, 'cur': cur_mean, 'change': change,
+                    'p': p, 'insufficient': min_p is None or min_p >= alpha,
+                    'regression': p is not None and p < alpha and
+                    -sign * change > threshold})
+        return current, baseline, findings
+
+    @staticmethod
+    def report(current, baseline, findings):
+        """ Text summary of a comparison.
+            - Args :
+                - current : current run.
+                - baseline : baseline runs.
+                - findings : findings returned by compare().
+            - Returns :
+                - summary string.
+        """
+        lines = ["run %d (%s) against %d baseline run(s) %s" %
+                 (current['id'], current['test'], len(baseline),
+                  ",".join(str(entry['id']) for entry in baseline))]
+        if any(entry['key'] != current['key'] for entry in baseline):
+            lines.append("warning : baseline key differs, topology, "
+                         "workload or environment changed")
+        for finding in findings:
+            p = "n/a" if finding['p'] is None else "%.4f" % finding['p']
+            note = ""
+            if finding['regression']:
+                note = " REGRESSION"
+            elif finding['insufficient']:
+                note = " insufficient samples"
+            lines.append("%-6s %-9s %14.2f -> %14.2f %+8.2f %% p %s%s" %
+                         (finding['direction'], finding['metric'],
+                          finding['base'], finding['cur'],
+                          finding['change'], p, note))
+        return "\n".join(lines)
@@ -0,0 +1,254 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric host seeded workload scheduler.
+"""
+
+import json
+import random
+import threading
+from concurrent.futures import wait
+
+from utils.const import Const
+from utils.log import Log
+from utils.misc import KeyedExecutor
+from utils.diskio import IOResult
+
+
+class NVMFWorkloadScheduler(object):
+
+    """
+    Represents a seeded scheduler picking controllers and namespaces by
+    weight and keeping nr_jobs IO jobs in flight. Every run is recorded
+    as a list of (controller, namespace) index picks so the runs can be
+    saved and replayed exactly, even when device names change.
+        - Attributes :
+            - POLICIES : supported weight policies.
+            - policy : uniform, capacity or hotset.
+            - seed : random seed, drawn and logged when not given.
+            - nr_jobs : maximum number of jobs in flight.
+            - hot_fraction : fraction of namespaces in the hot set.
+            - hot_weight : share of the picks going to the hot set.
+            - rng : seeded random generator.
+            - runs : recorded runs, list of [ctrl_index, ns_index] lists.
+            - replay_runs : recorded runs left to replay, None when
+                            picking.
+    """
+    POLICIES = [Const.SCHED_UNIFORM, Const.SCHED_CAPACITY,
+                Const.SCHED_HOTSET]
+
+    def __init__(self, policy=Const.SCHED_UNIFORM, seed=None,
+                 nr_jobs=Const.HOST_SCHED_JOBS,
+                 hot_fraction=Const.SCHED_HOT_FRACTION,
+                 hot_weight=Const.SCHED_HOT_WEIGHT):
+        self.policy = policy
+        self.seed = seed
+        if self.seed is None:
+            self.seed = random.SystemRandom().randrange(1 << 32)
+        self.nr_jobs = nr_jobs
+        self.hot_fraction = hot_fraction
+        self.hot_weight = hot_weight
+        self.rng = random.Random(self.seed)
+        self.runs = []
+        self.replay_runs = None
+        self.logger = Log.get_logger(__name__, 'host')
+
+    def weights(self, ctrl_list):
+        """ Pick weight of every namespace.
+            - Args :
+                - ctrl_list : list of host controllers.
+            - Returns :
+                - list of namespace weight lists, one per controller.
+        """
+        if self.policy == Const.SCHED_CAPACITY:
+            return [[host_ns.capacity() or 1 for host_ns in ctrl.ns_list]
+                    for ctrl in ctrl_list]
+        weights = [[1.0] * len(ctrl.ns_list) for ctrl in ctrl_list]
+        if self.policy != Const.SCHED_HOTSET:
+            return weights
+        all_ns = [(c, n) for c, ctrl in enumerate(ctrl_list)
+                  for n in range(len(ctrl.ns_list))]
+        nr_hot = max(1, int(round(len(all_ns) * self.hot_fraction)))
+        if len(all_ns) == 0 or nr_hot >= len(all_ns):
+            return weights
+        hot = set(self.rng.sample(all_ns, nr_hot))
+        for c, n in all_ns:
+            if (c, n) in hot:
+                weights[c][n] = self.hot_weight / nr_hot
+            else:
+                weights[c][n] = (1 - self.hot_weight) / \
+                    (len(all_ns) - nr_hot)
+        return weights
+
+    def schedule(self, ctrl_list, nr_ops=0):
+        """ Pick controller then namespace by weight for each job, or take
+            the next recorded run when replaying.
+            - Args :
+                - ctrl_list : list of host controllers.
+                - nr_ops : number of jobs, 0 for one per namespace.
+            - Returns :
+                - list of [ctrl_index, ns_index] picks into ctrl_list and
+                  the controller's ns_list, None on failure.
+        """
+        if self.replay_runs is not None:
+            if len(self.replay_runs) == 0:
+                self.logger.error("no recorded run left to replay.")
+                return None
+            picks = self.replay_runs.pop(0)
+        else:
+            ctrl_index = [c for c, ctrl in enumerate(ctrl_list)
+                          if len(ctrl.ns_list)]
+            if len(ctrl_index) == 0 and nr_ops > 0:
+                self.logger.error("no namespace to schedule " +
+                                  str(nr_ops) + " jobs on.")
+                return None
+            active = [ctrl_list[c] for c in ctrl_index]
+            if nr_ops == 0:
+                nr_ops = sum(len(ctrl.ns_list) for ctrl in active)
+            weights = self.weights(active)
+            ctrl_weights = [sum(ns_weights) for ns_weights in weights]
+            picks = []
+            for i in range(nr_ops):
+                c = self.rng.choices(range(len(active)),
+                                     weights=ctrl_weights)[0]
+                n = self.rng.choices(range(len(weights[c])),
+                                     weights=weights[c])[0]
+                picks.append([ctrl_index[c], n])
+        self.runs.append(picks)
+        return picks
+
+    def resolve(self, ctrl_list, pick):
+        """ Map a [ctrl_index, ns_index] pick to its namespace.
+            - Args :
+                - ctrl_list : list of host controllers.
+                - pick : scheduled pick.
+            - Returns :
+                - host namespace, None if pick is out of range.
+        """
+        c, n = pick
+        if 0 <= c < len(ctrl_list) and 0 <= n < len(ctrl_list[c].ns_list):
+            return ctrl_list[c].ns_list[n]
+        self.logger.error("scheduled namespace " + str(n) +
+                          " of controller " + str(c) + " not found.")
+        return None
+
+    def save(self, path):
+        """ Save seed, policy and recorded runs.
+            - Args :
+                - path : schedule file.
+            - Returns :
+                - None.
+        """
+        with open(path, "w") as sched_file:
+            json.dump({'seed': self.seed, 'policy': self.policy,
+                       'nr_jobs': self.nr_jobs,
+                       'hot_fraction': self.hot_fraction,
+                       'hot_weight': self.hot_weight,
+                       'runs': self.runs}, sched_file, indent=1)
+
+    @staticmethod
+    def load(path):
+        """ Build scheduler replaying the runs of a schedule file.
+            - Args :
+                - path : schedule file written by save().
+            - Returns :
+                - NVMFWorkloadScheduler object.
+        """
+        with open(path) as sched_file:
+            sched = json.load(sched_file)
+        scheduler = NVMFWorkloadScheduler(sched['policy'], sched['seed'],
+                                          sched['nr_jobs'],
+                                          sched['hot_fraction'],
+                                          sched['hot_weight'])
+        scheduler.replay_runs = sched['runs']
+        return scheduler
+
+    def run(self, ctrl_list, iocfg, nr_ops=0):
+        """ Schedule IO jobs on the shared IO executor, at most nr_jobs
+            in flight, and wait for completion. Scheduling stops at the
+            first failure.
+            - Args :
+                - ctrl_list : list of host controllers.
+                - iocfg : io configuration, iocfg['THREAD'] runs the job.
+                - nr_ops : number of jobs, 0 for one per namespace.
+            - Returns :
+                - True on success, False on failure.
+        """
+        picks = self.schedule(ctrl_list, nr_ops)
+        if picks is None:
+            return False
+        self.logger.info("%s schedule seed %d : %d jobs, %d in flight",
+                         self.policy, self.seed, len(picks), self.nr_jobs)
+        slots = threading.Semaphore(self.nr_jobs)
+        failed = threading.Event()
+        jobs = []
+        ret = True
+        for pick in picks:
+            slots.acquire()
+            host_ns = None if failed.is_set() else \
+                self.resolve(ctrl_list, pick)
+            if host_ns is None:
+                slots.release()
+                ret = False
+                break
+            ns_iocfg = host_ns.bind_iocfg(iocfg)
+            if ns_iocfg is None:
+                slots.release()
+                ret = False
+                break
+            try:
+                future = KeyedExecutor.shared().submit(
+                    host_ns.ns_dev, ns_iocfg['THREAD'], ns_iocfg)
+            except RuntimeError as err:
+                self.logger.error("IO executor is not running : " + str(err))
+                slots.release()
+                ret = False
+                break
+            future.add_done_callback(
+                lambda future: self.job_done(future, slots, failed))
+            jobs.append((host_ns, future))
+
+        wait([future for host_ns, future in jobs])
+        for host_ns, future in jobs:
+            if future.exception() is not None:
+                self.logger.error("IO job on " + host_ns.ns_dev +
+                                  " failed : " + str(future.exception()))
+                ret = False
+            elif isinstance(future.result(), IOResult):
+                host_ns.io_results.add(future.result())
+                if future.result().ok is False:
+                    ret = False
+            elif future.result() is False:
+                ret = False
+        return ret
+
+    @staticmethod
+    def job_done(future, slots, failed):
+        """ Free the job slot, flag failed jobs.
+            - Args :
+                - future : finished job.
+                - slots : in flight job semaphore.
+                - failed : set when a job fails.
+            - Returns :
+                - None.
+        """
+        if future.exception() is not None or future.result() is False or \
+                getattr(future.result(), 'ok', True) is False:
+            failed.set()
+        slots.release()
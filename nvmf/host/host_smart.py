@@ -0,0 +1,287 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric host SMART counter sampling.
+"""
+
+import time
+import threading
+from array import array
+
+from utils.const import Const
+from utils.log import Log
+from nvmf.host.host_admin import NVMeAdmin
+
+
+class SmartRing(object):
+
+    """
+    Represents a fixed size ring of SMART counter samples kept in flat
+    arrays, the oldest sample is overwritten once the ring is full.
+        - Attributes :
+            - FIELDS : sampled SMART log counters.
+            - capacity : maximum number of samples.
+            - times : sample timestamps.
+            - values : counters, len(FIELDS) per sample.
+            - head : index of the next sample to write.
+            - count : number of valid samples.
+    """
+    FIELDS = ['data_units_read', 'data_units_written',
+              'host_read_commands', 'host_write_commands']
+    MASK = (1 << 64) - 1
+
+    def __init__(self, capacity=Const.SMART_RING_SIZE):
+        self.capacity = capacity
+        self.times = array('d', [0.0]) * capacity
+        self.values = array('Q', [0]) * (capacity * len(SmartRing.FIELDS))
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, values):
+        """ Add sample, overwrite the oldest one when full.
+            - Args :
+                - timestamp : monotonic sample time.
+                - values : counters in FIELDS order.
+            - Returns :
+                - None.
+        """
+        nr_fields = len(SmartRing.FIELDS)
+        self.times[self.head] = timestamp
+        offset = self.head * nr_fields
+        for i in range(nr_fields):
+            self.values[offset + i] = values[i] & SmartRing.MASK
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def sample(self, index):
+        """ Sample by age.
+            - Args :
+                - index : 0 for the oldest sample, -1 for the newest.
+            - Returns :
+                - (timestamp, counters tuple).
+        """
+        if index < 0:
+            index += self.count
+        if index < 0 or index >= self.count:
+            raise IndexError("smart ring index out of range")
+        slot = (self.head - self.count + index) % self.capacity
+        nr_fields = len(SmartRing.FIELDS)
+        offset = slot * nr_fields
+        return (self.times[slot],
+                tuple(self.values[offset:offset + nr_fields]))
+
+    def samples(self):
+        """ All samples, oldest first.
+            - Args :
+                - None.
+            - Returns :
+                - list of (timestamp, counters tuple).
+        """
+        return [self.sample(i) for i in range(self.count)]
+
+
+class SmartSampler(object):
+
+    """
+    Represents a background sampler of the SMART counters of host
+    controllers. Every interval one SMART log page per controller is read
+    into the controller ring. Phases are delimited with begin_phase() and
+    end_phase() which sample synchronously, the device reported IOPS and
+    throughput of a phase are the counter deltas between both samples.
+        - Attributes :
+            - dev_list : controller devices.
+            - interval : seconds between samples, 0 for boundaries only.
+            - rings : controller device to SmartRing.
+            - phases : phase name to [begin samples, end samples].
+            - errors : number of failed SMART log reads.
+            - lock : protects rings, phases and errors.
+    """
+
+    def __init__(self, dev_list, interval=Const.SMART_SAMPLE_INTERVAL,
+                 capacity=Const.SMART_RING_SIZE):
+        self.dev_list = list(dev_list)
+        self.interval = interval
+        self.rings = dict((dev, SmartRing(capacity)) for dev in self.dev_list)
+        self.phases = {}
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.logger = Log.get_logger(__name__, 'host')
+
+    def sample(self):
+        """ Read SMART counters of all controllers once.
+            - Args :
+                - None.
+            - Returns :
+                - controller device to (timestamp, counters tuple).
+        """
+        samples = {}
+        for dev in self.dev_list:
+            log = NVMeAdmin(dev).smart_log()
+            if log is None:
+                with self.lock:
+                    self.errors += 1
+                continue
+            samples[dev] = (time.monotonic(),
+                            tuple(getattr(log, field)
+                                  for field in SmartRing.FIELDS))
+            with self.lock:
+                self.rings[dev].append(*samples[dev])
+        return samples
+
+    def run(self):
+        """ Sampler thread function.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        """ Start background sampling when interval is set.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        if self.interval <= 0 or self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run,
+                                       name="smart-sampler")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """ Stop background sampling.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+    def begin_phase(self, name):
+        """ Sample all controllers at the start of a phase.
+            - Args :
+                - name : phase name.
+            - Returns :
+                - None.
+        """
+        begin = self.sample()
+        with self.lock:
+            self.phases[name] = [begin, None]
+
+    def end_phase(self, name):
+        """ Sample all controllers at the end of a phase.
+            - Args :
+                - name : phase name.
+            - Returns :
+                - phase statistics, see phase_stats().
+        """
+        end = self.sample()
+        with self.lock:
+            self.phases[name][1] = end
+        return self.phase_stats(name)
+
+    @staticmethod
+    def delta(first, last):
+        """ Device reported rates between two samples of one controller.
+            - Args :
+                - first : (timestamp, counters tuple).
+                - last : (timestamp, counters tuple).
+            - Returns :
+                - dictionary with seconds, read_iops, write_iops,
+                  read_bps and write_bps.
+        """
+        seconds = last[0] - first[0]
+        # counters restart from zero when the controller is re-created
+        diff = [max(new - old, 0) for old, new in zip(first[1], last[1])]
+        rate = 1.0 / seconds if seconds > 0 else 0.0
+        return {'seconds': seconds,
+                'read_bps': diff[0] * Const.SMART_DATA_UNIT * rate,
+                'write_bps': diff[1] * Const.SMART_DATA_UNIT * rate,
+                'read_iops': diff[2] * rate,
+                'write_iops': diff[3] * rate}
+
+    def phase_stats(self, name):
+        """ Device reported rates of a finished phase.
+            - Args :
+                - name : phase name.
+            - Returns :
+                - controller device to delta() dictionary plus 'total'
+                  with the summed rates, None if the phase is unknown or
+                  not finished.
+        """
+        with self.lock:
+            begin, end = self.phases.get(name, [None, None])
+        if begin is None or end is None:
+            return None
+        stats = {}
+        total = {'seconds': 0.0, 'read_bps': 0.0, 'write_bps': 0.0,
+                 'read_iops': 0.0, 'write_iops': 0.0}
+        for dev in self.dev_list:
+            if dev not in begin or dev not in end:
+                continue
+            stats[dev] = SmartSampler.delta(begin[dev], end[dev])
+            for key in total:
+                if key == 'seconds':
+                    total[key] = max(total[key], stats[dev][key])
+                else:
+                    total[key] += stats[dev][key]
+        stats['total'] = total
+        return stats
+
+    def series(self, dev):
+        """ Device reported rates between consecutive ring samples.
+            - Args :
+                - dev : controller device.
+            - Returns :
+                - list of (timestamp, delta() dictionary).
+        """
+        with self.lock:
+            samples = self.rings[dev].samples()
+        return [(last[0], SmartSampler.delta(first, last))
+                for first, last in zip(samples, samples[1:])]
+
+    @staticmethod
+    def report(name, stats):
+        """ One line summary of phase statistics.
+            - Args :
+                - name : phase name.
+                - stats : phase_stats() result.
+            - Returns :
+                - summary string.
+        """
+        total = stats['total']
+        return "smart " + name + " : read %.0f IOPS %.2f MB/s " \
+            "write %.0f IOPS %.2f MB/s in %.3f s" % \
+            (total['read_iops'], total['read_bps'] / Const.ONE_MB,
+             total['write_iops'], total['write_bps'] / Const.ONE_MB,
+             total['seconds'])
@@ -20,19 +20,21 @@
 """ Represents NVMe Over Fabric Host Controller.
 """
 
-import re
 import os
 import stat
 import time
-import random
-import string
-import subprocess
-from natsort import natsorted
 
 from utils.const import Const
 from utils.shell import Cmd
 from utils.log import Log
+from utils.uevent import UEventMonitor
+from utils.diskio import IOResultSet
 from nvmf.host.host_ns import NVMFHostNamespace
+from nvmf.host.host_fabrics import NVMFFabrics
+from nvmf.host.host_sysfs import NVMFSysfsIndex
+from nvmf.host.host_admin import NVMeAdmin
+from nvmf.host.host_id_cache import IdentifyCache
+from nvmf.host.host_scheduler import NVMFWorkloadScheduler
 
 
 class NVMFHostController(object):
@@ -41,19 +43,39 @@ class NVMFHostController(object):
 
         - Attributes :
             - nqn : ctrl nqn.
+            - ctrl : controller name returned by connect.
+            - cntlid : controller id returned by connect.
+            - connect_latency : seconds to connect and initialize.
             - ctrl_dev : controller device.
             - ctrl_dict : controller attributes.
+            - id_ctrl_data : decoded identify controller data.
             - ns_list : list of namespaces.
             - ns_dev_list : namespace device list.
             - transport : transport type.
+            - traddr : transport address, empty for any port.
+            - nr_ns : number of namespaces to wait for, None for at least
+                      one.
+            - timeout : seconds to wait for controller and namespaces.
+            - sysfs_ctl : sysfs fabrics controller class directory.
+            - dev_path : device node directory.
     """
-    def __init__(self, nqn, transport):
+    def __init__(self, nqn, transport, traddr="", nr_ns=None,
+                 timeout=Const.HOST_DISCOVERY_TIMEOUT):
         self.nqn = nqn
+        self.ctrl = None
+        self.cntlid = None
+        self.connect_latency = None
         self.ctrl_dev = None
         self.ctrl_dict = {}
+        self.id_ctrl_data = None
         self.ns_list = []
         self.ns_dev_list = []
         self.transport = transport
+        self.traddr = traddr
+        self.nr_ns = nr_ns
+        self.timeout = timeout
+        self.sysfs_ctl = Const.SYSFS_NVME_FABRICS_CTL
+        self.dev_path = Const.DEV_PATH
         self.ns_list_index = 0
         self.logger = Log.get_logger(__name__, 'host_subsystem')
 
@@ -86,14 +108,15 @@ class NVMFHostController(object):
                     self.logger.error("start IO " + ns.ns_dev + ".")
                     ret = False
                     break
-                self.logger.info("start IO " + ns.ns_dev + " SUCCESS.")
+                self.logger.info("start IO %s SUCCESS.", ns.ns_dev,
+                                 extra={'subsys': self.nqn})
             except StopIteration:
                 break
 
         return ret
 
     def wait_io_all_ns(self):
-        """ Wait until workqueue is empty.
+        """ Wait until IO jobs of all namespaces finish.
             - Args :
                 - None.
             - Returns :
@@ -108,6 +131,26 @@ class NVMFHostController(object):
                 break
         return True
 
+    def io_results(self):
+        """ Result records of the IO jobs of all namespaces.
+            - Args :
+                - None.
+            - Returns :
+                - IOResultSet of this controller.
+        """
+        return IOResultSet.merge(self.ctrl_dev, [host_ns.io_results
+                                                 for host_ns in self.ns_list])
+
+    def reset_io_results(self):
+        """ Drop result records of all namespaces.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        for host_ns in self.ns_list:
+            host_ns.io_results.reset()
+
     def run_io_seq(self, iocfg):
         """ Exercise IOs on each namespace.
             - Args :
@@ -161,26 +204,18 @@ class NVMFHostController(object):
                 break
         return ret
 
-    def run_io_random(self, iocfg):
-        """ Select the namespce randomely and wait for the IOs completion,
-            repeat this for all the namespaces.
+    def run_io_random(self, iocfg, scheduler=None):
+        """ Run IOs on namespaces picked by the workload scheduler, one job
+            per namespace on average.
             - Args :
                 - iocfg : io configuration.
+                - scheduler : NVMFWorkloadScheduler, uniform when None.
             - Returns :
                 - True on success, False on failure.
         """
-        num_list = range(0, len(self.ns_list))
-
-        for i in range(0, len(self.ns_list)):
-            random.shuffle(num_list)
-            ns_id = num_list.pop()
-
-            host_ns = self.ns_list[ns_id]
-            if host_ns.start_io(iocfg) is False:
-                return False
-            host_ns.wait_io()
-
-        return True
+        if scheduler is None:
+            scheduler = NVMFWorkloadScheduler()
+        return scheduler.run([self], iocfg)
 
     def __ctrl_set_attr__(self, attr):
         """ Set host controller attribute.
@@ -189,10 +224,11 @@ class NVMFHostController(object):
             - Returns :
                 - True on success, False on failure.
         """
-        sysfs_path = "/sys/class/nvme-fabrics/ctl/"
-        cmd = "echo 1 >" + sysfs_path + self.ctrl_dev.split('/')[-1] \
-              + "/" + attr
-        return Cmd.exec_cmd(cmd)
+        cmd = "echo 1 >" + self.sysfs_ctl + self.ctrl + "/" + attr
+        ret = Cmd.exec_cmd(cmd)
+        IdentifyCache.invalidate(self.ctrl)
+        self.sysfs_index().refresh(self.ctrl)
+        return ret
 
     def ctrl_rescan(self):
         """ Issue controller rescan.
@@ -212,41 +248,24 @@ class NVMFHostController(object):
         """
         return self.__ctrl_set_attr__("reset_controller")
 
-    def run_smart_log(self, nsid="0xFFFFFFFF"):
-        """ Wrapper for nvme smart-log command.
+    def run_smart_log(self, nsid=Const.NVME_NSID_ALL):
+        """ Read SMART / Health Information log page.
             - Args :
                 - nsid : namespace id for smart log, defaults to ctrl.
             - Returns:
                 - True on success, False on failure.
         """
-        smart_log_cmd = "nvme smart-log " + self.ctrl_dev + " -n " + str(nsid)
-        self.logger.info(smart_log_cmd)
-        proc = subprocess.Popen(smart_log_cmd,
-                                shell=True,
-                                stdout=subprocess.PIPE)
-        err = proc.wait()
-        if err != 0:
+        log = NVMeAdmin(self.ctrl_dev).smart_log(nsid)
+        if log is None:
             self.logger.error("nvme smart log failed.")
             return False
 
-        for line in proc.stdout:
-            if "data_units_read" in line:
-                temp_str = line.split(":")[Const.SMART_LOG_VALUE].strip()
-                data_units_read = string.replace(temp_str, ",", "")
-            if "data_units_written" in line:
-                temp_str = line.split(":")[Const.SMART_LOG_VALUE].strip()
-                data_units_written = string.replace(temp_str, ",", "")
-            if "host_read_commands" in line:
-                temp_str = line.split(":")[Const.SMART_LOG_VALUE].strip()
-                host_read_commands = string.replace(temp_str, ",", "")
-            if "host_write_commands" in line:
-                temp_str = line.split(":")[Const.SMART_LOG_VALUE].strip()
-                host_write_commands = string.replace(temp_str, ",", "")
-
-        self.logger.info("data_units_read " + data_units_read)
-        self.logger.info("data_units_written " + data_units_written)
-        self.logger.info("host_read_commands " + host_read_commands)
-        self.logger.info("host_write_commands " + host_write_commands)
+        self.logger.info("smart log " + self.ctrl_dev + " nsid " + hex(nsid))
+        self.logger.info("data_units_read " + str(log.data_units_read))
+        self.logger.info("data_units_written " + str(log.data_units_written))
+        self.logger.info("host_read_commands " + str(log.host_read_commands))
+        self.logger.info("host_write_commands " +
+                         str(log.host_write_commands))
         return True
 
     def smart_log(self):
@@ -275,81 +294,89 @@ class NVMFHostController(object):
             - Returns :
                 - True on success, False on failure.
         """
-        ctrl_bdev = self.ctrl_dev.split("/")[Const.CTRL_BLK_FILE_NAME]
+        index = self.sysfs_index()
+        index.refresh(self.ctrl)
         # Validate ctrl in the sysfs
-        cmd = "basename $(dirname $(grep -ls " + self.nqn + \
-              " /sys/class/nvme-fabrics/ctl/*/subsysnqn))"
-        proc = subprocess.Popen(cmd,
-                                shell=True,
-                                stdout=subprocess.PIPE)
-        for line in proc.stdout:
-            line = line.strip('\n')
-            # compare nvmeN in /dev/nvmeN in sysfs
-            if line != ctrl_bdev:
-                self.logger.error("host ctrl " + self.ctrl_dev +
-                                  " not present.")
+        if index.nqn(self.ctrl) != self.nqn:
+            self.logger.error("host ctrl " + self.ctrl_dev +
+                              " not present.")
+            return False
+
+        for ns in index.namespaces(self.ctrl):
+            if self.dev_path + ns not in self.ns_dev_list:
+                self.logger.error("ns " + ns + " not found in sysfs.")
                 return False
-        dir_list = os.listdir("/sys/class/nvme-fabrics/ctl/" + ctrl_bdev + "/")
-
-        pat = re.compile("^" + ctrl_bdev + "+n[0-9]+$")
-        for line in dir_list:
-            line = line.strip('\n')
-            if pat.match(line):
-                if "/dev/" + line not in self.ns_dev_list:
-                    self.logger.error("ns " + line + " not found in sysfs.")
-                    return False
 
         self.logger.info("sysfs entries for ctrl and ns created successfully.")
         return True
 
-    def build_ns_list(self):
-        """ Generate next available controller and namespace id on the fly.
-            Build the ns list for this controller.
+    def sysfs_index(self):
+        """ Shared sysfs index of fabric controllers.
             - Args :
                 - None.
+            - Returns :
+                - NVMFSysfsIndex object.
+        """
+        return NVMFSysfsIndex.get(self.sysfs_ctl)
+
+    def find_ctrl(self, ctrl):
+        """ Check the controller created by our connect is usable.
+            - Args :
+                - ctrl : controller name returned by connect.
+            - Returns :
+                - controller name once its device node exists and it
+                  belongs to our subsystem, None otherwise.
+        """
+        if not os.path.exists(self.dev_path + ctrl):
+            return None
+        index = self.sysfs_index()
+        index.refresh(ctrl)
+        if index.nqn(ctrl) != self.nqn:
+            return None
+        return ctrl
+
+    def find_ns(self, ctrl):
+        """ Find namespace block devices of controller.
+            - Args :
+                - ctrl : controller name.
+            - Returns :
+                - list of namespace devices once all expected namespaces
+                  are present, None otherwise.
+        """
+        index = self.sysfs_index()
+        index.refresh(ctrl)
+        ns_list = [self.dev_path + name for name in index.namespaces(ctrl)
+                   if os.path.exists(self.dev_path + name)]
+        nr_ns = 1 if self.nr_ns is None else self.nr_ns
+        if len(ns_list) < nr_ns:
+            return None
+        return ns_list
+
+    def build_ns_list(self, ctrl):
+        """ Wait for the device node of the controller created by our
+            connect and its namespaces, woken up by kernel uevents, until
+            timeout. Build the ns list for this controller.
+            - Args :
+                - ctrl : controller name returned by connect.
             - Returns :
                 - ctrl and ns list on success, None on failure.
         """
-        ctrl = Const.XXX
-        ns_list = []
-        try:
-            dev_list = os.listdir("/dev/")
-        except Exception, err:
-            self.logger.error(str(err) + ".")
-            return None, None
-        dev_list = natsorted(dev_list, key=lambda y: y.lower())
-        # we assume that atleast one namespace is created on target
-        # find ctrl
-        pat = re.compile("^nvme[0-9]+$")
-        for line in dev_list:
-            line = line.strip('\n')
-            if pat.match(line):
-                ctrl = line
-
-        if ctrl == Const.XXX:
-            self.logger.error("controller '/dev/nvme*' not found.")
-            return None, None
-        # allow namespaces to appear in the /dev/
-        time.sleep(2)
-        # find namespace(s) associated with ctrl
-        try:
-            dir_list = os.listdir("/dev/")
-        except Exception, err:
-            self.logger.error(str(err))
+        monitor = UEventMonitor.get()
+        deadline = time.monotonic() + self.timeout
+        if monitor.wait(lambda: self.find_ctrl(ctrl), self.timeout) is None:
+            self.logger.error("controller " + ctrl + " for " + self.nqn +
+                              " not found.")
             return None, None
-        pat = re.compile("^" + ctrl + "+n[0-9]+$")
-        for line in dir_list:
-            line = line.strip('\n')
-            if pat.match(line):
-                self.logger.info("Generated namespace name /dev/" + line + ".")
-                ns_list.append("/dev/" + line)
-
-        if len(ns_list) == 0:
+
+        ns_list = monitor.wait(lambda: self.find_ns(ctrl),
+                               deadline - time.monotonic())
+        if ns_list is None:
             self.logger.error("host ns not found for ctrl " + ctrl + ".")
             return None, None
 
-        ctrl = "/dev/" + ctrl
-        return ctrl, ns_list
+        for ns_dev in ns_list:
+            self.logger.info("Generated namespace name " + ns_dev + ".")
+        return self.dev_path + ctrl, ns_list
 
     def init_ns(self):
         """ Initialize and build namespace list and validate sysfs entries.
@@ -366,11 +393,9 @@ class NVMFHostController(object):
                 return False
 
             self.logger.info("Found NS " + ns_dev + ".")
-            host_ns = NVMFHostNamespace(ns_dev)
+            host_ns = NVMFHostNamespace(ns_dev, self.nqn)
             host_ns.init()
             self.ns_list.append(host_ns)
-        # allow sysfs entries to populate
-        time.sleep(1)
         if self.validate_sysfs_ns() is False:
             self.logger.error("unable to verify sysfs entries.")
             return False
@@ -387,11 +412,14 @@ class NVMFHostController(object):
 
         if not stat.S_ISCHR(os.stat(self.ctrl_dev).st_mode):
             self.logger.error("failed to find char device for host ctrl.")
+            return False
 
-        cmd = "find /sys/devices -name " + self.ctrl_dev.split("/")[-2] \
-              + " | grep nvme-fabric"
-        self.logger.info(cmd)
-        return Cmd.exec_cmd(cmd)
+        if self.ctrl not in self.sysfs_index().ctrls_of(self.nqn):
+            self.logger.error("host ctrl " + self.ctrl +
+                              " is not a fabric controller of " +
+                              self.nqn + ".")
+            return False
+        return True
 
     def init_ctrl(self):
         """ Initialize controller and build controller attributes.
@@ -401,13 +429,30 @@ class NVMFHostController(object):
                 - True on success, False on failure.
         """
         # initialize nqn and transport
-        cmd = "echo  \"transport=" + self.transport + ",nqn=" + \
-              self.nqn + "\" > /dev/nvme-fabrics"
-        self.logger.info("Host Connect command : " + cmd)
-        if Cmd.exec_cmd(cmd) is False:
-            self.logger.info("ERROR : host connect command failed")
+        options = "transport=" + self.transport + ",nqn=" + self.nqn
+        if self.traddr != "":
+            options += ",traddr=" + self.traddr
+        # listen for uevents before the connect creates the devices
+        UEventMonitor.get()
+        IdentifyCache.listen()
+        self.logger.info("Host Connect options : " + options)
+        try:
+            reply = NVMFFabrics.connect(options)
+        except OSError as err:
+            self.logger.error("host connect failed : " + str(err) + ".")
+            return False
+        if reply is None:
+            self.logger.error("invalid host connect reply.")
+            return False
+        self.ctrl = NVMFFabrics.ctrl_name(reply)
+        self.cntlid = reply.get("cntlid")
+        # instance numbers are reused, drop data of an older controller
+        IdentifyCache.invalidate(self.ctrl)
+        self.logger.info("Host connected " + self.ctrl + " cntlid " +
+                         str(self.cntlid) + ".")
+        self.ctrl_dev, self.ns_dev_list = self.build_ns_list(self.ctrl)
+        if self.ctrl_dev is None:
             return False
-        self.ctrl_dev, self.ns_dev_list = self.build_ns_list()
 
         if self.validate_fabric_ctrl() is False or self.id_ctrl() is False:
             return False
@@ -415,32 +460,29 @@ class NVMFHostController(object):
         return self.init_ns()
 
     def id_ctrl(self):
-        """ Wrapper for executing id-ctrl command.
+        """ Identify controller and build controller attributes.
             - Args :
                 - None.
             - Returns :
                 - True on success, False on failure.
         """
-        id_ctrl_cmd = "nvme id-ctrl " + self.ctrl_dev
-        proc = subprocess.Popen(id_ctrl_cmd,
-                                shell=True,
-                                stdout=subprocess.PIPE)
-        err = proc.wait()
-        if err != 0:
+        loader = NVMeAdmin(self.ctrl_dev).identify_ctrl
+        dev = IdentifyCache.split(self.ctrl_dev)
+        if dev is None:
+            id_ctrl = loader()
+        else:
+            id_ctrl = IdentifyCache.get(dev[0], None, Const.NVME_ID_CNS_CTRL,
+                                        loader)
+        if id_ctrl is None:
             self.logger.error("nvme id-ctrl failed.")
             return False
 
-        for line in proc.stdout:
-            if line.startswith('subnqn') or \
-               line.startswith('NVME Identify Controller'):
-                continue
-            if line.startswith('ps ') or line.strip().startswith('rwt'):
-                continue
-            key, val = line.split(':')
-            self.ctrl_dict[key.strip()] = val.strip()
-
-        self.logger.info("ID controller :- ")
-        self.logger.info(self.ctrl_dict)
+        # attributes are only rebuilt when the cached data changed
+        if id_ctrl is not self.id_ctrl_data:
+            self.id_ctrl_data = id_ctrl
+            self.ctrl_dict = id_ctrl.to_dict()
+            self.logger.info("ID controller :- ")
+            self.logger.info(self.ctrl_dict)
         return True
 
     def id_ns(self):
@@ -501,27 +543,17 @@ class NVMFHostController(object):
         self.logger.info("Deleting subsystem " + self.nqn + ".")
         for host_ns in self.ns_list:
             host_ns.delete()
-        cmd = "dirname $(grep -ls " + self.nqn + \
-              " /sys/class/nvme-fabrics/ctl/*/subsysnqn)"
+        if self.ctrl is None:
+            return True
+        self.logger.info("disconnecting " + self.ctrl + ".")
         try:
-            proc = subprocess.Popen(cmd,
-                                    shell=True,
-                                    stdout=subprocess.PIPE)
-            for line in proc.stdout:
-                line = line.strip('\n')
-                if not os.path.isdir(line):
-                    self.logger.error("host ctrl dir " + self.nqn +
-                                      " not present.")
-                    return False
-                cmd = "nvme disconnect -n " + self.nqn
-                self.logger.info("disconnecting : " + cmd)
-                ret = Cmd.exec_cmd(cmd)
-                if ret is False:
-                    self.logger.error("failed to delete ctrl " +
-                                      self.nqn + ".")
-                    return False
-        except Exception, err:
-            self.logger.error(str(err) + ".")
+            NVMFFabrics.disconnect(self.ctrl, self.sysfs_ctl)
+        except (IOError, OSError) as err:
+            self.logger.error("failed to delete ctrl " + self.ctrl + " : " +
+                              str(err) + ".")
             return False
+        self.sysfs_index().forget(self.ctrl)
+        IdentifyCache.invalidate(self.ctrl)
+        self.ctrl = None
 
         return True
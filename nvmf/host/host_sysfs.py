@@ -0,0 +1,208 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric host sysfs controller index.
+"""
+
+import re
+import os
+import threading
+from natsort import natsorted
+
+from utils.const import Const
+
+
+class NVMFSysfsIndex(object):
+
+    """
+    Represents an index of the fabric controllers in sysfs, subsystem nqn
+    to controllers and controller to namespaces. The class directory is
+    scanned once, later refreshes only read controllers which are new or
+    were re-created (their sysfs directory inode changed), and a single
+    controller can be refreshed or dropped after connect, rescan or
+    delete.
+        - Attributes :
+            - sysfs_ctl : sysfs fabrics controller class directory.
+            - ctrls : controller to (inode, nqn, namespace names).
+            - nqns : subsystem nqn to set of controllers.
+            - lock : protects ctrls and nqns.
+            - indexes : shared index per class directory.
+    """
+
+    CTRL_PAT = re.compile("^nvme[0-9]+$")
+
+    indexes = {}
+    indexes_lock = threading.Lock()
+
+    def __init__(self, sysfs_ctl=Const.SYSFS_NVME_FABRICS_CTL):
+        self.sysfs_ctl = sysfs_ctl
+        self.ctrls = {}
+        self.nqns = {}
+        self.lock = threading.Lock()
+        self.refresh()
+
+    @staticmethod
+    def get(sysfs_ctl=Const.SYSFS_NVME_FABRICS_CTL):
+        """ Return shared index of class directory, build it on first use.
+            - Args :
+                - sysfs_ctl : sysfs fabrics controller class directory.
+            - Returns :
+                - NVMFSysfsIndex object.
+        """
+        with NVMFSysfsIndex.indexes_lock:
+            index = NVMFSysfsIndex.indexes.get(sysfs_ctl)
+            if index is None:
+                index = NVMFSysfsIndex(sysfs_ctl)
+                NVMFSysfsIndex.indexes[sysfs_ctl] = index
+            return index
+
+    def read_ctrl(self, ctrl):
+        """ Read subsystem nqn and namespaces of one controller.
+            - Args :
+                - ctrl : controller name.
+            - Returns :
+                - (nqn, namespace names), None if controller is gone.
+        """
+        ctrl_dir = self.sysfs_ctl + ctrl + "/"
+        ns_pat = re.compile("^" + ctrl + "n[0-9]+$")
+        try:
+            with open(ctrl_dir + "subsysnqn") as nqn_file:
+                nqn = nqn_file.read().strip()
+            with os.scandir(ctrl_dir) as entries:
+                ns_list = tuple(natsorted(entry.name for entry in entries
+                                          if ns_pat.match(entry.name)))
+        except (IOError, OSError):
+            return None
+        return nqn, ns_list
+
+    def update(self, ctrl, inode, info):
+        """ Replace index entry of one controller, caller holds lock.
+            - Args :
+                - ctrl : controller name.
+                - inode : sysfs directory inode of controller.
+                - info : (nqn, namespace names), None to drop controller.
+            - Returns :
+                - None.
+        """
+        old = self.ctrls.pop(ctrl, None)
+        if old is not None:
+            ctrl_set = self.nqns.get(old[1])
+            ctrl_set.discard(ctrl)
+            if len(ctrl_set) == 0:
+                del self.nqns[old[1]]
+        if info is not None:
+            self.ctrls[ctrl] = (inode, info[0], info[1])
+            self.nqns.setdefault(info[0], set()).add(ctrl)
+
+    @staticmethod
+    def inode(entry):
+        """ Inode of the controller directory a class directory entry
+            links to, the same inode os.stat() gives for the entry path.
+            - Args :
+                - entry : scandir entry of the class directory.
+            - Returns :
+                - inode number, None if the controller is gone.
+        """
+        try:
+            return entry.stat().st_ino
+        except OSError:
+            return None
+
+    def refresh(self, ctrl=None):
+        """ Refresh index.
+            - Args :
+                - ctrl : controller to re-read, None to scan the class
+                         directory and read new or re-created controllers.
+            - Returns :
+                - None.
+        """
+        if ctrl is not None:
+            try:
+                inode = os.stat(self.sysfs_ctl + ctrl).st_ino
+                info = self.read_ctrl(ctrl)
+            except OSError:
+                inode, info = None, None
+            with self.lock:
+                self.update(ctrl, inode, info)
+            return
+
+        try:
+            # class directory entries are symlinks, compare the inode of
+            # the controller directory as refresh(ctrl) does
+            with os.scandir(self.sysfs_ctl) as entries:
+                present = dict((entry.name, NVMFSysfsIndex.inode(entry))
+                               for entry in entries
+                               if NVMFSysfsIndex.CTRL_PAT.match(entry.name))
+        except OSError:
+            present = {}
+        with self.lock:
+            stale = [name for name, entry in self.ctrls.items()
+                     if present.get(name) != entry[0]]
+        for name in stale:
+            with self.lock:
+                self.update(name, None, None)
+        for name, inode in present.items():
+            if name in self.ctrls:
+                continue
+            info = self.read_ctrl(name)
+            with self.lock:
+                self.update(name, inode, info)
+
+    def forget(self, ctrl):
+        """ Drop controller from index, e.g. after disconnect.
+            - Args :
+                - ctrl : controller name.
+            - Returns :
+                - None.
+        """
+        with self.lock:
+            self.update(ctrl, None, None)
+
+    def nqn(self, ctrl):
+        """ Subsystem nqn of controller.
+            - Args :
+                - ctrl : controller name.
+            - Returns :
+                - subsystem nqn, None if controller is not indexed.
+        """
+        with self.lock:
+            entry = self.ctrls.get(ctrl)
+        return None if entry is None else entry[1]
+
+    def ctrls_of(self, nqn):
+        """ Controllers connected to subsystem.
+            - Args :
+                - nqn : subsystem nqn.
+            - Returns :
+                - sorted list of controller names.
+        """
+        with self.lock:
+            return natsorted(self.nqns.get(nqn, ()))
+
+    def namespaces(self, ctrl):
+        """ Namespaces of controller.
+            - Args :
+                - ctrl : controller name.
+            - Returns :
+                - list of namespace names, empty if controller is not
+                  indexed.
+        """
+        with self.lock:
+            entry = self.ctrls.get(ctrl)
+        return [] if entry is None else list(entry[2])
@@ -23,3 +23,9 @@ from .target_subsystem import NVMFTargetSubsystem
 from .target_ns import NVMFTargetNamespace
 from .port import NVMFTargetPort
 from .target_config_generator import TargetConfig
+from .target_diff import TargetDiff
+from .target_snapshot import TargetSnapshot
+from .target_nsid import NSIDAllocator
+from .target_provisioner import NVMFTargetProvisioner
+from .target_config_reader import TargetConfigReader
+from .target_model import TargetModel
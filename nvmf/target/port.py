@@ -23,7 +23,7 @@
 import os
 import shutil
 
-from utils.shell import Cmd
+from utils.configfs import Configfs
 from utils.const import Const
 from utils.log import Log
 
@@ -38,6 +38,8 @@ class NVMFTargetPort(object):
             - port_path : port path in configfs.
             - port_conf : dictionary to hold the port attributes.
     """
+    ADDR_ATTRS = ['addr_adrfam', 'addr_traddr', 'addr_treq', 'addr_trsvcid']
+
     def __init__(self, cfgfs, port_id, **port_conf):
         self.cfgfs = cfgfs
         self.port_id = port_id
@@ -63,18 +65,24 @@ class NVMFTargetPort(object):
             self.logger.error("only loop transport type is supported.")
             return False
 
-        ret = Cmd.exec_cmd("mkdir -p " + self.port_path)
-        if ret is False:
+        if Configfs.mkdir(self.port_path) is False:
             self.logger.error("failed to create " + self.port_path + ".")
             return False
 
-        # initialize transport type
+        # initialize transport type and address before any subsystem link,
+        # the kernel rejects address changes on an enabled port
         self.logger.info("Port " + self.port_path + " created successfully.")
 
-        ret = Cmd.exec_cmd("echo -n \"" + self.port_conf['addr_trtype'] +
-                           "\" > " + self.port_path + "/addr_trtype")
+        attr_list = [(self.port_path + "addr_trtype",
+                      self.port_conf['addr_trtype'])]
+        for attr in NVMFTargetPort.ADDR_ATTRS:
+            # unset address attributes keep the kernel default
+            if self.port_conf[attr] != "":
+                attr_list.append((self.port_path + attr,
+                                  self.port_conf[attr]))
+        ret = Configfs.write_attrs(attr_list)
         if ret is False:
-            status = "trtype " + self.port_path + " failed."
+            status = "address " + self.port_path + " failed."
             self.logger.error(status)
         else:
             status = "Port " + self.port_path + " initialized successfully."
@@ -92,31 +100,42 @@ class NVMFTargetPort(object):
         if not os.path.exists(src):
             self.logger.error("subsystem '" + src + "' not present.")
             return False
-        dest = self.port_path + "/subsystems/"
-        cmd = "ln -s " + src + " " + dest
-        self.logger.info(cmd)
-        return Cmd.exec_cmd(cmd)
+        dest = self.port_path + "subsystems/" + subsys_name
+        self.logger.info("Linking " + src + " to " + dest + ".")
+        return Configfs.link(src, dest)
+
+    def del_subsys(self, subsys_name):
+        """ Unlink Subsystem from this port.
+            - Args :
+                - subsys_name : subsystem nqn to be unlinked.
+            - Returns :
+                - True on success, False on failure.
+        """
+        link = self.port_path + "subsystems/" + subsys_name
+        self.logger.info("Unlinking " + link + ".")
+        return Configfs.unlink(link)
 
     def delete(self):
-        """ Delete this port.
+        """ Unlink all subsystems from this port and delete it.
             - Args :
                 - None.
             -Returns :
                 - True on success, False on failure.
         """
         self.logger.info("Deleting port " + self.port_id + ".")
-        subsys_symlink = self.port_path + "/subsystem/"
-        try:
-
-            if os.path.isdir(subsys_symlink):
-                shutil.rmtree(subsys_symlink, ignore_errors=True)
-                self.logger.info("Unlink subsystem fromn port successfully.")
+        ret = True
+        subsys_dir = self.port_path + "subsystems/"
+        if os.path.isdir(subsys_dir):
+            for subsys_name in sorted(os.listdir(subsys_dir)):
+                if self.del_subsys(subsys_name) is False:
+                    ret = False
 
-            if os.path.isdir(self.port_path):
-                shutil.rmtree(self.port_path, ignore_errors=True)
-
-        except Exception, err:
-            self.logger.error(str(err) + ".")
+        if os.path.isdir(self.port_path):
+            shutil.rmtree(self.port_path, ignore_errors=True)
+        if os.path.exists(self.port_path):
+            self.logger.error("failed to remove " + self.port_path + ".")
             return False
-        self.logger.info("Removed port " + self.port_path + " successfully.")
-        return True
+        if ret is True:
+            self.logger.info("Removed port " + self.port_path +
+                             " successfully.")
+        return ret
@@ -21,14 +21,21 @@
 """
 
 import sys
-import json
 from nose.tools import assert_equal
 
 from utils.shell import Cmd
 from utils.const import Const
+from utils.configfs import Configfs
 from utils.log import Log
+from utils.kmod import ModuleManager
+from utils.misc import Parallel
 from nvmf.target.target_subsystem import NVMFTargetSubsystem
+from nvmf.target.target_ns import NVMFTargetNamespace
 from nvmf.target.port import NVMFTargetPort
+from nvmf.target.target_provisioner import NVMFTargetProvisioner
+from nvmf.target.target_model import TargetModel
+from nvmf.target.target_diff import TargetDiff
+from nvmf.target.target_snapshot import TargetSnapshot
 
 
 class NVMFTarget(object):
@@ -41,14 +48,18 @@ class NVMFTarget(object):
             - port_list : list of the ports.
             - target_type : target type for ports.
             - cfgfs : configfs mount point.
+            - nr_workers : max concurrent configfs operations for config.
+            - cached_snapshot : configfs snapshot, see snapshot().
     """
-    def __init__(self, target_type):
+    def __init__(self, target_type, nr_workers=Const.TARGET_NR_WORKERS):
         self.subsys_list = []
         self.port_list = []
         self.target_type = target_type
         self.cfgfs = Const.SYSFS_DEFAULT_MOUNT_PATH
         self.logger = Log.get_logger(__name__, 'target')
         self.subsys_list_index = 0
+        self.nr_workers = nr_workers
+        self.cached_snapshot = None
 
         assert_equal(self.load_configfs(), True)
 
@@ -67,6 +78,27 @@ class NVMFTarget(object):
         """ Iterator next function """
         return self.__next__()
 
+    def snapshot(self):
+        """ Return configfs snapshot, the same snapshot is returned until
+            invalidate_snapshot() is called or the target changes it.
+            - Args :
+                - None.
+            -Returns :
+                - TargetSnapshot.
+        """
+        if self.cached_snapshot is None:
+            self.cached_snapshot = TargetSnapshot.read(self.cfgfs)
+        return self.cached_snapshot
+
+    def invalidate_snapshot(self):
+        """ Drop cached configfs snapshot.
+            - Args :
+                - None.
+            -Returns :
+                - None.
+        """
+        self.cached_snapshot = None
+
     def load_configfs(self):
         """ Load configfs.
             - Args :
@@ -74,7 +106,7 @@ class NVMFTarget(object):
             -Returns :
                 - True on success, False on failure.
         """
-        Cmd.exec_cmd("modprobe configfs")
+        ModuleManager.load("configfs")
         ret = Cmd.exec_cmd("mountpoint -q " + self.cfgfs)
         if ret is False:
             ret = Cmd.exec_cmd("mount -t configfs none " + self.cfgfs)
@@ -89,122 +121,371 @@ class NVMFTarget(object):
                                   self.cfgfs + ".")
         return ret
 
+    def load_modules(self):
+        """ Load target modules for this target type.
+            - Args :
+                - None.
+            -Returns :
+                - True on success, False on failure.
+        """
+        if ModuleManager.load("nvme_core") is False:
+            self.logger.error("failed to load nvme_core.")
+            return False
+
+        if ModuleManager.load("nvme") is False:
+            self.logger.error("failed to load nvme.")
+            return False
+
+        if ModuleManager.load("nvmet") is False:
+            self.logger.error("unable to load nvmet module.")
+            return False
+
+        if self.target_type == "loop":
+            if ModuleManager.load("nvme-loop") is False:
+                self.logger.error("failed to load nvme-loop.")
+                return False
+        return True
+
+    def read_config(self, config_file):
+        """ Read target JSON config file.
+            - Args :
+                - config_file : json config file path.
+            -Returns :
+                - shared TargetModel on success, None on failure.
+        """
+        try:
+            return TargetModel.load(config_file)
+        except (IOError, ValueError, KeyError, TypeError) as err:
+            self.logger.error(str(err) + ".")
+            return None
+
     def config_loop_target(self, config_file):
         """ Configure loop target :-
             1. Create subsystem(s) and respective namespace(s).
             2. Create port(s) and linked them to respective subsystem(s).
-            3. Create in memory configuration from JSON config file.
+            3. Create in memory configuration from shared TargetModel.
+            Independent objects are created in parallel on nr_workers
+            threads, see NVMFTargetProvisioner.
             - Args :
                 - config_file : json config file path.
             -Returns :
                 - True on success, False on failure.
         """
-        ret = Cmd.exec_cmd("modprobe nvme-loop")
-        if ret is False:
-            self.logger.error("failed to load nvme-loop.")
+        config = self.read_config(config_file)
+        if config is None:
             return False
 
-        try:
-            config_file_handle = open(config_file, "r")
-            config = json.loads(config_file_handle.read())
-            config_file_handle.close()
-        except Exception, err:
-            self.logger.error(str(err) + ".")
+        self.invalidate_snapshot()
+        provisioner = NVMFTargetProvisioner(self, self.nr_workers)
+        return provisioner.provision(config)
+
+    def config(self, config_file="config/loop.json"):
+        """ Wrapper for creating target configuration.
+            - Args :
+                - config_file : json config_file.
+            -Returns :
+                - True on success, False on failure.
+        """
+        if self.target_type != "loop":
+            self.logger.error("only loop target type is supported.")
+            return False
+
+        if self.load_modules() is False:
+            return False
+
+        self.logger.info("Configuring loop target ... ")
+        return self.config_loop_target(config_file)
+
+    def apply(self, config_file):
+        """ Move the target to the configuration in config_file by applying
+            only the difference to the current configfs state :-
+            1. Unlink and remove ports which changed or went away.
+            2. Remove namespace(s) and subsystem(s) which went away.
+            3. Update changed subsystem and namespace attributes.
+            4. Create new subsystem(s), namespace(s), port(s) and links.
+            5. Rebuild in memory configuration from JSON config file, or
+               from configfs when applying stopped half way.
+            - Args :
+                - config_file : json config file path.
+            -Returns :
+                - True on success, False on failure.
+        """
+        if self.target_type != "loop":
+            self.logger.error("only loop target type is supported.")
+            return False
+
+        if self.load_modules() is False:
             return False
 
-        # Subsystem
-        for sscfg in config['subsystems']:
-            # Create Subsystem
-            subsys = NVMFTargetSubsystem(self.cfgfs,
-                                         sscfg['nqn'],
-                                         sscfg['allowed_hosts']
-                                         [Const.ALLOW_HOST_VALUE],
-                                         sscfg['attr']['allow_any_host'])
-            if subsys.init() is False:
+        config = self.read_config(config_file)
+        if config is None:
+            return False
+
+        current = self.snapshot().state()
+        diff = TargetDiff(current, TargetDiff.normalize(config))
+        self.logger.info("Applying target diff : " + str(diff) + ".")
+        self.invalidate_snapshot()
+        ret = self.apply_diff(diff)
+        if ret is True:
+            ret = self.build_model(config)
+        if ret is False:
+            self.logger.error("apply failed, rebuilding target from " +
+                              "configfs.")
+            self.build_model_state(self.snapshot().state())
+        return ret
+
+    def build_subsys(self, nqn, subsys_attr):
+        """ Build subsystem object from normalized state.
+            - Args :
+                - nqn : subsystem nqn.
+                - subsys_attr : normalized subsystem attributes.
+            -Returns :
+                - subsystem object.
+        """
+        return NVMFTargetSubsystem(self.cfgfs, nqn, "hostnqn",
+                                   subsys_attr['attr_allow_any_host'])
+
+    def build_ns(self, nqn, nsid, ns_attr):
+        """ Build namespace object from normalized state.
+            - Args :
+                - nqn : subsystem nqn.
+                - nsid : namespace id.
+                - ns_attr : normalized namespace attributes.
+            -Returns :
+                - namespace object.
+        """
+        attr = {}
+        attr['device_nguid'] = Const.XXX
+        attr['device_path'] = ns_attr['device_path']
+        attr['enable'] = ns_attr['enable']
+        return NVMFTargetNamespace(self.cfgfs, nqn, nsid, **attr)
+
+    def build_port(self, portid, port_attr):
+        """ Build port object from normalized state.
+            - Args :
+                - portid : port id.
+                - port_attr : normalized port attributes.
+            -Returns :
+                - port object.
+        """
+        port_cfg = {}
+        for attr in TargetDiff.PORT_ATTRS:
+            port_cfg[attr] = port_attr.get(attr, "")
+        port_cfg['subsystems'] = sorted(port_attr['subsystems'])
+        return NVMFTargetPort(self.cfgfs, portid, **port_cfg)
+
+    def apply_diff(self, diff):
+        """ Apply configfs changes in dependency order.
+            - Args :
+                - diff : TargetDiff object.
+            -Returns :
+                - True on success, False on failure.
+        """
+        cur = diff.current
+        new = diff.desired
+        for portid, nqn in diff.del_link:
+            port = self.build_port(portid, cur['ports'][portid])
+            if port.del_subsys(nqn) is False:
                 return False
 
-            self.subsys_list.append(subsys)
+        for portid in diff.del_port:
+            if self.build_port(portid, cur['ports'][portid]).delete() \
+               is False:
+                return False
 
-            for nscfg in sscfg['namespaces']:
-                ns_attr = {}
-                ns_attr['device_nguid'] = str(nscfg['device']['nguid'])
-                ns_attr['device_path'] = str(nscfg['device']['path'])
-                ns_attr['enable'] = str(nscfg['enable'])
-                ns_attr['nsid'] = str(nscfg['nsid'])
-                if subsys.create_ns(**ns_attr) is False:
-                    return False
+        for nqn, nsid in diff.del_ns:
+            ns_attr = cur['subsystems'][nqn]['namespaces'][nsid]
+            if self.build_ns(nqn, nsid, ns_attr).delete() is False:
+                return False
+
+        for nqn in diff.del_subsys:
+            if self.build_subsys(nqn, cur['subsystems'][nqn]).delete() \
+               is False:
+                return False
+
+        for nqn, attr, value in diff.set_subsys_attr:
+            subsys = self.build_subsys(nqn, new['subsystems'][nqn])
+            if Configfs.write_attr(subsys.subsys_path + attr, value) \
+               is False:
+                return False
+
+        if self.apply_ns_attrs(diff) is False:
+            return False
 
-        # Port
-        for pcfg in config['ports']:
-            port_cfg = {}
-            port_cfg['addr_treq'] = pcfg['addr']['treq']
-            port_cfg['addr_traddr'] = pcfg['addr']['traddr']
-            port_cfg['addr_trtype'] = pcfg['addr']['trtype']
-            port_cfg['addr_adrfam'] = pcfg['addr']['adrfam']
-            port_cfg['addr_trsvcid'] = pcfg['addr']['trsvcid']
-            port_cfg['portid'] = str(pcfg['portid'])
-            port_cfg['subsystems'] = pcfg['subsystems']
-
-            port = NVMFTargetPort(self.cfgfs, port_cfg['portid'], **port_cfg)
-            if port.init() is False:
+        for nqn in diff.add_subsys:
+            if self.build_subsys(nqn, new['subsystems'][nqn]).init() \
+               is False:
                 return False
 
-            self.port_list.append(port)
+        for nqn, nsid in diff.add_ns:
+            ns_attr = new['subsystems'][nqn]['namespaces'][nsid]
+            if self.build_ns(nqn, nsid, ns_attr).init() is False:
+                return False
+
+        for portid in diff.add_port:
+            if self.build_port(portid, new['ports'][portid]).init() is False:
+                return False
+
+        for portid, nqn in diff.add_link:
+            port = self.build_port(portid, new['ports'][portid])
+            if port.add_subsys(nqn) is False:
+                return False
+
+        return True
+
+    def apply_ns_attrs(self, diff):
+        """ Update namespace attributes, namespace is disabled while
+            device_path is changed.
+            - Args :
+                - diff : TargetDiff object.
+            -Returns :
+                - True on success, False on failure.
+        """
+        changed = {}
+        for nqn, nsid, attr, value in diff.set_ns_attr:
+            changed.setdefault((nqn, nsid), {})[attr] = value
 
-            for subsys in port_cfg['subsystems']:
-                ret = port.add_subsys(subsys)
+        for nqn, nsid in sorted(changed):
+            attrs = changed[(nqn, nsid)]
+            cur_attr = diff.current['subsystems'][nqn]['namespaces'][nsid]
+            new_attr = diff.desired['subsystems'][nqn]['namespaces'][nsid]
+            ns = self.build_ns(nqn, nsid, new_attr)
+            if 'device_path' in attrs:
+                if cur_attr['enable'] == '1' and ns.disable() is False:
+                    return False
+                if Configfs.write_attr(ns.ns_path + "device_path",
+                                       new_attr['device_path']) is False:
+                    return False
+                attrs['enable'] = new_attr['enable']
+            if 'enable' in attrs:
+                if attrs['enable'] == '1':
+                    ret = ns.enable()
+                else:
+                    ret = ns.disable()
                 if ret is False:
-                    self.logger.error("failed to add subsystem " +
-                                      subsys + " to port " +
-                                      port.port_id + ".")
                     return False
-
         return True
 
-    def config(self, config_file="config/loop.json"):
-        """ Wrapper for creating target configuration.
+    def build_model(self, config):
+        """ Rebuild in memory subsystem and port lists from config.
             - Args :
-                - config_file : json config_file.
+                - config : TargetModel.
             -Returns :
                 - True on success, False on failure.
         """
-        if Cmd.exec_cmd("modprobe nvme") is False:
-            self.logger.error("failed to load nvme.")
-            return False
+        self.subsys_list = []
+        self.port_list = []
+        for sscfg in config.subsystems:
+            subsys = NVMFTargetSubsystem(self.cfgfs, sscfg.nqn,
+                                         sscfg.allowed_host(),
+                                         sscfg.allow_any_host)
+            for nscfg in sorted(sscfg.namespaces,
+                                key=lambda nscfg: nscfg.nsid):
+                ns = subsys.alloc_ns(**nscfg.attrs())
+                if ns is None:
+                    self.logger.error("failed to build namespace " +
+                                      str(nscfg.nsid) + " of " +
+                                      sscfg.nqn + ".")
+                    return False
+                subsys.ns_list.append(ns)
+            self.subsys_list.append(subsys)
 
-        if Cmd.exec_cmd("modprobe nvmet") is False:
-            self.logger.error("unable to load nvmet module.")
-            return False
+        for pcfg in config.ports:
+            self.port_list.append(NVMFTargetPort(self.cfgfs, pcfg.port_id,
+                                                 **pcfg.attrs()))
+        return True
 
-        ret = False
-        if self.target_type == "loop":
-            self.logger.info("Configuring loop target ... ")
-            ret = self.config_loop_target(config_file)
-        else:
-            self.logger.error("only loop target type is supported.")
+    def build_model_state(self, state):
+        """ Rebuild in memory subsystem and port lists from normalized
+            configfs state.
+            - Args :
+                - state : normalized state, see TargetSnapshot.state().
+            -Returns :
+                - None.
+        """
+        self.subsys_list = []
+        self.port_list = []
+        for nqn in sorted(state['subsystems']):
+            subsys_attr = state['subsystems'][nqn]
+            subsys = self.build_subsys(nqn, subsys_attr)
+            for nsid in sorted(subsys_attr['namespaces'], key=int):
+                subsys.nsid_alloc.alloc(nsid)
+                subsys.ns_list.append(
+                    self.build_ns(nqn, nsid, subsys_attr['namespaces'][nsid]))
+            self.subsys_list.append(subsys)
 
+        for portid in sorted(state['ports']):
+            self.port_list.append(self.build_port(portid,
+                                                  state['ports'][portid]))
+
+    def delete_port(self, port, snapshot):
+        """ Unlink subsystems linked to port and remove port.
+            - Args :
+                - port : port object.
+                - snapshot : configfs snapshot taken before teardown.
+            -Returns :
+                - True on success, False on failure.
+        """
+        ret = True
+        snap_port = snapshot.port(port.port_id)
+        if snap_port is not None:
+            for nqn in snap_port.subsystems:
+                if port.del_subsys(nqn) is False:
+                    ret = False
+        if port.delete() is False:
+            ret = False
         return ret
 
-    def delete(self):
-        """ Target Cleanup.
+    def unload_modules(self):
+        """ Unload target modules.
             - Args :
                 - None.
+            -Returns :
+                - None.
+        """
+        self.logger.info("Removing Modules ...")
+        ModuleManager.unload("nvme_loop")
+        ModuleManager.unload("nvmet")
+        ModuleManager.unload("nvme_fabrics")
+
+    def delete(self, keep_modules=False):
+        """ Target Cleanup :-
+            1. Unlink subsystem(s) from port(s) and remove port(s).
+            2. Remove namespace(s) of all subsystem(s).
+            3. Remove subsystem(s).
+            4. Unload target modules unless keep_modules is set.
+            Objects of each step are removed in parallel on nr_workers
+            threads.
+            - Args :
+                - keep_modules : leave modules loaded for the next test.
             -Returns :
                 - True on success, False on failure.
         """
         self.logger.info("Cleanup is in progress ...")
         ret = True
-        for port in self.port_list:
-            if port.delete() is False:
-                ret = False
+        # ports may have been changed behind the cache, e.g. by a testcase
+        self.invalidate_snapshot()
+        snapshot = TargetSnapshot.read(self.cfgfs)
 
+        if Parallel.run(lambda port: self.delete_port(port, snapshot),
+                        self.port_list, self.nr_workers) is False:
+            ret = False
+
+        ns_list = []
         for subsys in iter(self):
-            if subsys.delete() is False:
-                ret = False
+            ns_list.extend((subsys, ns) for ns in subsys.ns_list)
+        if Parallel.run(lambda item: item[0].delete_ns(item[1]),
+                        ns_list, self.nr_workers) is False:
+            ret = False
 
-        self.logger.info("Removing Modules ...")
-        Cmd.exec_cmd("modprobe -r nvme_loop")
-        Cmd.exec_cmd("modprobe -r nvmet")
-        Cmd.exec_cmd("modprobe -r nvme_fabrics")
+        if Parallel.run(lambda subsys: subsys.delete(),
+                        self.subsys_list, self.nr_workers) is False:
+            ret = False
+
+        self.port_list = []
+        self.subsys_list = []
+
+        if keep_modules is False:
+            self.unload_modules()
         self.logger.info("DONE.")
         return ret
@@ -21,6 +21,10 @@
 """
 
 import json
+import zlib
+
+from utils.config import Config
+from utils.const import Const
 
 
 class Port:
@@ -29,13 +33,15 @@ class Port:
 
         - Attributes:
             - port_id : unique port identification number.
+            - traddr : transport address, used by loop to pick the port.
             - port_dict : dictionary to hold port attributes.
             - addr : to hold address attributes.
             - referrals : list of target port referals.
             - subsystems : list of the subsystems associated with this port.
     """
-    def __init__(self, port_id):
+    def __init__(self, port_id, traddr=""):
         self.port_id = port_id
+        self.traddr = traddr
         self.port_dict = {}
         self.addr = {}
         self.referrals = [None]
@@ -49,7 +55,7 @@ class Port:
                 - None.
         """
         self.addr['adrfam'] = ""
-        self.addr['traddr'] = ""
+        self.addr['traddr'] = self.traddr
         self.addr['treq'] = "not specified"
         self.addr['trsvcid'] = ""
         self.addr['trtype'] = "loop"
@@ -171,14 +177,28 @@ class TargetConfig:
             - nr_subsys : number of subsystems present in this target.
             - nr_ns : number of namespaces per subsystem.
             - dev_list : list of devices to be used for namespaces.
+            - nr_ports : number of ports present in this target.
+            - port_policy : subsystem to port placement policy.
     """
-    def __init__(self, config_file_path, nr_subsys, nr_ns, dev_list):
+    PORT_POLICIES = [Const.PORT_POLICY_ROUND_ROBIN,
+                     Const.PORT_POLICY_HASH,
+                     Const.PORT_POLICY_ALL]
+
+    def __init__(self, config_file_path, nr_subsys, nr_ns, dev_list,
+                 nr_ports=Const.TARGET_NR_PORTS,
+                 port_policy=Const.PORT_POLICY_ROUND_ROBIN):
+        if nr_ports < 1:
+            raise ValueError("invalid number of ports " + str(nr_ports))
+        if port_policy not in TargetConfig.PORT_POLICIES:
+            raise ValueError("invalid port policy " + str(port_policy))
         self.subsys_list = []
         self.port_list = []
         self.config_file_path = config_file_path
         self.nr_subsys = nr_subsys
         self.nr_ns = nr_ns
         self.dev_list = dev_list
+        self.nr_ports = nr_ports
+        self.port_policy = port_policy
 
     def pp_json(self, json_string, sort=True, indents=4):
         """ Prints formatted JSON output.
@@ -194,29 +214,96 @@ class TargetConfig:
                               sort_keys=sort, indent=indents)
         return json.dumps(json_string, sort_keys=sort, indent=indents)
 
-    def build_target_subsys(self):
-        """ Builds the Target config and dumps in JSON format.
+    def place_subsys(self, index, nqn):
+        """ Select ports for subsystem based on port policy.
             - Args :
-                - None.
+                - index : subsystem index in config.
+                - nqn : subsystem nqn.
             - Returns :
+                - list of port indexes.
+        """
+        if self.port_policy == Const.PORT_POLICY_ALL:
+            return list(range(self.nr_ports))
+        if self.port_policy == Const.PORT_POLICY_HASH:
+            return [zlib.crc32(nqn.encode()) % self.nr_ports]
+        return [index % self.nr_ports]
+
+    def build_ports(self):
+        """ Build port entries, only subsystem nqns are kept in memory.
+            - Args :
                 - None.
+            - Returns :
+                - list of port dictionaries.
         """
-        nqn_list = []
-        subsys_list = []
-        port_list = []
+        nqn_list = [[] for _ in range(self.nr_ports)]
         for i in range(0, self.nr_subsys):
             nqn = "testnqn" + str(i + 1)
-            subsys = Subsystem(self.nr_ns, nqn, self.dev_list)
-            subsys_list.append(subsys.build_subsys())
-            nqn_list.append(nqn)
-
-        # TODO : improve support for multiple ports
-        p = Port(1)
-        port_list.append(p.build_port(nqn_list))
-
-        target_config_str = {}
-        target_config_str['ports'] = port_list
-        target_config_str['subsystems'] = subsys_list
-        data = self.pp_json(target_config_str)
+            for port_index in self.place_subsys(i, nqn):
+                nqn_list[port_index].append(nqn)
+
+        port_list = []
+        for i in range(0, self.nr_ports):
+            # loop transport picks the port matching the connect traddr
+            traddr = str(i + 1) if self.nr_ports > 1 else ""
+            p = Port(i + 1, traddr)
+            port_list.append(p.build_port(nqn_list[i]))
+        return port_list
+
+    def gen_subsys(self):
+        """ Generate subsystem entries one at a time.
+            - Args :
+                - None.
+            - Returns :
+                - generator of subsystem dictionaries.
+        """
+        for i in range(0, self.nr_subsys):
+            subsys = Subsystem(self.nr_ns, "testnqn" + str(i + 1),
+                               self.dev_list)
+            yield subsys.build_subsys()
+
+    def write_list(self, config_file, key, entries, compact):
+        """ Stream JSON array of config entries to file.
+            - Args :
+                - config_file : file object opened for writing.
+                - key : top level key.
+                - entries : iterable of config entries.
+                - compact : emit one entry per line without indentation.
+            - Returns :
+                - None.
+        """
+        if compact:
+            config_file.write('"' + key + '":[')
+        else:
+            config_file.write('    "' + key + '": [')
+        sep = "\n" if compact else "\n        "
+        for entry in entries:
+            if compact:
+                data = json.dumps(entry, sort_keys=True,
+                                  separators=(',', ':'))
+            else:
+                data = json.dumps(entry, sort_keys=True, indent=4)
+                data = data.replace("\n", "\n        ")
+            config_file.write(sep + data)
+            sep = ",\n" if compact else ",\n        "
+        if sep[0] == ",":
+            config_file.write("\n" if compact else "\n    ")
+        config_file.write("]")
+
+    def build_target_subsys(self, compact=False):
+        """ Builds the Target config and streams it in JSON format.
+            The default layout is the same as pp_json() output, compact
+            layout has one port or subsystem per line.
+            - Args :
+                - compact : use compact encoding.
+            - Returns :
+                - None.
+        """
         with open(self.config_file_path, "w+") as config_file:
-            config_file.write(data)
+            config_file.write("{" if compact else "{\n")
+            self.write_list(config_file, "ports", self.build_ports(),
+                            compact)
+            config_file.write("," if compact else ",\n")
+            self.write_list(config_file, "subsystems", self.gen_subsys(),
+                            compact)
+            config_file.write("}\n" if compact else "\n}")
+        Config.invalidate(self.config_file_path)
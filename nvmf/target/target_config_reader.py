@@ -0,0 +1,198 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric Target streaming config file reader.
+"""
+
+import re
+import json
+
+
+class JSONStream(object):
+    """
+    Represents incremental JSON tokenizer over a file object.
+
+        - Attributes :
+            - config_file : file object opened for reading.
+            - chunk_size : number of characters read at a time.
+            - buf : unconsumed input.
+            - pos : current position in buf.
+            - eof : True once the file is exhausted.
+            - decoder : JSON decoder used for values.
+    """
+    NUMBER_START = "-0123456789"
+    NUMBER_END = re.compile(r"[\s,\]}]")
+
+    def __init__(self, config_file, chunk_size):
+        self.config_file = config_file
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        """ Read next chunk and drop consumed input.
+            - Args :
+                - None.
+            - Returns :
+                - True if more input was read, False at end of file.
+        """
+        data = self.config_file.read(self.chunk_size)
+        if data == "":
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def next_char(self):
+        """ Skip whitespace and return next character without consuming.
+            - Args :
+                - None.
+            - Returns :
+                - next character, "" at end of file.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf) or self.fill() is False:
+                break
+        return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, chars):
+        """ Consume one of the expected structural characters.
+            - Args :
+                - chars : accepted characters.
+            - Returns :
+                - consumed character.
+        """
+        char = self.next_char()
+        if char == "" or char not in chars:
+            raise ValueError("expected one of '" + chars + "' at offset " +
+                             str(self.pos) + " got '" + char + "'")
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """ Decode next complete JSON value, reading more input as needed.
+            - Args :
+                - None.
+            - Returns :
+                - decoded value.
+        """
+        # a number is only complete once a delimiter follows it
+        if self.next_char() in JSONStream.NUMBER_START:
+            while JSONStream.NUMBER_END.search(self.buf, self.pos) is None \
+                    and self.fill() is True:
+                pass
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buf, self.pos)
+                return value
+            except ValueError:
+                if self.fill() is False:
+                    raise
+
+    def elements(self):
+        """ Iterate over array elements, opening '[' must be next.
+            - Args :
+                - None.
+            - Returns :
+                - generator of decoded elements.
+        """
+        self.expect("[")
+        if self.next_char() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode()
+            if self.expect(",]") == "]":
+                return
+
+    def skip(self):
+        """ Consume next value, arrays one element at a time.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        if self.next_char() == "[":
+            for _ in self.elements():
+                pass
+        else:
+            self.decode()
+
+
+class TargetConfigReader(object):
+    """
+    Represents streaming reader for target config files written by
+    TargetConfig. Ports and subsystems are decoded one entry at a time
+    so the whole document is never held in memory.
+
+        - Attributes :
+            - config_file : target config file path.
+            - chunk_size : number of characters read at a time.
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, config_file, chunk_size=CHUNK_SIZE):
+        self.config_file = config_file
+        self.chunk_size = chunk_size
+
+    def entries(self, key):
+        """ Iterate over entries of a top level array.
+            - Args :
+                - key : top level key, 'ports' or 'subsystems'.
+            - Returns :
+                - generator of config entries, empty if key is missing.
+        """
+        with open(self.config_file, "r") as config_file:
+            stream = JSONStream(config_file, self.chunk_size)
+            stream.expect("{")
+            if stream.next_char() == "}":
+                return
+            while True:
+                name = stream.decode()
+                stream.expect(":")
+                if name == key:
+                    for entry in stream.elements():
+                        yield entry
+                    return
+                stream.skip()
+                if stream.expect(",}") == "}":
+                    return
+
+    def ports(self):
+        """ Iterate over port entries.
+            - Args :
+                - None.
+            - Returns :
+                - generator of port config dictionaries.
+        """
+        return self.entries('ports')
+
+    def subsystems(self):
+        """ Iterate over subsystem entries.
+            - Args :
+                - None.
+            - Returns :
+                - generator of subsystem config dictionaries.
+        """
+        return self.entries('subsystems')
@@ -0,0 +1,191 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric Target configuration difference.
+"""
+
+
+class TargetDiff(object):
+    """
+    Represents minimal set of changes to move the configfs state of the
+    target to the desired JSON configuration.
+
+    Both states are normalized into (see TargetSnapshot.state()) :
+        { 'subsystems' : { nqn : { attr : value,
+                                   'namespaces' : { nsid : { attr : value }}}},
+          'ports' : { portid : { attr : value, 'subsystems' : set(nqn) }}}
+    where attr is the configfs attribute file name managed by the target.
+
+        - Attributes :
+            - add_subsys : list of nqn to create.
+            - del_subsys : list of nqn to remove.
+            - set_subsys_attr : list of (nqn, attr, value).
+            - add_ns : list of (nqn, nsid) to create.
+            - del_ns : list of (nqn, nsid) to remove.
+            - set_ns_attr : list of (nqn, nsid, attr, value).
+            - add_port : list of portid to create.
+            - del_port : list of portid to remove.
+            - add_link : list of (portid, nqn) to link.
+            - del_link : list of (portid, nqn) to unlink.
+            - current : normalized current state.
+            - desired : normalized desired state.
+    """
+
+    SUBSYS_ATTRS = ['attr_allow_any_host']
+    NS_ATTRS = ['device_path', 'enable']
+    PORT_ATTRS = ['addr_trtype', 'addr_treq', 'addr_traddr', 'addr_adrfam',
+                  'addr_trsvcid']
+
+    def __init__(self, current, desired):
+        self.current = current
+        self.desired = desired
+        self.add_subsys = []
+        self.del_subsys = []
+        self.set_subsys_attr = []
+        self.add_ns = []
+        self.del_ns = []
+        self.set_ns_attr = []
+        self.add_port = []
+        self.del_port = []
+        self.add_link = []
+        self.del_link = []
+        self.build()
+
+    @staticmethod
+    def normalize(config):
+        """ Normalize target config model.
+            - Args :
+                - config : TargetModel.
+            - Returns :
+                - normalized state dictionary.
+        """
+        state = {'subsystems': {}, 'ports': {}}
+        for sscfg in config.subsystems:
+            subsys = {'namespaces': {}}
+            subsys['attr_allow_any_host'] = sscfg.allow_any_host
+            for nscfg in sscfg.namespaces:
+                ns = {}
+                ns['device_path'] = nscfg.device_path
+                ns['enable'] = nscfg.enable
+                subsys['namespaces'][str(nscfg.nsid)] = ns
+            state['subsystems'][sscfg.nqn] = subsys
+
+        for pcfg in config.ports:
+            port = {}
+            for attr in TargetDiff.PORT_ATTRS:
+                port[attr] = pcfg.addr[attr]
+            port['subsystems'] = set(pcfg.subsystems)
+            state['ports'][pcfg.port_id] = port
+        return state
+
+    def build(self):
+        """ Compute difference between current and desired state.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        cur_subsys = self.current['subsystems']
+        new_subsys = self.desired['subsystems']
+        for nqn in sorted(set(cur_subsys) - set(new_subsys)):
+            self.del_subsys.append(nqn)
+        for nqn in sorted(new_subsys):
+            if nqn not in cur_subsys:
+                self.add_subsys.append(nqn)
+                for nsid in sorted(new_subsys[nqn]['namespaces'], key=int):
+                    self.add_ns.append((nqn, nsid))
+                continue
+            for attr in TargetDiff.SUBSYS_ATTRS:
+                if cur_subsys[nqn].get(attr) != new_subsys[nqn][attr]:
+                    self.set_subsys_attr.append((nqn, attr,
+                                                 new_subsys[nqn][attr]))
+            cur_ns = cur_subsys[nqn]['namespaces']
+            new_ns = new_subsys[nqn]['namespaces']
+            for nsid in sorted(set(cur_ns) - set(new_ns), key=int):
+                self.del_ns.append((nqn, nsid))
+            for nsid in sorted(new_ns, key=int):
+                if nsid not in cur_ns:
+                    self.add_ns.append((nqn, nsid))
+                    continue
+                for attr in TargetDiff.NS_ATTRS:
+                    if cur_ns[nsid].get(attr) != new_ns[nsid][attr]:
+                        self.set_ns_attr.append((nqn, nsid, attr,
+                                                 new_ns[nsid][attr]))
+
+        cur_ports = self.current['ports']
+        new_ports = self.desired['ports']
+        for portid in sorted(cur_ports):
+            recreate = False
+            if portid in new_ports:
+                # address of an enabled port can't change, recreate it
+                for attr in TargetDiff.PORT_ATTRS:
+                    if cur_ports[portid].get(attr, "") != \
+                            new_ports[portid][attr]:
+                        recreate = True
+            if portid not in new_ports or recreate:
+                for nqn in sorted(cur_ports[portid]['subsystems']):
+                    self.del_link.append((portid, nqn))
+                self.del_port.append(portid)
+                continue
+            for nqn in sorted(cur_ports[portid]['subsystems'] -
+                              new_ports[portid]['subsystems']):
+                self.del_link.append((portid, nqn))
+            for nqn in sorted(new_ports[portid]['subsystems'] -
+                              cur_ports[portid]['subsystems']):
+                self.add_link.append((portid, nqn))
+
+        for portid in sorted(new_ports):
+            if portid not in cur_ports or portid in self.del_port:
+                self.add_port.append(portid)
+                for nqn in sorted(new_ports[portid]['subsystems']):
+                    self.add_link.append((portid, nqn))
+
+        # links to removed subsystems go away with the subsystem
+        for portid in sorted(cur_ports):
+            if portid in self.del_port:
+                continue
+            for nqn in sorted(cur_ports[portid]['subsystems']):
+                if nqn in self.del_subsys and \
+                   (portid, nqn) not in self.del_link:
+                    self.del_link.append((portid, nqn))
+
+    def is_empty(self):
+        """ Check if current state already matches desired state.
+            - Args :
+                - None.
+            - Returns :
+                - True if there is nothing to apply, False otherwise.
+        """
+        return len(self.add_subsys) == 0 and len(self.del_subsys) == 0 and \
+            len(self.set_subsys_attr) == 0 and len(self.add_ns) == 0 and \
+            len(self.del_ns) == 0 and len(self.set_ns_attr) == 0 and \
+            len(self.add_port) == 0 and len(self.del_port) == 0 and \
+            len(self.add_link) == 0 and len(self.del_link) == 0
+
+    def __str__(self):
+        return "subsys +" + str(len(self.add_subsys)) + \
+            " -" + str(len(self.del_subsys)) + \
+            " ~" + str(len(self.set_subsys_attr)) + \
+            ", ns +" + str(len(self.add_ns)) + \
+            " -" + str(len(self.del_ns)) + \
+            " ~" + str(len(self.set_ns_attr)) + \
+            ", port +" + str(len(self.add_port)) + \
+            " -" + str(len(self.del_port)) + \
+            ", link +" + str(len(self.add_link)) + \
+            " -" + str(len(self.del_link))
@@ -0,0 +1,163 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric Target typed config model.
+"""
+
+import sys
+from types import MappingProxyType
+
+from utils.config import Config
+from utils.const import Const
+from nvmf.target.target_config_reader import TargetConfigReader
+
+
+class NamespaceConfig(object):
+    """
+    Represents namespace entry of target config.
+
+        - Attributes :
+            - nsid : namespace id.
+            - device_path : backing block device.
+            - device_nguid : namespace nguid.
+            - enable : '1' to enable namespace, '0' otherwise.
+    """
+    __slots__ = ['nsid', 'device_path', 'device_nguid', 'enable']
+
+    def __init__(self, nscfg):
+        self.nsid = int(nscfg['nsid'])
+        # device paths and nguids repeat across namespaces, share them
+        self.device_path = sys.intern(str(nscfg['device']['path']))
+        self.device_nguid = sys.intern(str(nscfg['device']['nguid']))
+        self.enable = str(nscfg['enable'])
+
+    def attrs(self):
+        """ Build namespace attributes for NVMFTargetNamespace.
+            - Args :
+                - None.
+            - Returns :
+                - namespace attribute dictionary.
+        """
+        ns_attr = {}
+        ns_attr['device_nguid'] = self.device_nguid
+        ns_attr['device_path'] = self.device_path
+        ns_attr['enable'] = self.enable
+        ns_attr['nsid'] = str(self.nsid)
+        return ns_attr
+
+
+class SubsystemConfig(object):
+    """
+    Represents subsystem entry of target config.
+
+        - Attributes :
+            - nqn : subsystem nqn.
+            - allowed_hosts : tuple of allowed host nqns.
+            - allow_any_host : '1' to allow any host, '0' otherwise.
+            - namespaces : tuple of NamespaceConfig in config order.
+    """
+    __slots__ = ['nqn', 'allowed_hosts', 'allow_any_host', 'namespaces']
+
+    def __init__(self, sscfg):
+        self.nqn = sscfg['nqn']
+        self.allowed_hosts = tuple(sscfg['allowed_hosts'])
+        self.allow_any_host = str(sscfg['attr']['allow_any_host'])
+        self.namespaces = tuple(NamespaceConfig(nscfg)
+                                for nscfg in sscfg['namespaces'])
+
+    def allowed_host(self):
+        """ Host nqn used for subsystem allowed hosts.
+            - Args :
+                - None.
+            - Returns :
+                - host nqn.
+        """
+        return self.allowed_hosts[Const.ALLOW_HOST_VALUE]
+
+
+class PortConfig(object):
+    """
+    Represents port entry of target config.
+
+        - Attributes :
+            - port_id : port id.
+            - addr : read only configfs addr_* attributes.
+            - subsystems : tuple of linked subsystem nqns.
+    """
+    __slots__ = ['port_id', 'addr', 'subsystems']
+
+    ADDR_ATTRS = ['adrfam', 'traddr', 'treq', 'trsvcid', 'trtype']
+
+    def __init__(self, pcfg):
+        self.port_id = str(pcfg['portid'])
+        self.addr = MappingProxyType(
+            dict(("addr_" + attr, str(pcfg['addr'][attr]))
+                 for attr in PortConfig.ADDR_ATTRS))
+        self.subsystems = tuple(pcfg['subsystems'])
+
+    def attrs(self):
+        """ Build port attributes for NVMFTargetPort.
+            - Args :
+                - None.
+            - Returns :
+                - port attribute dictionary.
+        """
+        port_cfg = dict(self.addr)
+        port_cfg['portid'] = self.port_id
+        port_cfg['subsystems'] = list(self.subsystems)
+        return port_cfg
+
+
+class TargetModel(object):
+    """
+    Represents target config file as typed, shared model. Use load() so
+    target and host in one process parse the file only once.
+
+        - Attributes :
+            - subsystems : tuple of SubsystemConfig in config order.
+            - ports : tuple of PortConfig in config order.
+    """
+    __slots__ = ['subsystems', 'ports']
+
+    def __init__(self, subsystems, ports):
+        self.subsystems = tuple(subsystems)
+        self.ports = tuple(ports)
+
+    @staticmethod
+    def read(config_file):
+        """ Stream target config file into model.
+            - Args :
+                - config_file : target config file path.
+            - Returns :
+                - TargetModel object.
+        """
+        reader = TargetConfigReader(config_file)
+        return TargetModel((SubsystemConfig(sscfg)
+                            for sscfg in reader.subsystems()),
+                           (PortConfig(pcfg) for pcfg in reader.ports()))
+
+    @staticmethod
+    def load(config_file):
+        """ Return shared model of target config file.
+            - Args :
+                - config_file : target config file path.
+            - Returns :
+                - TargetModel object.
+        """
+        return Config.load(config_file, TargetModel.read)
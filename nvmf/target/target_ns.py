@@ -23,7 +23,7 @@
 import os
 import shutil
 
-from utils.shell import Cmd
+from utils.configfs import Configfs
 from utils.const import Const
 from utils.log import Log
 
@@ -60,16 +60,11 @@ class NVMFTargetNamespace(object):
                 - True on success, False on failure.
         """
         self.logger.info("Creating ns " + self.ns_path + " ...")
-        try:
-            os.makedirs(self.ns_path)
-        except Exception, err:
-            self.logger.error(str(err) + ".")
+        if Configfs.mkdir(self.ns_path) is False:
             return False
 
-        cmd = "echo -n " + self.ns_attr['device_path'] + " > " + \
-              self.ns_path + "/device_path"
-
-        if Cmd.exec_cmd(cmd) is False:
+        if Configfs.write_attr(self.ns_path + "device_path",
+                               self.ns_attr['device_path']) is False:
             self.logger.error("failed to configure device path.")
             return False
 
@@ -89,7 +84,7 @@ class NVMFTargetNamespace(object):
                 - True on success, False on failure.
         """
         self.ns_attr['enable'] = '0'
-        return Cmd.exec_cmd("echo 0 > " + self.ns_path + "/enable")
+        return Configfs.write_attr(self.ns_path + "enable", "0")
 
     def enable(self):
         """ Enable Namespace.
@@ -99,7 +94,7 @@ class NVMFTargetNamespace(object):
                 - True on success, False on failure.
         """
         self.ns_attr['enable'] = '1'
-        return Cmd.exec_cmd("echo 1 > " + self.ns_path + "/enable")
+        return Configfs.write_attr(self.ns_path + "enable", "1")
 
     def delete(self):
         """ Delete namespace.
@@ -0,0 +1,136 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric Target namespace id allocator.
+"""
+
+import threading
+
+from utils.const import Const
+
+
+class NSIDAllocator(object):
+    """
+    Represents per subsystem namespace id allocator.
+
+    Allocated ids are tracked in a sparse bitmap of 64 bit words so very
+    large nsids cost one word each. Ids without explicit nsid come from a
+    stack of freed ids or from a high watermark, allocate and free are
+    O(1) amortized.
+
+        - Attributes :
+            - max_nsid : largest valid namespace id.
+            - bitmap : word index to 64 bit word of allocated ids.
+            - free_list : stack of freed ids, may hold ids taken since.
+            - next_nsid : lowest id never handed out by the watermark.
+            - nr_allocated : number of allocated ids.
+    """
+    WORD_SHIFT = 6
+    WORD_MASK = (1 << WORD_SHIFT) - 1
+
+    def __init__(self, max_nsid=Const.NVME_MAX_NSID):
+        self.max_nsid = max_nsid
+        self.bitmap = {}
+        self.free_list = []
+        self.next_nsid = 1
+        self.nr_allocated = 0
+        self.lock = threading.Lock()
+
+    def is_allocated(self, nsid):
+        """ Check if namespace id is in use.
+            - Args :
+                - nsid : namespace id.
+            - Returns :
+                - True if allocated, False otherwise.
+        """
+        word = self.bitmap.get(nsid >> NSIDAllocator.WORD_SHIFT, 0)
+        return (word >> (nsid & NSIDAllocator.WORD_MASK)) & 1 == 1
+
+    def set_bit(self, nsid):
+        """ Mark namespace id allocated.
+            - Args :
+                - nsid : namespace id.
+            - Returns :
+                - None.
+        """
+        index = nsid >> NSIDAllocator.WORD_SHIFT
+        self.bitmap[index] = self.bitmap.get(index, 0) | \
+            (1 << (nsid & NSIDAllocator.WORD_MASK))
+        self.nr_allocated += 1
+
+    def clear_bit(self, nsid):
+        """ Mark namespace id free.
+            - Args :
+                - nsid : namespace id.
+            - Returns :
+                - None.
+        """
+        index = nsid >> NSIDAllocator.WORD_SHIFT
+        word = self.bitmap[index] & ~(1 << (nsid & NSIDAllocator.WORD_MASK))
+        if word == 0:
+            del self.bitmap[index]
+        else:
+            self.bitmap[index] = word
+        self.nr_allocated -= 1
+
+    def alloc(self, nsid=None):
+        """ Allocate namespace id.
+            - Args :
+                - nsid : explicit namespace id, None for any free id.
+            - Returns :
+                - allocated namespace id, None if not available.
+        """
+        with self.lock:
+            if nsid is not None:
+                nsid = int(nsid)
+                if nsid < 1 or nsid > self.max_nsid or \
+                   self.is_allocated(nsid):
+                    return None
+                self.set_bit(nsid)
+                return nsid
+
+            while len(self.free_list) != 0:
+                nsid = self.free_list.pop()
+                if not self.is_allocated(nsid):
+                    self.set_bit(nsid)
+                    return nsid
+
+            while self.next_nsid <= self.max_nsid:
+                nsid = self.next_nsid
+                self.next_nsid += 1
+                if not self.is_allocated(nsid):
+                    self.set_bit(nsid)
+                    return nsid
+            return None
+
+    def free(self, nsid):
+        """ Release namespace id for reuse.
+            - Args :
+                - nsid : namespace id.
+            - Returns :
+                - True on success, False if id was not allocated.
+        """
+        with self.lock:
+            nsid = int(nsid)
+            if not self.is_allocated(nsid):
+                return False
+            self.clear_bit(nsid)
+            if nsid < self.next_nsid:
+                self.free_list.append(nsid)
+            return True
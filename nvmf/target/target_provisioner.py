@@ -0,0 +1,336 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric Target parallel provisioning.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
+
+from utils.const import Const
+from utils.log import Log
+from nvmf.target.target_subsystem import NVMFTargetSubsystem
+from nvmf.target.port import NVMFTargetPort
+
+
+class NVMFTargetProvisioner(object):
+    """
+    Represents dependency ordered target provisioning on a bounded
+    worker pool. Independent subsystems, namespaces and ports are created
+    concurrently while each subsystem still follows
+    subsystem -> namespaces -> enable -> port link.
+
+        - Attributes :
+            - target : target to provision.
+            - nr_workers : maximum number of concurrent configfs operations.
+            - subsys_list : subsystems in config order.
+            - port_list : ports in config order.
+            - ns_done : per subsystem list of initialized namespaces.
+            - ns_pending : per subsystem number of namespaces in flight.
+            - subsys_ready : subsystems with all namespaces initialized.
+            - ports_ready : initialized ports.
+            - created : subsystems and ports whose configfs directory was
+                        created, including those whose attributes failed.
+            - port_waiters : subsystem nqn to list of ports to link.
+            - failed : set when any operation fails.
+    """
+    def __init__(self, target, nr_workers=Const.TARGET_NR_WORKERS):
+        self.target = target
+        self.nr_workers = nr_workers
+        self.subsys_list = []
+        self.port_list = []
+        self.ns_done = {}
+        self.ns_pending = {}
+        self.subsys_ready = set()
+        self.ports_ready = set()
+        self.created = set()
+        self.port_waiters = {}
+        self.failed = False
+        self.pool = None
+        self.pending = {}
+        self.logger = Log.get_logger(__name__, 'target')
+
+    def build_subsys(self, sscfg):
+        """ Build subsystem object from config.
+            - Args :
+                - sscfg : SubsystemConfig.
+            - Returns :
+                - subsystem object.
+        """
+        return NVMFTargetSubsystem(self.target.cfgfs, sscfg.nqn,
+                                   sscfg.allowed_host(),
+                                   sscfg.allow_any_host)
+
+    def build_ns_list(self, subsys, sscfg):
+        """ Build namespace objects for subsystem from config.
+            - Args :
+                - subsys : subsystem object.
+                - sscfg : SubsystemConfig.
+            - Returns :
+                - list of namespace objects in config order, None if a
+                  configured nsid is not available.
+        """
+        ns_list = []
+        for nscfg in sscfg.namespaces:
+            ns = subsys.alloc_ns(**nscfg.attrs())
+            if ns is None:
+                return None
+            ns_list.append(ns)
+        return ns_list
+
+    def build_port(self, pcfg):
+        """ Build port object from config.
+            - Args :
+                - pcfg : PortConfig.
+            - Returns :
+                - port object.
+        """
+        return NVMFTargetPort(self.target.cfgfs, pcfg.port_id,
+                              **pcfg.attrs())
+
+    def submit(self, kind, obj, func, *args):
+        """ Queue operation on the worker pool unless provisioning failed.
+            - Args :
+                - kind : operation type.
+                - obj : operation context passed to completion handler.
+                - func : operation.
+                - args : operation arguments.
+            - Returns :
+                - None.
+        """
+        if self.failed is False:
+            self.pending[self.pool.submit(func, *args)] = (kind, obj)
+
+    def create(self, kind, obj, path, func):
+        """ Queue creation of subsystem or port, refuse to take over a
+            configfs directory which already exists so that rollback only
+            ever removes directories created here.
+            - Args :
+                - kind : operation type, 'subsys' or 'port'.
+                - obj : operation context passed to completion handler.
+                - path : configfs directory of the object.
+                - func : object init operation.
+            - Returns :
+                - None.
+        """
+        if os.path.isdir(path):
+            self.logger.error(path + " already exists.")
+            self.failed = True
+            return
+        self.submit(kind, obj, func)
+
+    def link(self, port, nqn):
+        """ Link subsystem to port once both are ready.
+            - Args :
+                - port : port object.
+                - nqn : subsystem nqn.
+            - Returns :
+                - None.
+        """
+        if port in self.ports_ready and nqn in self.subsys_ready:
+            self.submit('link', (port, nqn), port.add_subsys, nqn)
+
+    def subsys_done(self, subsys, sscfg):
+        """ Subsystem created, start its namespaces.
+            - Args :
+                - subsys : subsystem object.
+                - sscfg : SubsystemConfig.
+            - Returns :
+                - None.
+        """
+        ns_list = self.build_ns_list(subsys, sscfg)
+        self.ns_done[subsys] = []
+        if ns_list is None:
+            self.ns_pending[subsys] = 0
+            self.failed = True
+            return
+        self.ns_pending[subsys] = len(ns_list)
+        for ns in ns_list:
+            self.submit('ns', (subsys, ns), subsys.init_ns, ns)
+        self.subsys_check_ready(subsys)
+
+    def ns_done_cb(self, subsys, ns):
+        """ Namespace created and enabled.
+            - Args :
+                - subsys : subsystem object.
+                - ns : namespace object.
+            - Returns :
+                - None.
+        """
+        self.ns_done[subsys].append(ns)
+        self.subsys_check_ready(subsys)
+
+    def subsys_check_ready(self, subsys):
+        """ Link subsystem to its ports when all namespaces are ready.
+            - Args :
+                - subsys : subsystem object.
+            - Returns :
+                - None.
+        """
+        if self.ns_pending[subsys] != 0:
+            return
+        self.finish_subsys(subsys)
+        self.subsys_ready.add(subsys.nqn)
+        for port in self.port_waiters.get(subsys.nqn, []):
+            self.link(port, subsys.nqn)
+
+    def port_done(self, port):
+        """ Port created, link subsystems which are ready.
+            - Args :
+                - port : port object.
+            - Returns :
+                - None.
+        """
+        self.ports_ready.add(port)
+        for nqn in port.port_conf['subsystems']:
+            self.link(port, nqn)
+
+    def complete(self, future, kind, obj):
+        """ Handle completion of one operation.
+            - Args :
+                - future : completed future.
+                - kind : operation type.
+                - obj : operation context.
+            - Returns :
+                - None.
+        """
+        try:
+            ret = future.result()
+        except Exception as err:
+            self.logger.error(kind + " : " + str(err) + ".")
+            ret = False
+
+        if kind == 'ns':
+            self.ns_pending[obj[0]] -= 1
+        elif kind == 'subsys':
+            # mkdir may succeed before an attribute write fails
+            if ret is True or os.path.isdir(obj[0].subsys_path):
+                self.created.add(obj[0])
+        elif kind == 'port':
+            if ret is True or os.path.isdir(obj.port_path):
+                self.created.add(obj)
+
+        if ret is False or ret is None:
+            if kind == 'link':
+                self.logger.error("failed to add subsystem " + obj[1] +
+                                  " to port " + obj[0].port_id + ".")
+            else:
+                self.logger.error(kind + " provisioning failed.")
+            self.failed = True
+            return
+
+        if kind == 'subsys':
+            self.subsys_done(*obj)
+        elif kind == 'ns':
+            self.ns_done_cb(*obj)
+        elif kind == 'port':
+            self.port_done(obj)
+
+    def provision(self, config):
+        """ Create all subsystems, namespaces and ports from config and
+            link subsystems to ports. Rollback everything on failure.
+            - Args :
+                - config : TargetModel.
+            - Returns :
+                - True on success, False on failure.
+        """
+        with ThreadPoolExecutor(max_workers=self.nr_workers) as pool:
+            self.pool = pool
+            for sscfg in config.subsystems:
+                subsys = self.build_subsys(sscfg)
+                self.subsys_list.append(subsys)
+                self.create('subsys', (subsys, sscfg), subsys.subsys_path,
+                            subsys.init)
+
+            for pcfg in config.ports:
+                port = self.build_port(pcfg)
+                self.port_list.append(port)
+                for nqn in port.port_conf['subsystems']:
+                    self.port_waiters.setdefault(nqn, []).append(port)
+                self.create('port', port, port.port_path, port.init)
+
+            while len(self.pending) != 0:
+                done, _ = wait(list(self.pending.keys()),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, obj = self.pending.pop(future)
+                    self.complete(future, kind, obj)
+            self.pool = None
+
+        self.check_waiters()
+        if self.failed is True:
+            self.rollback()
+            return False
+
+        self.target.subsys_list.extend(self.subsys_list)
+        self.target.port_list.extend(self.port_list)
+        return True
+
+    def check_waiters(self):
+        """ Fail provisioning if a port still waits for a subsystem, i.e.
+            its subsystems list names an nqn which is not in the config.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        if self.failed is True:
+            return
+        for nqn, port_list in self.port_waiters.items():
+            if nqn in self.subsys_ready:
+                continue
+            for port in port_list:
+                self.logger.error("port " + port.port_id +
+                                  " references unknown subsystem " +
+                                  nqn + ".")
+            self.failed = True
+
+    def finish_subsys(self, subsys):
+        """ Store initialized namespaces in subsystem in config order.
+            - Args :
+                - subsys : subsystem object.
+            - Returns :
+                - None.
+        """
+        subsys.ns_list = sorted(self.ns_done[subsys],
+                                key=lambda ns: ns.ns_id)
+
+    def rollback(self):
+        """ Remove everything created by this provisioner in reverse
+            dependency order.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        self.logger.info("Rolling back partial target configuration ...")
+        for port in reversed(self.port_list):
+            if port in self.created:
+                port.delete()
+
+        for subsys in reversed(self.subsys_list):
+            if subsys in self.ns_done:
+                self.finish_subsys(subsys)
+            if subsys in self.created:
+                subsys.delete()
+
+        self.subsys_list = []
+        self.port_list = []
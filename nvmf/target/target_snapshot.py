@@ -0,0 +1,260 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents NVMe Over Fabric Target configfs snapshot.
+"""
+
+import os
+from collections import namedtuple
+from types import MappingProxyType
+
+from utils.const import Const
+
+
+SnapshotNamespace = namedtuple('SnapshotNamespace',
+                               ['nqn', 'nsid', 'path', 'attrs'])
+SnapshotSubsystem = namedtuple('SnapshotSubsystem',
+                               ['nqn', 'path', 'attrs', 'namespaces',
+                                'allowed_hosts'])
+SnapshotPort = namedtuple('SnapshotPort',
+                          ['port_id', 'path', 'attrs', 'subsystems',
+                           'referrals'])
+SnapshotHost = namedtuple('SnapshotHost', ['nqn', 'path', 'attrs'])
+
+
+class TargetSnapshot(object):
+    """
+    Represents an immutable view of the nvmet configfs tree read in a
+    single scandir pass over subsystems, namespaces, ports, hosts and
+    their links.
+
+        - Attributes :
+            - cfgfs : configfs mount point.
+            - subsystems : tuple of SnapshotSubsystem sorted by nqn.
+            - ports : tuple of SnapshotPort sorted by port id.
+            - hosts : tuple of SnapshotHost sorted by nqn.
+    """
+    __slots__ = ['cfgfs', 'subsystems', 'ports', 'hosts',
+                 '_subsys_index', '_ns_index', '_port_index',
+                 '_host_index', '_nqn_port_index']
+
+    def __init__(self, cfgfs, subsystems, ports, hosts):
+        nqn_ports = {}
+        for port in ports:
+            for nqn in port.subsystems:
+                nqn_ports.setdefault(nqn, []).append(port)
+        ns_index = {}
+        for subsys in subsystems:
+            for ns in subsys.namespaces:
+                ns_index[(ns.nqn, ns.nsid)] = ns
+
+        init = object.__setattr__
+        init(self, 'cfgfs', cfgfs)
+        init(self, 'subsystems', tuple(subsystems))
+        init(self, 'ports', tuple(ports))
+        init(self, 'hosts', tuple(hosts))
+        init(self, '_subsys_index',
+             MappingProxyType(dict((s.nqn, s) for s in subsystems)))
+        init(self, '_ns_index', MappingProxyType(ns_index))
+        init(self, '_port_index',
+             MappingProxyType(dict((p.port_id, p) for p in ports)))
+        init(self, '_host_index',
+             MappingProxyType(dict((h.nqn, h) for h in hosts)))
+        init(self, '_nqn_port_index',
+             MappingProxyType(dict((nqn, tuple(p))
+                                   for nqn, p in nqn_ports.items())))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("target snapshot is read only")
+
+    def __delattr__(self, name):
+        raise AttributeError("target snapshot is read only")
+
+    @staticmethod
+    def read_attrs(path, entries):
+        """ Read all readable attribute files of a configfs group.
+            - Args :
+                - path : group directory path.
+                - entries : scandir entries of the group.
+            - Returns :
+                - read only attribute dictionary.
+        """
+        attrs = {}
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                with open(path + entry.name, "r") as attr_file:
+                    attrs[entry.name] = attr_file.read().rstrip('\n')
+            except (IOError, OSError):
+                # write only attribute or object went away
+                continue
+        return MappingProxyType(attrs)
+
+    @staticmethod
+    def scan(path):
+        """ List group directory.
+            - Args :
+                - path : group directory path.
+            - Returns :
+                - list of scandir entries, empty list if path is missing.
+        """
+        try:
+            with os.scandir(path) as it:
+                return list(it)
+        except OSError:
+            return []
+
+    @staticmethod
+    def links(path):
+        """ List names of symlinks in a configfs group.
+            - Args :
+                - path : group directory path.
+            - Returns :
+                - sorted tuple of link names.
+        """
+        return tuple(sorted(entry.name for entry in TargetSnapshot.scan(path)
+                            if entry.is_symlink()))
+
+    @staticmethod
+    def read(cfgfs=Const.SYSFS_DEFAULT_MOUNT_PATH):
+        """ Walk nvmet configfs tree and build snapshot.
+            - Args :
+                - cfgfs : configfs mount point.
+            - Returns :
+                - TargetSnapshot.
+        """
+        subsystems = []
+        subsys_dir = cfgfs + Const.SYSFS_NVMET_SUBSYS
+        for entry in TargetSnapshot.scan(subsys_dir):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            nqn = entry.name
+            path = subsys_dir + nqn + "/"
+            entries = TargetSnapshot.scan(path)
+            namespaces = []
+            ns_dir = path + Const.SYSFS_NVMET_SUBSYS_NS
+            for ns_entry in TargetSnapshot.scan(ns_dir):
+                if not ns_entry.is_dir(follow_symlinks=False):
+                    continue
+                ns_path = ns_dir + ns_entry.name + "/"
+                ns_attrs = TargetSnapshot.read_attrs(
+                    ns_path, TargetSnapshot.scan(ns_path))
+                namespaces.append(SnapshotNamespace(nqn, int(ns_entry.name),
+                                                    ns_path, ns_attrs))
+            namespaces.sort(key=lambda ns: ns.nsid)
+            subsystems.append(SnapshotSubsystem(
+                nqn, path, TargetSnapshot.read_attrs(path, entries),
+                tuple(namespaces),
+                TargetSnapshot.links(path + "allowed_hosts")))
+        subsystems.sort(key=lambda subsys: subsys.nqn)
+
+        ports = []
+        port_dir = cfgfs + Const.SYSFS_NVMET_PORTS
+        for entry in TargetSnapshot.scan(port_dir):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            path = port_dir + entry.name + "/"
+            entries = TargetSnapshot.scan(path)
+            referrals = tuple(sorted(
+                ref.name for ref in TargetSnapshot.scan(path + "referrals")
+                if ref.is_dir(follow_symlinks=False)))
+            ports.append(SnapshotPort(
+                entry.name, path, TargetSnapshot.read_attrs(path, entries),
+                TargetSnapshot.links(path + "subsystems"), referrals))
+        ports.sort(key=lambda port: port.port_id)
+
+        hosts = []
+        host_dir = cfgfs + Const.SYSFS_NVMET_HOSTS
+        for entry in TargetSnapshot.scan(host_dir):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            path = host_dir + entry.name + "/"
+            hosts.append(SnapshotHost(
+                entry.name, path,
+                TargetSnapshot.read_attrs(path, TargetSnapshot.scan(path))))
+        hosts.sort(key=lambda host: host.nqn)
+
+        return TargetSnapshot(cfgfs, subsystems, ports, hosts)
+
+    def subsys(self, nqn):
+        """ Lookup subsystem by nqn.
+            - Args :
+                - nqn : subsystem nqn.
+            - Returns :
+                - SnapshotSubsystem, None if not present.
+        """
+        return self._subsys_index.get(nqn)
+
+    def ns(self, nqn, nsid):
+        """ Lookup namespace by subsystem nqn and nsid.
+            - Args :
+                - nqn : subsystem nqn.
+                - nsid : namespace id.
+            - Returns :
+                - SnapshotNamespace, None if not present.
+        """
+        return self._ns_index.get((nqn, int(nsid)))
+
+    def port(self, port_id):
+        """ Lookup port by port id.
+            - Args :
+                - port_id : port id.
+            - Returns :
+                - SnapshotPort, None if not present.
+        """
+        return self._port_index.get(str(port_id))
+
+    def host(self, nqn):
+        """ Lookup host by host nqn.
+            - Args :
+                - nqn : host nqn.
+            - Returns :
+                - SnapshotHost, None if not present.
+        """
+        return self._host_index.get(nqn)
+
+    def ports_for(self, nqn):
+        """ Lookup ports linked to subsystem.
+            - Args :
+                - nqn : subsystem nqn.
+            - Returns :
+                - tuple of SnapshotPort.
+        """
+        return self._nqn_port_index.get(nqn, ())
+
+    def state(self):
+        """ Convert snapshot into TargetDiff normalized state.
+            - Args :
+                - None.
+            - Returns :
+                - normalized state dictionary.
+        """
+        state = {'subsystems': {}, 'ports': {}}
+        for subsys in self.subsystems:
+            entry = {'namespaces': {}}
+            entry.update(subsys.attrs)
+            for ns in subsys.namespaces:
+                entry['namespaces'][str(ns.nsid)] = dict(ns.attrs)
+            state['subsystems'][subsys.nqn] = entry
+        for port in self.ports:
+            entry = dict(port.attrs)
+            entry['subsystems'] = set(port.subsystems)
+            state['ports'][port.port_id] = entry
+        return state
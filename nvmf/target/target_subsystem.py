@@ -22,11 +22,13 @@
 
 import os
 import shutil
+import threading
 
-from utils.shell import Cmd
+from utils.configfs import Configfs
 from utils.const import Const
 from utils.log import Log
 from nvmf.target.target_ns import NVMFTargetNamespace
+from nvmf.target.target_nsid import NSIDAllocator
 
 
 class NVMFTargetSubsystem(object):
@@ -40,6 +42,7 @@ class NVMFTargetSubsystem(object):
             - subsys_path : subsystem path in configfs.
             - allowed_hosts : configfs allowed host attribute.
             - attr_allow_any_host : configfs allow any host attribute.
+            - nsid_alloc : namespace id allocator.
     """
     def __init__(self, cfgfs, nqn, allowed_hosts, attr_allow_any_host):
         self.ns_list = []
@@ -50,6 +53,8 @@ class NVMFTargetSubsystem(object):
         self.attr_allow_any_host = attr_allow_any_host
         self.logger = Log.get_logger(__name__, 'target_subsystem')
         self.ns_list_index = 0
+        self.nsid_alloc = NSIDAllocator()
+        self.lock = threading.Lock()
 
     def __iter__(self):
         self.ns_list_index = 0
@@ -75,21 +80,50 @@ class NVMFTargetSubsystem(object):
         """
         # create subsystem dir
         self.logger.info("Creating subsys path " + self.subsys_path + ".")
-        try:
-            os.makedirs(self.subsys_path)
-        except Exception, err:
-            self.logger.error(str(err) + ".")
+        if Configfs.mkdir(self.subsys_path) is False:
             return False
         # allow any host
         self.logger.info("Configuring allowed hosts ...")
-        ret = Cmd.exec_cmd("echo " + self.attr_allow_any_host + " >" +
-                           self.subsys_path + "/attr_allow_any_host")
+        ret = Configfs.write_attr(self.subsys_path + "attr_allow_any_host",
+                                  self.attr_allow_any_host)
         if ret is False:
             self.logger.error(self.subsys_path + " creation failed.")
         else:
             self.logger.info(self.subsys_path + " created successfully.")
         return ret
 
+    def alloc_ns(self, **ns_attr):
+        """ Allocate namespace id and build namespace object, the
+            namespace is not created in configfs.
+            - Args :
+                - ns_attr : namespace attributes, 'nsid' is honored when
+                            present.
+            - Returns :
+                - namespace handle on success, None if nsid is not available.
+        """
+        nsid = ns_attr.get('nsid')
+        ns_id = self.nsid_alloc.alloc(nsid)
+        if ns_id is None:
+            self.logger.error("nsid " + str(nsid) + " not available in " +
+                              self.nqn + ".")
+            return None
+        return NVMFTargetNamespace(self.cfgfs, self.nqn, ns_id, **ns_attr)
+
+    def init_ns(self, ns):
+        """ Create and initialize namespace built by alloc_ns(), on failure
+            remove what was created and release its namespace id.
+            - Args :
+                - ns : target namespace object.
+            - Returns :
+                - True on success, False on failure.
+        """
+        if ns.init() is True:
+            return True
+        if os.path.exists(ns.ns_path):
+            ns.delete()
+        self.nsid_alloc.free(ns.ns_id)
+        return False
+
     def create_ns(self, **ns_attr):
         """ Create, initialize and store namespace in subsystem's list.
             - Args :
@@ -97,16 +131,17 @@ class NVMFTargetSubsystem(object):
             - Returns :
                 - namespace handle on success, None on error.
         """
-        ns_id = len(self.ns_list) + 1
-
-        ns = NVMFTargetNamespace(self.cfgfs, self.nqn, ns_id, **ns_attr)
-        if ns.init() is False:
+        ns = self.alloc_ns(**ns_attr)
+        if ns is None:
+            return None
+        if self.init_ns(ns) is False:
             return None
-        self.ns_list.append(ns)
+        with self.lock:
+            self.ns_list.append(ns)
         return ns
 
     def delete_ns(self, ns):
-        """ Delete single namespace.
+        """ Delete single namespace and release its namespace id.
             - Args :
                 - ns : target namespace object to be deleted.
             - Returns :
@@ -118,6 +153,10 @@ class NVMFTargetSubsystem(object):
         if ret is False:
             self.logger.error("delete ns failed for " + ns.ns_path + ".")
 
+        with self.lock:
+            if ns in self.ns_list:
+                self.ns_list.remove(ns)
+        self.nsid_alloc.free(ns.ns_id)
         return ret
 
     def delete(self):
@@ -129,7 +168,7 @@ class NVMFTargetSubsystem(object):
         """
         self.logger.info("Deleting subsystem " + self.nqn)
         ret = True
-        for ns in iter(self):
+        for ns in list(self.ns_list):
             if self.delete_ns(ns) is False:
                 # try and continue deleting namespaces for cleanup after error
                 ret = False
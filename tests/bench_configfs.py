@@ -0,0 +1,157 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF target configfs provisioning benchmark :-
+
+    1. Create a tmpfs stand-in for the nvmet configfs tree.
+    2. Provision subsystems and namespaces with shell echo (legacy path).
+    3. Provision subsystems and namespaces with direct configfs I/O.
+    4. Report subsystems-and-namespaces-per-second for both.
+
+    Usage (from $NVMFTESTSHOME/tests) :-
+        # python3 bench_configfs.py --nr-subsys 50 --nr-ns 10
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+sys.path.append("../")
+from utils.shell import Cmd
+from utils.const import Const
+from nvmf.target.target_subsystem import NVMFTargetSubsystem
+
+
+def standin_root():
+    """ Create stand-in configfs root on tmpfs when available.
+        - Args :
+            - None.
+        - Returns :
+            - stand-in root path.
+    """
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    return tempfile.mkdtemp(prefix="nvmftests-cfgfs-", dir=base) + "/"
+
+
+def provision_echo(cfgfs, nr_subsys, nr_ns, dev):
+    """ Provision stand-in tree the way target did with shell echo.
+        - Args :
+            - cfgfs : stand-in configfs root.
+            - nr_subsys : number of subsystems.
+            - nr_ns : number of namespaces per subsystem.
+            - dev : namespace device path.
+        - Returns :
+            - True on success, False on failure.
+    """
+    for i in range(nr_subsys):
+        subsys_path = cfgfs + Const.SYSFS_NVMET_SUBSYS + \
+            "testnqn" + str(i + 1) + "/"
+        os.makedirs(subsys_path)
+        if Cmd.exec_cmd("echo 1 >" + subsys_path +
+                        "/attr_allow_any_host") is False:
+            return False
+        for j in range(nr_ns):
+            ns_path = subsys_path + Const.SYSFS_NVMET_SUBSYS_NS + \
+                str(j + 1) + "/"
+            os.makedirs(ns_path)
+            if Cmd.exec_cmd("echo -n " + dev + " > " + ns_path +
+                            "/device_path") is False:
+                return False
+            if Cmd.exec_cmd("echo 1 > " + ns_path + "/enable") is False:
+                return False
+    return True
+
+
+def provision_configfs(cfgfs, nr_subsys, nr_ns, dev):
+    """ Provision stand-in tree through target subsystem and namespace.
+        - Args :
+            - cfgfs : stand-in configfs root.
+            - nr_subsys : number of subsystems.
+            - nr_ns : number of namespaces per subsystem.
+            - dev : namespace device path.
+        - Returns :
+            - True on success, False on failure.
+    """
+    for i in range(nr_subsys):
+        subsys = NVMFTargetSubsystem(cfgfs, "testnqn" + str(i + 1),
+                                     "hostnqn", "1")
+        if subsys.init() is False:
+            return False
+        for j in range(nr_ns):
+            ns_attr = {}
+            ns_attr['device_nguid'] = "00000000-0000-0000-0000-000000000000"
+            ns_attr['device_path'] = dev
+            ns_attr['enable'] = '1'
+            ns_attr['nsid'] = str(j + 1)
+            if subsys.create_ns(**ns_attr) is None:
+                return False
+    return True
+
+
+def run_bench(name, func, nr_subsys, nr_ns, dev):
+    """ Time one provisioning method on a fresh stand-in tree.
+        - Args :
+            - name : benchmark name.
+            - func : provisioning function.
+            - nr_subsys : number of subsystems.
+            - nr_ns : number of namespaces per subsystem.
+            - dev : namespace device path.
+        - Returns :
+            - objects per second, None on failure.
+    """
+    cfgfs = standin_root()
+    try:
+        start = time.time()
+        ret = func(cfgfs, nr_subsys, nr_ns, dev)
+        elapsed = time.time() - start
+    finally:
+        shutil.rmtree(cfgfs, ignore_errors=True)
+    if ret is False:
+        print(name + " : provisioning failed.")
+        return None
+    nr_obj = nr_subsys + nr_subsys * nr_ns
+    rate = nr_obj / elapsed
+    print("%-10s %6d objs %8.3f s %10.1f objs/s" %
+          (name, nr_obj, elapsed, rate))
+    return rate
+
+
+def main():
+    """ Benchmark main """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--nr-subsys", type=int, default=50)
+    parser.add_argument("--nr-ns", type=int, default=10)
+    parser.add_argument("--dev", default="/dev/nvme0n1")
+    args = parser.parse_args()
+
+    echo = run_bench("echo", provision_echo,
+                     args.nr_subsys, args.nr_ns, args.dev)
+    cfgfs = run_bench("configfs", provision_configfs,
+                      args.nr_subsys, args.nr_ns, args.dev)
+    if echo is None or cfgfs is None:
+        return 1
+    print("speedup    %.1fx" % (cfgfs / echo))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF target namespace id allocation benchmark :-
+
+    1. Allocate and free ids with a linear scan of the ids in use.
+    2. Allocate and free ids with the subsystem nsid allocator.
+    3. Create, delete and re-create namespaces spread over several
+       subsystems on a tmpfs stand-in configfs tree, including sparse
+       explicit nsids.
+    4. Report ids-per-second for each.
+
+    Usage (from $NVMFTESTSHOME/tests) :-
+        # python3 bench_nsid.py --nr-ids 10000 --nr-subsys 4
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import argparse
+sys.path.append("../")
+from nvmf.target.target_nsid import NSIDAllocator
+from nvmf.target.target_subsystem import NVMFTargetSubsystem
+
+
+def standin_root():
+    """ Create stand-in configfs root on tmpfs when available.
+        - Args :
+            - None.
+        - Returns :
+            - stand-in root path.
+    """
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    return tempfile.mkdtemp(prefix="nvmftests-nsid-", dir=base) + "/"
+
+
+def churn_scan(nr_ids, seed):
+    """ Allocate, free half at random and re-allocate with linear scan.
+        - Args :
+            - nr_ids : number of ids.
+            - seed : random seed for free order.
+        - Returns :
+            - number of allocations done.
+    """
+    def scan(ids):
+        used = set(ids)
+        nsid = 1
+        while nsid in used:
+            nsid += 1
+        return nsid
+
+    ids = []
+    for _ in range(nr_ids):
+        ids.append(scan(ids))
+    victims = random.Random(seed).sample(ids, nr_ids // 2)
+    for nsid in victims:
+        ids.remove(nsid)
+    for _ in victims:
+        ids.append(scan(ids))
+    return nr_ids + len(victims)
+
+
+def churn_alloc(nr_ids, seed):
+    """ Allocate, free half at random and re-allocate with NSIDAllocator.
+        - Args :
+            - nr_ids : number of ids.
+            - seed : random seed for free order.
+        - Returns :
+            - number of allocations done, None on failure.
+    """
+    alloc = NSIDAllocator()
+    ids = [alloc.alloc() for _ in range(nr_ids)]
+    victims = random.Random(seed).sample(ids, nr_ids // 2)
+    for nsid in victims:
+        alloc.free(nsid)
+    for _ in victims:
+        if alloc.alloc() is None:
+            return None
+    if alloc.nr_allocated != nr_ids:
+        return None
+    return nr_ids + len(victims)
+
+
+def churn_configfs(nr_ids, seed, nr_subsys):
+    """ Create namespaces round robin over subsystems, delete half across
+        all subsystems and re-create them on stand-in tree, then add
+        sparse explicit nsids near the top of each id space.
+        - Args :
+            - nr_ids : number of namespaces.
+            - seed : random seed for delete order.
+            - nr_subsys : number of subsystems.
+        - Returns :
+            - number of namespaces created, None on failure.
+    """
+    cfgfs = standin_root()
+    try:
+        subsys_list = []
+        for i in range(nr_subsys):
+            subsys = NVMFTargetSubsystem(cfgfs, "testnqn" + str(i + 1),
+                                         "hostnqn", "1")
+            if subsys.init() is False:
+                return None
+            subsys_list.append(subsys)
+        ns_attr = {}
+        ns_attr['device_nguid'] = "00000000-0000-0000-0000-000000000000"
+        ns_attr['device_path'] = "/dev/nvme0n1"
+        ns_attr['enable'] = '0'
+        for i in range(nr_ids):
+            if subsys_list[i % nr_subsys].create_ns(**ns_attr) is None:
+                return None
+        ns_list = [(subsys, ns) for subsys in subsys_list
+                   for ns in subsys.ns_list]
+        victims = random.Random(seed).sample(ns_list, nr_ids // 2)
+        for subsys, ns in victims:
+            if subsys.delete_ns(ns) is False:
+                return None
+        for subsys, _ in victims:
+            if subsys.create_ns(**ns_attr) is None:
+                return None
+        for subsys in subsys_list:
+            for i in range(16):
+                ns_attr['nsid'] = str(subsys.nsid_alloc.max_nsid - i * 4096)
+                if subsys.create_ns(**ns_attr) is None:
+                    return None
+            del ns_attr['nsid']
+        nr_sparse = 16 * nr_subsys
+        if sum(len(subsys.ns_list) for subsys in subsys_list) != \
+           nr_ids + nr_sparse:
+            return None
+        return nr_ids + len(victims) + nr_sparse
+    finally:
+        shutil.rmtree(cfgfs, ignore_errors=True)
+
+
+def run_bench(name, func, nr_ids, seed):
+    """ Time one allocation method.
+        - Args :
+            - name : benchmark name.
+            - func : churn function.
+            - nr_ids : number of ids.
+            - seed : random seed.
+        - Returns :
+            - ids per second, None on failure.
+    """
+    start = time.time()
+    nr_done = func(nr_ids, seed)
+    elapsed = time.time() - start
+    if nr_done is None:
+        print(name + " : allocation failed.")
+        return None
+    rate = nr_done / elapsed
+    print("%-10s %8d ids %8.3f s %12.1f ids/s" %
+          (name, nr_done, elapsed, rate))
+    return rate
+
+
+def main():
+    """ Benchmark main """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--nr-ids", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--nr-subsys", type=int, default=4)
+    args = parser.parse_args()
+
+    scan = run_bench("scan", churn_scan, args.nr_ids, args.seed)
+    alloc = run_bench("allocator", churn_alloc, args.nr_ids, args.seed)
+    cfgfs = run_bench("configfs",
+                      lambda nr_ids, seed: churn_configfs(nr_ids, seed,
+                                                          args.nr_subsys),
+                      args.nr_ids, args.seed)
+    if scan is None or alloc is None or cfgfs is None:
+        return 1
+    print("speedup    %.1fx" % (alloc / scan))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
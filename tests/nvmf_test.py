@@ -22,14 +22,19 @@
 
 import os
 import sys
-import json
 from nose.tools import assert_equal
 
+from utils.config import Config
 from utils.const import Const
+from utils.kmod import ModuleManager
+from utils.log import Log
+from utils.misc import KeyedExecutor
 from utils.diskio import DD
 from utils.diskio import FIO
 from nvmf.target import NVMFTarget
 from nvmf.host import NVMFHost
+from nvmf.host import IdentifyCache
+from nvmf.host import NVMFWorkloadScheduler
 from nvmf.target.target_config_generator import TargetConfig
 from nvmf_test_logger import NVMFLogger
 
@@ -39,7 +44,7 @@ def __dd_worker__(iocfg):
         - Args :
             - iocfg : io configuration.
         - Returns :
-            - Return value of dd command.
+            - IOResult of dd command.
     """
     return DD.run_io(iocfg)
 
@@ -49,7 +54,7 @@ def __fio_worker__(iocfg):
         - Args :
             - iocfg : io configuration.
         - Returns :
-            - Return value of fio command.
+            - IOResult of fio command.
     """
     return FIO.run_io(iocfg)
 
@@ -60,7 +65,7 @@ class NVMFTest(object):
 
     def __init__(self):
         # TODO : make this dictionary
-        self.config_file = 'config/nvmftests.json'
+        self.config_file = Const.TEST_CONFIG_FILE
         self.data_size = 0
         self.block_size = 0
         self.nr_dev = 0
@@ -69,6 +74,8 @@ class NVMFTest(object):
         self.nr_dev = 0
         self.nr_target_subsys = 0
         self.nr_ns_per_subsys = 0
+        self.nr_target_ports = Const.TARGET_NR_PORTS
+        self.port_policy = Const.PORT_POLICY_ROUND_ROBIN
         self.target_config_file = Const.XXX
         self.target_type = Const.XXX
         self.loopdev = None
@@ -81,6 +88,7 @@ class NVMFTest(object):
         self.dd_read = {}
         self.dd_write = {}
         self.blk_dev_pool = []
+        self.keep_modules = False
 
         self.load_config()
 
@@ -91,60 +99,59 @@ class NVMFTest(object):
             - Returns :
                 - None.
         """
-        with open(self.config_file) as cfg_file:
-            cfg = json.load(cfg_file)
-            # target subsystem and namespsce config
-            self.nr_dev = int(cfg['nr_dev'])
-            self.nr_target_subsys = int(cfg['nr_target_subsys'])
-            self.nr_ns_per_subsys = int(cfg['nr_ns_per_subsys'])
-            self.target_config_file = cfg['target_config_file']
-            target_cfg = TargetConfig(self.target_config_file,
-                                      self.nr_target_subsys,
-                                      self.nr_ns_per_subsys,
-                                      dev_list)
-            target_cfg.build_target_subsys()
+        cfg = Config.session(self.config_file)
+        # target subsystem and namespsce config
+        self.nr_dev = cfg.nr_dev
+        self.nr_target_subsys = cfg.nr_target_subsys
+        self.nr_ns_per_subsys = cfg.nr_ns_per_subsys
+        self.target_config_file = cfg.target_config_file
+        self.nr_target_ports = cfg.nr_target_ports
+        self.port_policy = cfg.port_policy
+        target_cfg = TargetConfig(self.target_config_file,
+                                  self.nr_target_subsys,
+                                  self.nr_ns_per_subsys,
+                                  dev_list,
+                                  self.nr_target_ports,
+                                  self.port_policy)
+        target_cfg.build_target_subsys(cfg.target_config_compact)
 
     def load_config(self):
-        """ Load basic test configuration.
+        """ Load basic test configuration from shared test config.
             - Args :
                 - None.
             - Returns :
                 - True on success, False on failure.
         """
-        with open(self.config_file) as nvmftest_config:
-            cfg = json.load(nvmftest_config)
-            self.mount_path = cfg['mount_path']
-            self.data_size = self.human_to_bytes(cfg['data_size'])
-            self.block_size = self.human_to_bytes(cfg['block_size'])
-            self.nr_dev = int(cfg['nr_dev'])
-            # fio device read
-            self.fio_read = cfg['fio_read']
-            self.fio_read['filename'] = Const.XXX
-            self.fio_read['THREAD'] = __fio_worker__
-            self.fio_read['RC'] = 0
-            # fio file system write
-            self.fio_fs_write = cfg['fio_fs_write']
-            self.fio_fs_write['directory'] = Const.XXX
-            self.fio_fs_write['THREAD'] = __fio_worker__
-            self.fio_fs_write['RC'] = 0
-            # dd write
-            self.dd_read = cfg['dd_read']
-            self.dd_read['THREAD'] = __dd_worker__
-            self.dd_read['IF'] = None
-            self.dd_read['COUNT'] = str(self.data_size / self.block_size)
-            self.dd_read['RC'] = 0
-            # dd read
-            self.dd_write = cfg['dd_write']
-            self.dd_write['THREAD'] = __dd_worker__
-            self.dd_write['OF'] = None
-            self.dd_write['COUNT'] = str(self.data_size / self.block_size)
-            self.dd_write['RC'] = 0
-
-            self.target_type = cfg['target_type']
-            # block_dev_pool
-            self.blk_dev_pool = cfg['block_dev_pool']
-            return True
-        return False
+        cfg = Config.session(self.config_file)
+        self.mount_path = cfg.mount_path
+        self.data_size = cfg.data_size
+        self.block_size = cfg.block_size
+        self.nr_dev = cfg.nr_dev
+        count = str(self.data_size // self.block_size)
+        # fio device read
+        self.fio_read = cfg.io_profiles['fio_read'].iocfg(
+            filename=Const.XXX, THREAD=__fio_worker__, RC=0)
+        # fio file system write
+        self.fio_fs_write = cfg.io_profiles['fio_fs_write'].iocfg(
+            directory=Const.XXX, THREAD=__fio_worker__, RC=0)
+        # dd read
+        self.dd_read = cfg.io_profiles['dd_read'].iocfg(
+            THREAD=__dd_worker__, IF=None, COUNT=count, RC=0)
+        # dd write
+        self.dd_write = cfg.io_profiles['dd_write'].iocfg(
+            THREAD=__dd_worker__, OF=None, COUNT=count, RC=0)
+
+        self.target_type = cfg.target_type
+        # block_dev_pool
+        self.blk_dev_pool = list(cfg.blk_dev_pool)
+        # leave target modules loaded between testcases
+        self.keep_modules = cfg.keep_modules
+        # desired kernel module parameters
+        for name, params in cfg.module_params.items():
+            ModuleManager.set_params(name, **params)
+        # IO jobs of all namespaces share one bounded executor
+        KeyedExecutor.set_shared(cfg.nr_io_workers)
+        return True
 
     def human_to_bytes(self, num_str):
         """ Converts human readble format to bytes.
@@ -153,15 +160,8 @@ class NVMFTest(object):
             Returns :
               - On success decimal equivalant of num_str, 0 on failure.
         """
-        decimal_bytes = 0
-        num_suffix = str(num_str[-2:]).upper()
-        if num_suffix == Const.KB:
-            decimal_bytes = int(num_str.split("K")[0]) * Const.ONE_KB
-        elif num_suffix == Const.MB:
-            decimal_bytes = int(num_str.split("M")[0]) * Const.ONE_MB
-        elif num_suffix == Const.GB:
-            decimal_bytes = int(num_str.split("G")[0]) * Const.ONE_GB
-        else:
+        decimal_bytes = Config.human_to_bytes(num_str)
+        if decimal_bytes == 0:
             print(self.err_str + "invalid suffix " + num_str)
 
         return decimal_bytes
@@ -176,8 +176,51 @@ class NVMFTest(object):
         self.test_log_dir = self.log_dir + "/" + test_name
         if not os.path.exists(self.test_log_dir):
             os.makedirs(self.test_log_dir)
-        sys.stdout = NVMFLogger(self.test_log_dir + "/" + "stdout.log")
-        sys.stderr = NVMFLogger(self.test_log_dir + "/" + "stderr.log")
+        self.close_log_dir()
+        cfg = Config.session(self.config_file)
+        capture = {}
+        capture['buffer_size'] = cfg.capture_buffer_size
+        capture['max_size'] = cfg.capture_max_size
+        capture['backup_count'] = cfg.capture_backup_count
+        capture['flush_interval'] = cfg.capture_flush_interval
+        sys.stdout = NVMFLogger(self.test_log_dir + "/" + "stdout.log",
+                                sys.__stdout__, **capture)
+        sys.stderr = NVMFLogger(self.test_log_dir + "/" + "stderr.log",
+                                sys.__stderr__, **capture)
+        Log.set_log_file(self.test_log_dir + "/" + "framework.log")
+        ModuleManager.reset_stats()
+        IdentifyCache.reset_stats()
+
+    def close_log_dir(self):
+        """ Flush and close stdout/stderr capture of previous testcase.
+            Args :
+              - None.
+            Returns :
+              - None.
+        """
+        if isinstance(sys.stdout, NVMFLogger):
+            sys.stdout.close()
+            sys.stdout = sys.__stdout__
+        if isinstance(sys.stderr, NVMFLogger):
+            sys.stderr.close()
+            sys.stderr = sys.__stderr__
+
+    def report_module_stats(self):
+        """ Print time spent in kernel module operations and identify
+            cache use of this testcase.
+            Args :
+              - None.
+            Returns :
+              - None.
+        """
+        stats = ModuleManager.get_stats()
+        for op in sorted(stats):
+            count, seconds = stats[op]
+            print("module " + op + " : " + str(count) + " in " +
+                  "%.3f" % seconds + " s")
+        hits, misses = IdentifyCache.get_stats()
+        print("identify cache : " + str(hits) + " hits " + str(misses) +
+              " misses")
 
     def common_setup(self):
         """ Common test case setup function.
@@ -189,9 +232,24 @@ class NVMFTest(object):
         self.target_subsys = NVMFTarget(self.target_type)
         ret = self.target_subsys.config(self.target_config_file)
         assert_equal(ret, True, "ERROR : target config failed")
-        self.host_subsys = NVMFHost(self.target_type)
+        cfg = Config.session(self.config_file)
+        self.host_subsys = NVMFHost(self.target_type, cfg.nr_host_workers)
+        ret = self.host_subsys.set_io_mode(cfg.io_mode, cfg.async_max_jobs,
+                                           cfg.async_ctrl_jobs)
+        assert_equal(ret, True, "ERROR : invalid io mode")
+        if cfg.sched_replay != "":
+            self.host_subsys.scheduler = \
+                NVMFWorkloadScheduler.load(cfg.sched_replay)
+        else:
+            assert_equal(cfg.sched_policy in NVMFWorkloadScheduler.POLICIES,
+                         True, "ERROR : invalid scheduler policy")
+            self.host_subsys.scheduler = NVMFWorkloadScheduler(
+                cfg.sched_policy, cfg.sched_seed, cfg.sched_jobs,
+                cfg.sched_hot_fraction, cfg.sched_hot_weight)
         ret = self.host_subsys.config(self.target_config_file)
         assert_equal(ret, True, "ERROR : host config failed")
+        self.host_subsys.start_smart_sampler(cfg.smart_interval,
+                                             cfg.smart_ring_size)
 
     def common_tear_down(self):
         """ Common test case tear down function.
@@ -200,5 +258,13 @@ class NVMFTest(object):
             Returns :
               - None.
         """
+        print(self.host_subsys.connect_stats.report())
+        cfg = Config.session(self.config_file)
+        scheduler = self.host_subsys.scheduler
+        if cfg.sched_record != "" and len(scheduler.runs):
+            scheduler.save(self.test_log_dir + "/" + cfg.sched_record)
         self.host_subsys.delete()
-        self.target_subsys.delete()
+        self.target_subsys.delete(self.keep_modules)
+        self.report_module_stats()
+        sys.stdout.flush()
+        sys.stderr.flush()
@@ -19,32 +19,165 @@
 #
 """Logger for NVMe Test Framwwork.
 """
+import os
 import sys
+import atexit
+import threading
 
 
 class NVMFLogger(object):
-    """ Represents Logger for NVMe Testframework.  """
-    def __init__(self, log_file_path):
+    """ Represents buffered tee of a console stream into a rotating log
+        file for NVMe Testframework.
+
+        - Attributes :
+            - terminal : console stream, never another NVMFLogger.
+            - log_file_path : path to store the log.
+            - buffer_size : buffered bytes which trigger a flush.
+            - max_size : log file size which triggers rotation, 0 to
+                         never rotate.
+            - backup_count : number of rotated files kept.
+            - flush_interval : seconds between periodic flushes.
+    """
+    open_loggers = set()
+    open_lock = threading.Lock()
+
+    def __init__(self, log_file_path, terminal=None, buffer_size=64 * 1024,
+                 max_size=0, backup_count=1, flush_interval=1.0):
         """ Logger setup.
             - Args :
                 - log_file_path : path to store the log.
+                - terminal : console stream, default sys.__stdout__.
+                - buffer_size : buffered bytes which trigger a flush.
+                - max_size : file size which triggers rotation.
+                - backup_count : number of rotated files kept.
+                - flush_interval : seconds between periodic flushes.
         """
-        self.terminal = sys.stdout
+        self.terminal = terminal if terminal is not None else sys.__stdout__
+        self.log_file_path = log_file_path
+        self.buffer_size = buffer_size
+        self.max_size = max_size
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.buf = []
+        self.buf_len = 0
+        self.lock = threading.Lock()
         self.log = open(log_file_path, "w")
+        self.log_size = 0
+        self.closed = False
+        self.stop_event = threading.Event()
+        self.flusher = threading.Thread(target=self.flush_periodic,
+                                        name="NVMFLogger-flush")
+        self.flusher.daemon = True
+        self.flusher.start()
+        with NVMFLogger.open_lock:
+            NVMFLogger.open_loggers.add(self)
 
     def write(self, log_message):
-        """ Logger write.
+        """ Logger write, buffered until flush.
             - Args :
                 - log_message : string to write in the log file.
             - Returns:
                 - None.
         """
-        self.terminal.write(log_message)
-        self.log.write(log_message)
+        with self.lock:
+            if self.closed:
+                self.terminal.write(log_message)
+                return
+            self.buf.append(log_message)
+            self.buf_len += len(log_message)
+            if self.buf_len >= self.buffer_size:
+                self.flush_locked()
+
+    def flush_locked(self):
+        """ Write out buffered messages, caller holds lock.
+            - Args :
+                - None.
+            - Returns:
+                - None.
+        """
+        if self.buf_len == 0:
+            return
+        data = "".join(self.buf)
+        self.buf = []
+        self.buf_len = 0
+        self.terminal.write(data)
+        self.terminal.flush()
+        if self.max_size > 0 and self.log_size > 0 and \
+           self.log_size + len(data) > self.max_size:
+            self.rotate()
+        self.log.write(data)
+        self.log.flush()
+        self.log_size += len(data)
+
+    def rotate(self):
+        """ Rotate log file, log -> log.1 -> ... -> log.<backup_count>.
+            - Args :
+                - None.
+            - Returns:
+                - None.
+        """
+        self.log.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.log_file_path + "." + str(i)
+            if os.path.exists(src):
+                os.replace(src, self.log_file_path + "." + str(i + 1))
+        if self.backup_count > 0:
+            os.replace(self.log_file_path, self.log_file_path + ".1")
+        self.log = open(self.log_file_path, "w")
+        self.log_size = 0
 
     def flush(self):
-        """ This flush method is needed for python 3 compatibility.
-            this handles the flush command by doing nothing.
-            you might want to specify some extra behavior here.
+        """ Write out buffered messages to terminal and log file.
+            - Args :
+                - None.
+            - Returns:
+                - None.
+        """
+        with self.lock:
+            if not self.closed:
+                self.flush_locked()
+
+    def flush_periodic(self):
+        """ Flush thread function, bounds the delay of buffered output.
+            - Args :
+                - None.
+            - Returns:
+                - None.
         """
-        pass
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """ Flush and close log file, further writes go to terminal only.
+            - Args :
+                - None.
+            - Returns:
+                - None.
+        """
+        self.stop_event.set()
+        if self.flusher is not threading.current_thread():
+            self.flusher.join()
+        with self.lock:
+            if self.closed:
+                return
+            self.flush_locked()
+            self.log.close()
+            self.closed = True
+        with NVMFLogger.open_lock:
+            NVMFLogger.open_loggers.discard(self)
+
+    @staticmethod
+    def close_all():
+        """ Close all open loggers, registered to run at exit.
+            - Args :
+                - None.
+            - Returns:
+                - None.
+        """
+        with NVMFLogger.open_lock:
+            loggers = list(NVMFLogger.open_loggers)
+        for logger in loggers:
+            logger.close()
+
+
+atexit.register(NVMFLogger.close_all)
@@ -0,0 +1,73 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF perf history comparison :-
+
+    1. Load the perf history written by test_nvmf_perf.py.
+    2. Compare a run (default latest) against a baseline run or all
+       earlier runs with the same test, topology, workload and
+       environment.
+    3. Flag metrics that got worse by more than the threshold with a
+       permutation test p value below alpha.
+    4. Exit 1 on regression, 2 if there is nothing to compare or too few
+       samples to reach significance (e.g. one namespace and one
+       repetition per run), 0 else.
+
+    Usage (from $NVMFTESTSHOME/tests) :-
+        # python3 perf_compare.py --baseline 3
+"""
+
+import sys
+import argparse
+sys.path.append("../")
+from utils.const import Const
+from nvmf.host.host_perf_history import NVMFPerfHistory
+
+
+def main():
+    """ Comparison main """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--history", default=Const.PERF_HISTORY_FILE)
+    parser.add_argument("--current", type=int, default=None)
+    parser.add_argument("--baseline", type=int, default=None)
+    parser.add_argument("--alpha", type=float, default=Const.PERF_ALPHA)
+    parser.add_argument("--threshold", type=float,
+                        default=Const.PERF_THRESHOLD)
+    args = parser.parse_args()
+
+    ret = NVMFPerfHistory(args.history).compare(args.current, args.baseline,
+                                                args.alpha, args.threshold)
+    if ret is None:
+        print("nothing to compare in " + args.history)
+        return 2
+    current, baseline, findings = ret
+    print(NVMFPerfHistory.report(current, baseline, findings))
+    if any(finding['regression'] for finding in findings):
+        return 1
+    if any(finding['insufficient'] for finding in findings):
+        print("insufficient samples to reach alpha %g, repeat the runs "
+              "(\"perf_history\" \"repeat\") or compare against more "
+              "baseline runs" % args.alpha)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF host admin commands :-
+
+    1. Replace the ioctl interface with a fake NVMe device backend.
+    2. Identify controller, verify the decoded controller attributes.
+    3. Identify namespace, read descriptors and namespace id through the
+       namespace block device.
+    4. Read SMART log, verify the get log page command dwords.
+    5. Verify an error status fails the admin command.
+"""
+
+
+import sys
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from utils.const import Const
+from nvmf.host.host_subsystem import NVMFHostController
+from nvmf.host.host_ns import NVMFHostNamespace
+from nvmf.host.host_admin import NVMeAdmin
+from nvmf.host.host_admin import FakeAdminBackend
+from nvmf.host.host_admin_data import IdCtrl
+from nvmf.host.host_admin_data import IdNs
+from nvmf.host.host_admin_data import NSDescriptor
+from nvmf.host.host_admin_data import SmartLog
+
+
+class TestNVMFHostAdmin(NVMFTest):
+
+    """ Represents host admin command testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.backend = None
+        self.ctrl_dev = "/dev/nvme5"
+        self.ns_dev = "/dev/nvme5n1"
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        self.backend = FakeAdminBackend()
+        self.backend.add_device(self.ctrl_dev)
+        self.backend.add_device(self.ns_dev, 1)
+        id_ctrl = IdCtrl.encode(vid=0x1b96, sn="1234", mn="Linux",
+                                fr="4.14", cntlid=7, nn=1,
+                                subnqn="testnqn1")
+        id_ns = IdNs.encode(lbaf=[(0, 9, 0), (0, 12, 0)], flbas=1,
+                            nsze=2048, ncap=2048, nuse=2048)
+        descs = NSDescriptor.encode_list(
+            [NSDescriptor(2, bytes(range(16))),
+             NSDescriptor(3, bytes(range(16, 32)))])
+        smart = SmartLog.encode(data_units_read=1 << 70,
+                                host_write_commands=42)
+        for dev in [self.ctrl_dev, self.ns_dev]:
+            self.backend.add_page(dev, Const.NVME_ADMIN_IDENTIFY,
+                                  Const.NVME_ID_CNS_CTRL, 0, id_ctrl)
+            self.backend.add_page(dev, Const.NVME_ADMIN_IDENTIFY,
+                                  Const.NVME_ID_CNS_NS, 1, id_ns)
+            self.backend.add_page(dev, Const.NVME_ADMIN_IDENTIFY,
+                                  Const.NVME_ID_CNS_NS_DESC_LIST, 1, descs)
+        self.backend.add_page(self.ctrl_dev, Const.NVME_ADMIN_GET_LOG_PAGE,
+                              Const.NVME_LOG_SMART, Const.NVME_NSID_ALL,
+                              smart)
+        NVMeAdmin.set_backend(self.backend)
+
+    def tearDown(self):
+        """ Post section of testcase """
+        NVMeAdmin.set_backend(None)
+
+    def test_host_admin(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        ctrl = NVMFHostController("testnqn1", "loop")
+        ctrl.ctrl_dev = self.ctrl_dev
+        assert_equal(ctrl.id_ctrl(), True, "ERROR : id-ctrl failed.")
+        assert_equal((ctrl.ctrl_dict['vid'], ctrl.ctrl_dict['sn'],
+                      ctrl.ctrl_dict['mn'], ctrl.ctrl_dict['cntlid'],
+                      ctrl.id_ctrl_data.subnqn),
+                     (0x1b96, "1234", "Linux", 7, "testnqn1"),
+                     "ERROR : wrong identify controller data.")
+
+        host_ns = NVMFHostNamespace(self.ns_dev, "testnqn1")
+        assert_equal(host_ns.id_ns(), True, "ERROR : id-ns failed.")
+        assert_equal((host_ns.id_ns_data.nsze, host_ns.id_ns_data.lba_size()),
+                     (2048, 4096), "ERROR : wrong identify namespace data.")
+        assert_equal(host_ns.get_ns_id(), True, "ERROR : get-ns-id failed.")
+        assert_equal(host_ns.nsid, 1, "ERROR : wrong namespace id.")
+        assert_equal(host_ns.ns_descs(), True, "ERROR : ns-descs failed.")
+        desc_list = NVMeAdmin(self.ns_dev).ns_descs()
+        assert_equal([(desc.type_name(), desc.nid) for desc in desc_list],
+                     [("nguid", bytes(range(16))),
+                      ("uuid", bytes(range(16, 32)))],
+                     "ERROR : wrong namespace descriptors.")
+
+        assert_equal(ctrl.run_smart_log(), True, "ERROR : smart log failed.")
+        smart = NVMeAdmin(self.ctrl_dev).smart_log()
+        assert_equal((smart.data_units_read, smart.host_write_commands),
+                     (1 << 70, 42), "ERROR : wrong smart log data.")
+        assert_equal(self.backend.commands[-1],
+                     (self.ctrl_dev, Const.NVME_ADMIN_GET_LOG_PAGE,
+                      Const.NVME_NSID_ALL,
+                      Const.NVME_LOG_SMART | (127 << 16)),
+                     "ERROR : wrong get log page command.")
+
+        assert_equal(ctrl.run_smart_log(1), False,
+                     "ERROR : unsupported smart log succeeded.")
+        admin = NVMeAdmin(self.ctrl_dev)
+        assert_equal(admin.nsid(), None,
+                     "ERROR : controller has a namespace id.")
+        admin.smart_log(1)
+        assert_equal(admin.status, Const.NVME_SC_INVALID_FIELD,
+                     "ERROR : wrong admin status.")
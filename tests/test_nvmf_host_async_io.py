@@ -0,0 +1,205 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF host asyncio IO orchestration :-
+
+    1. Run thousands of native jobs on many controllers and namespaces
+       from one event loop.
+    2. Verify the global and per controller limits, per namespace order
+       and that no thread is created.
+    3. Run dd jobs as subprocesses, verify exit codes are checked and
+       results are recorded.
+    4. Verify cancel() and timeout kill running dd processes.
+"""
+
+
+import sys
+import time
+import asyncio
+import threading
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from nvmf.host.host_async import NVMFAsyncOrchestrator
+from nvmf.host.host_subsystem import NVMFHostController
+from nvmf.host.host_ns import NVMFHostNamespace
+
+
+class AsyncJobRecorder(object):
+
+    """ Records concurrency and completion order of native jobs """
+
+    running = {}
+    ctrl_active = {}
+    ctrl_peak = {}
+    active = 0
+    peak = 0
+    done = []
+
+
+async def __async_job__(iocfg):
+    """ Native IO job, records concurrency and completion order.
+        - Args :
+            - iocfg : io configuration.
+        - Returns :
+            - True if iocfg['RC'] is 0, False otherwise.
+    """
+    ns_dev, ctrl_dev = iocfg['filename'], iocfg['ctrl']
+    rec = AsyncJobRecorder
+    assert_equal(rec.running.get(ns_dev, False), False,
+                 "ERROR : concurrent jobs on " + ns_dev)
+    rec.running[ns_dev] = True
+    rec.active += 1
+    rec.peak = max(rec.peak, rec.active)
+    rec.ctrl_active[ctrl_dev] = rec.ctrl_active.get(ctrl_dev, 0) + 1
+    rec.ctrl_peak[ctrl_dev] = max(rec.ctrl_peak.get(ctrl_dev, 0),
+                                  rec.ctrl_active[ctrl_dev])
+    await asyncio.sleep(0.01)
+    rec.running[ns_dev] = False
+    rec.active -= 1
+    rec.ctrl_active[ctrl_dev] -= 1
+    rec.done.append((ns_dev, iocfg['seq']))
+    return iocfg['RC'] == 0
+
+
+class TestNVMFHostAsyncIO(NVMFTest):
+
+    """ Represents host asyncio IO orchestration testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.nr_ctrl = 32
+        self.nr_ns = 32
+        self.nr_jobs = 2
+        self.max_jobs = 256
+        self.ctrl_jobs = 4
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        pass
+
+    def tearDown(self):
+        """ Post section of testcase """
+        pass
+
+    @staticmethod
+    def build_ctrl(ctrl_dev, ns_devs):
+        """ Build host controller with namespaces, no device needed.
+            - Args :
+                - ctrl_dev : controller device.
+                - ns_devs : namespace devices.
+            - Returns :
+                - NVMFHostController object.
+        """
+        ctrl = NVMFHostController("nqn.async.test", "loop")
+        ctrl.ctrl_dev = ctrl_dev
+        ctrl.ns_list = [NVMFHostNamespace(ns_dev) for ns_dev in ns_devs]
+        return ctrl
+
+    def native_jobs(self, ctrl_list):
+        """ Build native jobs, nr_jobs per namespace.
+            - Args :
+                - ctrl_list : list of host controllers.
+            - Returns :
+                - list of AsyncIOJob.
+        """
+        jobs = []
+        for seq in range(self.nr_jobs):
+            iocfg = {'IO_TYPE': 'fio', 'ASYNC': __async_job__, 'RC': 0,
+                     'seq': seq}
+            for job in NVMFAsyncOrchestrator.build_jobs(ctrl_list, iocfg):
+                job.iocfg['ctrl'] = job.ctrl_dev
+                jobs.append(job)
+        return jobs
+
+    def test_host_async_io(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        ctrl_list = [self.build_ctrl("/dev/nvme" + str(c),
+                                     ["/dev/nvme" + str(c) + "n" + str(n)
+                                      for n in range(1, self.nr_ns + 1)])
+                     for c in range(self.nr_ctrl)]
+        jobs = self.native_jobs(ctrl_list)
+        nr_threads = threading.active_count()
+        orchestrator = NVMFAsyncOrchestrator(self.max_jobs, self.ctrl_jobs)
+        assert_equal(orchestrator.run(jobs), True,
+                     "ERROR : native jobs failed.")
+        assert_equal(threading.active_count(), nr_threads,
+                     "ERROR : threads created by native jobs.")
+
+        done = AsyncJobRecorder.done
+        assert_equal(len(done), len(jobs), "ERROR : native jobs missing.")
+        for host_ns in ctrl_list[0].ns_list:
+            assert_equal([seq for ns_dev, seq in done
+                          if ns_dev == host_ns.ns_dev],
+                         list(range(self.nr_jobs)),
+                         "ERROR : native jobs out of order.")
+        assert_equal(AsyncJobRecorder.peak <= self.max_jobs, True,
+                     "ERROR : " + str(AsyncJobRecorder.peak) +
+                     " concurrent jobs.")
+        assert_equal(max(AsyncJobRecorder.ctrl_peak.values()),
+                     self.ctrl_jobs, "ERROR : controller limit not used.")
+
+        jobs = self.native_jobs(ctrl_list[:1])
+        jobs[0].iocfg['RC'] = 1
+        assert_equal(NVMFAsyncOrchestrator().run(jobs), False,
+                     "ERROR : failed native job not reported.")
+        assert_equal(jobs[0].ret, False, "ERROR : wrong job failed.")
+        assert_equal(all(job.ret for job in jobs[1:]), True,
+                     "ERROR : other native jobs failed.")
+
+        dd_ctrl = [self.build_ctrl("/dev/nvme0", ["/dev/null"])]
+        dd_write = {'IO_TYPE': 'dd', 'IODIR': 'write', 'IF': '/dev/zero',
+                    'OF': None, 'BS': '4K', 'COUNT': '16', 'RC': 0,
+                    'OUTPUT': self.test_log_dir + "/dd.log"}
+        jobs = NVMFAsyncOrchestrator.build_jobs(dd_ctrl, dd_write)
+        assert_equal(NVMFAsyncOrchestrator().run(jobs), True,
+                     "ERROR : dd job failed.")
+        assert_equal(jobs[0].rc, 0, "ERROR : dd exit code not recorded.")
+        assert_equal(jobs[0].result.nbytes, 16 * 4096,
+                     "ERROR : dd bytes not recorded.")
+        assert_equal(dd_ctrl[0].io_results().summary()['count'], 1,
+                     "ERROR : dd result not recorded on namespace.")
+        dd_write['RC'] = 1
+        jobs = NVMFAsyncOrchestrator.build_jobs(dd_ctrl, dd_write)
+        assert_equal(NVMFAsyncOrchestrator().run(jobs), False,
+                     "ERROR : dd exit code not checked.")
+
+        dd_write['RC'] = 0
+        dd_write['COUNT'] = str(1 << 40)
+        jobs = NVMFAsyncOrchestrator.build_jobs(dd_ctrl, dd_write)
+        start = time.time()
+        assert_equal(NVMFAsyncOrchestrator(timeout=0.2).run(jobs), False,
+                     "ERROR : dd job not timed out.")
+        assert_equal(time.time() - start < 5, True,
+                     "ERROR : dd job not killed on timeout.")
+        assert_equal(jobs[0].result.rc, -9,
+                     "ERROR : killed dd job not recorded.")
+
+        orchestrator = NVMFAsyncOrchestrator()
+        timer = threading.Timer(0.2, orchestrator.cancel)
+        timer.start()
+        start = time.time()
+        assert_equal(orchestrator.run(jobs), False,
+                     "ERROR : dd job not cancelled.")
+        assert_equal(time.time() - start < 5, True,
+                     "ERROR : dd job not killed on cancel.")
+        timer.join()
@@ -0,0 +1,145 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF host discovery :-
+
+    1. Replace kernel uevents with a fake uevent source and sysfs/dev with
+       a temporary directory.
+    2. Verify parsing of the /dev/nvme-fabrics connect reply.
+    3. Pre-create a controller for the same subsystem, it must be ignored.
+    4. Wait for two controllers named by their connect reply concurrently,
+       the fake kernel adds their char devices and namespaces after a
+       delay and emits uevents.
+    5. Verify each controller gets its own char device and all of its
+       namespaces without fixed sleeps.
+    6. Verify discovery times out when namespaces never show up.
+"""
+
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from nvmf.host.host_subsystem import NVMFHostController
+from nvmf.host.host_fabrics import NVMFFabrics
+from utils.uevent import FakeUEventSource
+from utils.uevent import UEventMonitor
+
+
+class TestNVMFHostDiscovery(NVMFTest):
+
+    """ Represents uevent driven host discovery testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.root = None
+        self.source = None
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        self.root = tempfile.mkdtemp(prefix="nvmftests-discovery-") + "/"
+        os.makedirs(self.root + "sys")
+        os.makedirs(self.root + "dev")
+        self.source = FakeUEventSource()
+        UEventMonitor.set_source(self.source)
+
+    def tearDown(self):
+        """ Post section of testcase """
+        UEventMonitor.set_source(None)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def add_ctrl(self, ctrl, nqn, nr_ns):
+        """ Fake kernel : add controller and namespaces with uevents """
+        ctrl_dir = self.root + "sys/" + ctrl + "/"
+        os.makedirs(ctrl_dir)
+        with open(ctrl_dir + "subsysnqn", "w") as nqn_file:
+            nqn_file.write(nqn + "\n")
+        open(self.root + "dev/" + ctrl, "w").close()
+        self.source.add("add", "/devices/virtual/nvme-fabrics/ctl/" + ctrl,
+                        SUBSYSTEM="nvme", DEVNAME=ctrl)
+        for i in range(nr_ns):
+            ns = ctrl + "n" + str(i + 1)
+            os.makedirs(ctrl_dir + ns)
+            open(self.root + "dev/" + ns, "w").close()
+            self.source.add("add", "/devices/virtual/nvme-fabrics/ctl/" +
+                            ctrl + "/" + ns, SUBSYSTEM="block", DEVNAME=ns)
+
+    def build_ctrl(self, nqn, nr_ns, timeout=5):
+        """ Host controller looking at the fake sysfs and dev """
+        ctrl = NVMFHostController(nqn, "loop", "", nr_ns, timeout)
+        ctrl.sysfs_ctl = self.root + "sys/"
+        ctrl.dev_path = self.root + "dev/"
+        return ctrl
+
+    def test_host_discovery(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        reply = NVMFFabrics.parse_reply("instance=2,cntlid=1\n")
+        assert_equal(reply, {"instance": 2, "cntlid": 1},
+                     "ERROR : failed to parse connect reply.")
+        assert_equal(NVMFFabrics.ctrl_name(reply), "nvme2",
+                     "ERROR : wrong controller name.")
+        for bad_reply in ["", "cntlid=1", "instance=x", "instance"]:
+            assert_equal(NVMFFabrics.parse_reply(bad_reply), None,
+                         "ERROR : parsed bad reply " + repr(bad_reply))
+
+        self.add_ctrl("nvme0", "testnqn1", 2)
+
+        result = {}
+
+        def discover(host_ctrl, ctrl):
+            result[ctrl] = host_ctrl.build_ns_list(ctrl)
+
+        start = time.time()
+        threads = [threading.Thread(target=discover,
+                                    args=(self.build_ctrl("testnqn1", 3),
+                                          ctrl))
+                   for ctrl in ["nvme2", "nvme1"]]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        self.add_ctrl("nvme1", "testnqn1", 3)
+        self.add_ctrl("nvme2", "testnqn1", 3)
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+        for ctrl in ["nvme1", "nvme2"]:
+            ctrl_dev, ns_list = result[ctrl]
+            assert_equal(ctrl_dev, self.root + "dev/" + ctrl,
+                         "ERROR : wrong controller discovered.")
+            assert_equal(ns_list, [self.root + "dev/" + ctrl + "n" + str(i)
+                                   for i in range(1, 4)],
+                         "ERROR : namespaces missing for " + ctrl)
+        assert_equal(elapsed < 2, True,
+                     "ERROR : discovery took " + str(elapsed) + " s.")
+
+        host_ctrl = self.build_ctrl("testnqn2", 1, timeout=0.5)
+        self.add_ctrl("nvme3", "testnqn2", 0)
+        assert_equal(host_ctrl.build_ns_list("nvme3"), (None, None),
+                     "ERROR : discovery without namespaces succeeded.")
+        assert_equal(host_ctrl.build_ns_list("nvme0"), (None, None),
+                     "ERROR : controller of other subsystem accepted.")
@@ -0,0 +1,144 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF host identify cache :-
+
+    1. Replace the ioctl interface with a fake NVMe device backend and
+       kernel uevents with a fake uevent source.
+    2. Verify repeated identify controller/namespace queries issue one
+       admin command each.
+    3. Verify a namespace uevent drops only that namespace, a controller
+       change uevent and an uevent overrun drop the controller data.
+    4. Verify data read across an invalidation is not cached.
+"""
+
+
+import sys
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from utils.const import Const
+from utils.uevent import UEvent
+from utils.uevent import FakeUEventSource
+from utils.uevent import UEventMonitor
+from nvmf.host.host_subsystem import NVMFHostController
+from nvmf.host.host_ns import NVMFHostNamespace
+from nvmf.host.host_admin import NVMeAdmin
+from nvmf.host.host_admin import FakeAdminBackend
+from nvmf.host.host_admin_data import IdCtrl
+from nvmf.host.host_admin_data import IdNs
+from nvmf.host.host_id_cache import IdentifyCache
+
+
+class TestNVMFHostIdCache(NVMFTest):
+
+    """ Represents host identify cache testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.backend = None
+        self.source = None
+        self.ctrl_dev = "/dev/nvme7"
+        self.ns_dev = "/dev/nvme7n1"
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        self.backend = FakeAdminBackend()
+        self.backend.add_device(self.ctrl_dev)
+        self.backend.add_device(self.ns_dev, 1)
+        self.backend.add_page(self.ctrl_dev, Const.NVME_ADMIN_IDENTIFY,
+                              Const.NVME_ID_CNS_CTRL, 0,
+                              IdCtrl.encode(mn="Linux", cntlid=1))
+        self.backend.add_page(self.ns_dev, Const.NVME_ADMIN_IDENTIFY,
+                              Const.NVME_ID_CNS_NS, 1,
+                              IdNs.encode(nsze=4096))
+        NVMeAdmin.set_backend(self.backend)
+        self.source = FakeUEventSource()
+        UEventMonitor.set_source(self.source)
+        IdentifyCache.listen()
+        IdentifyCache.invalidate()
+        IdentifyCache.reset_stats()
+
+    def tearDown(self):
+        """ Post section of testcase """
+        NVMeAdmin.set_backend(None)
+        UEventMonitor.set_source(None)
+
+    def nr_commands(self):
+        """ Number of admin commands issued """
+        return len(self.backend.commands)
+
+    def cached(self, ns, cns):
+        """ Identify data of nvme7 is cached """
+        return ("nvme7", ns, cns) in IdentifyCache.entries
+
+    def wait_dropped(self, ns, cns):
+        """ Wait for the uevent listener to drop an entry """
+        ret = UEventMonitor.get().wait(
+            lambda: True if not self.cached(ns, cns) else None, 2)
+        assert_equal(ret, True, "ERROR : uevent did not invalidate.")
+
+    def test_host_id_cache(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        ctrl = NVMFHostController("testnqn1", "loop")
+        ctrl.ctrl_dev = self.ctrl_dev
+        host_ns = NVMFHostNamespace(self.ns_dev, "testnqn1")
+        for _ in range(3):
+            assert_equal(ctrl.id_ctrl(), True, "ERROR : id-ctrl failed.")
+            assert_equal(host_ns.id_ns(), True, "ERROR : id-ns failed.")
+        assert_equal(self.nr_commands(), 2,
+                     "ERROR : identify data not cached.")
+        assert_equal(IdentifyCache.get_stats(), (4, 2),
+                     "ERROR : wrong cache accounting.")
+        ctrl_dict = ctrl.ctrl_dict
+
+        self.source.add("remove", "/devices/virtual/nvme-fabrics/ctl/" +
+                        "nvme7/nvme7n1", SUBSYSTEM="block", DEVNAME="nvme7n1")
+        self.wait_dropped("nvme7n1", Const.NVME_ID_CNS_NS)
+        assert_equal(self.cached(None, Const.NVME_ID_CNS_CTRL), True,
+                     "ERROR : namespace uevent dropped controller data.")
+        assert_equal(host_ns.id_ns(), True, "ERROR : id-ns failed.")
+        assert_equal(self.nr_commands(), 3,
+                     "ERROR : namespace data not read again.")
+
+        self.source.add("change", "/devices/virtual/nvme-fabrics/ctl/nvme7",
+                        SUBSYSTEM="nvme", DEVNAME="nvme7",
+                        NVME_AEN="0x000200")
+        self.wait_dropped(None, Const.NVME_ID_CNS_CTRL)
+        assert_equal(self.cached("nvme7n1", Const.NVME_ID_CNS_NS), False,
+                     "ERROR : controller uevent kept namespace data.")
+        assert_equal(ctrl.id_ctrl(), True, "ERROR : id-ctrl failed.")
+        assert_equal(ctrl.ctrl_dict is ctrl_dict, False,
+                     "ERROR : controller attributes not rebuilt.")
+
+        IdentifyCache.on_uevent(UEvent("overrun", "", {}))
+        assert_equal(self.cached(None, Const.NVME_ID_CNS_CTRL), False,
+                     "ERROR : overrun kept controller data.")
+
+        def racing_loader():
+            IdentifyCache.invalidate("nvme7")
+            return NVMeAdmin(self.ctrl_dev).identify_ctrl()
+
+        IdentifyCache.get("nvme7", None, Const.NVME_ID_CNS_CTRL,
+                          racing_loader)
+        assert_equal(self.cached(None, Const.NVME_ID_CNS_CTRL), False,
+                     "ERROR : data read across invalidation cached.")
@@ -0,0 +1,159 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF host IO executor :-
+
+    1. Queue several IO jobs on many namespaces through the shared IO
+       executor.
+    2. Verify jobs of one namespace run in submission order, one at a
+       time, and no more than nr_workers jobs run at once.
+    3. Verify wait_io() returns as soon as the jobs finish.
+    4. Verify a failed job fails wait_io() of its namespace only.
+    5. Resize the shared executor with jobs queued, verify the queued
+       jobs still finish and the old executor takes no new jobs.
+"""
+
+
+import sys
+import time
+import threading
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from utils.misc import KeyedExecutor
+from nvmf.host.host_ns import NVMFHostNamespace
+
+
+class IOJobRecorder(object):
+
+    """ Records concurrency and completion order of IO jobs """
+
+    lock = threading.Lock()
+    running = {}
+    active = 0
+    peak = 0
+    done = []
+
+
+def __io_job__(iocfg):
+    """ IO job, records concurrency and completion order.
+        - Args :
+            - iocfg : io configuration.
+        - Returns :
+            - True if iocfg['RC'] is 0, False otherwise.
+    """
+    ns_dev = iocfg['filename']
+    with IOJobRecorder.lock:
+        assert_equal(IOJobRecorder.running.get(ns_dev, False), False,
+                     "ERROR : concurrent jobs on " + ns_dev)
+        IOJobRecorder.running[ns_dev] = True
+        IOJobRecorder.active += 1
+        IOJobRecorder.peak = max(IOJobRecorder.peak, IOJobRecorder.active)
+    time.sleep(0.01)
+    with IOJobRecorder.lock:
+        IOJobRecorder.running[ns_dev] = False
+        IOJobRecorder.active -= 1
+        IOJobRecorder.done.append((ns_dev, iocfg['seq']))
+    return iocfg['RC'] == 0
+
+
+class TestNVMFHostIOExecutor(NVMFTest):
+
+    """ Represents host IO executor testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.nr_workers = 16
+        self.nr_ns = 256
+        self.nr_jobs = 3
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        KeyedExecutor.set_shared(self.nr_workers)
+
+    def tearDown(self):
+        """ Post section of testcase """
+        pass
+
+    def test_host_io_executor(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        nr_threads = threading.active_count()
+        ns_list = [NVMFHostNamespace("/dev/nvme0n" + str(i + 1))
+                   for i in range(self.nr_ns)]
+        start = time.time()
+        for seq in range(self.nr_jobs):
+            for host_ns in ns_list:
+                iocfg = {'IO_TYPE': 'fio', 'THREAD': __io_job__, 'RC': 0,
+                         'seq': seq}
+                assert_equal(host_ns.start_io(iocfg), True,
+                             "ERROR : start IO failed.")
+        for host_ns in ns_list:
+            assert_equal(host_ns.wait_io(), True, "ERROR : wait IO failed.")
+        elapsed = time.time() - start
+        ideal = self.nr_ns * self.nr_jobs * 0.01 / self.nr_workers
+
+        done = IOJobRecorder.done
+        assert_equal(len(done), self.nr_ns * self.nr_jobs,
+                     "ERROR : IO jobs missing.")
+        for host_ns in ns_list:
+            assert_equal([seq for ns_dev, seq in done
+                          if ns_dev == host_ns.ns_dev],
+                         list(range(self.nr_jobs)),
+                         "ERROR : IO jobs out of order.")
+        assert_equal(IOJobRecorder.peak <= self.nr_workers, True,
+                     "ERROR : " + str(IOJobRecorder.peak) +
+                     " concurrent jobs.")
+        assert_equal(threading.active_count() - nr_threads <=
+                     self.nr_workers, True, "ERROR : too many threads.")
+        assert_equal(elapsed < ideal * 3 + 0.5, True,
+                     "ERROR : IO jobs took " + str(elapsed) + " s.")
+
+        failing, passing = ns_list[0], ns_list[1]
+        failing.start_io({'IO_TYPE': 'fio', 'THREAD': __io_job__, 'RC': 1,
+                          'seq': 0})
+        passing.start_io({'IO_TYPE': 'fio', 'THREAD': __io_job__, 'RC': 0,
+                          'seq': 0})
+        assert_equal(failing.wait_io(), False,
+                     "ERROR : failed IO job not reported.")
+        assert_equal(passing.wait_io(), True,
+                     "ERROR : IO job of other namespace failed.")
+        assert_equal(KeyedExecutor.shared().pending(), 0,
+                     "ERROR : IO jobs left in executor.")
+
+        executor = KeyedExecutor.shared()
+        for host_ns in ns_list[:self.nr_workers * 2]:
+            host_ns.start_io({'IO_TYPE': 'fio', 'THREAD': __io_job__,
+                              'RC': 0, 'seq': 0})
+        assert_equal(KeyedExecutor.set_shared(self.nr_workers // 2) is
+                     executor, False, "ERROR : executor not resized.")
+        for host_ns in ns_list[:self.nr_workers * 2]:
+            assert_equal(host_ns.wait_io(), True,
+                         "ERROR : queued IO job lost on resize.")
+        assert_equal(executor.pending(), 0,
+                     "ERROR : IO jobs left in old executor.")
+        try:
+            executor.submit("key", len, ())
+            closed = False
+        except RuntimeError:
+            closed = True
+        assert_equal(closed, True, "ERROR : old executor not shut down.")
+        KeyedExecutor.set_shared(self.nr_workers)
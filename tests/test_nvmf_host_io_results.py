@@ -0,0 +1,125 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF host IO result records :-
+
+    1. Run dd jobs on namespaces of two controllers through the shared
+       IO executor.
+    2. Verify each job records timing, exit code, bytes and rusage.
+    3. Verify the records are aggregated per namespace, controller and
+       run.
+    4. Verify fio json output is parsed into bytes moved.
+"""
+
+
+import sys
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from nvmf_test import __dd_worker__
+from utils.diskio import FIO
+from utils.diskio import IOResultSet
+from nvmf.host.host_subsystem import NVMFHostController
+from nvmf.host.host_ns import NVMFHostNamespace
+
+
+FIO_OUTPUT = """note: both iodepth >= 1 and synchronous I/O engine are selected
+{"fio version" : "fio-3.28",
+ "jobs" : [{"jobname" : "test1",
+            "read" : {"io_bytes" : 419430400, "total_ios" : 102400},
+            "write" : {"io_bytes" : 2097152, "total_ios" : 512},
+            "trim" : {"io_bytes" : 0, "total_ios" : 0}}]}
+"""
+
+
+class TestNVMFHostIOResults(NVMFTest):
+
+    """ Represents host IO result records testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.nr_ctrl = 2
+        self.nr_ns = 2
+        self.count = 32
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        pass
+
+    def tearDown(self):
+        """ Post section of testcase """
+        pass
+
+    def test_host_io_results(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        ctrl_list = []
+        for c in range(self.nr_ctrl):
+            ctrl = NVMFHostController("nqn.results.test", "loop")
+            ctrl.ctrl_dev = "/dev/nvme" + str(c)
+            # dd reads the namespace device from IF, read /dev/zero
+            ctrl.ns_list = [NVMFHostNamespace("/dev/zero")
+                            for n in range(self.nr_ns)]
+            ctrl_list.append(ctrl)
+        for c, ctrl in enumerate(ctrl_list):
+            for n, host_ns in enumerate(ctrl.ns_list):
+                iocfg = {'IO_TYPE': 'dd', 'IODIR': 'read',
+                         'THREAD': __dd_worker__, 'IF': None,
+                         'OF': '/dev/null', 'BS': '4K',
+                         'COUNT': str(self.count), 'RC': 0,
+                         'OUTPUT': self.test_log_dir + "/dd_" + str(c) +
+                         "_" + str(n) + ".log"}
+                assert_equal(host_ns.start_io(iocfg), True,
+                             "ERROR : start IO failed.")
+        for ctrl in ctrl_list:
+            assert_equal(ctrl.wait_io_all_ns(), True,
+                         "ERROR : wait IO failed.")
+
+        result = ctrl_list[0].ns_list[0].io_results.snapshot()[0]
+        assert_equal((result.rc, result.ok, result.nbytes),
+                     (0, True, self.count * 4096),
+                     "ERROR : wrong dd result " + str(result.to_dict()))
+        assert_equal(result.end >= result.start, True,
+                     "ERROR : dd timing not recorded.")
+        assert_equal(result.maxrss > 0, True,
+                     "ERROR : dd rusage not recorded.")
+
+        ctrl_summary = ctrl_list[1].io_results().summary()
+        assert_equal((ctrl_summary['count'], ctrl_summary['bytes']),
+                     (self.nr_ns, self.nr_ns * self.count * 4096),
+                     "ERROR : wrong controller aggregate.")
+        run = IOResultSet.merge("run", [ctrl.io_results()
+                                        for ctrl in ctrl_list])
+        summary = run.summary()
+        assert_equal((summary['count'], summary['failed']),
+                     (self.nr_ctrl * self.nr_ns, 0),
+                     "ERROR : wrong run aggregate.")
+        assert_equal(summary['wall'] > 0 and summary['bps'] > 0, True,
+                     "ERROR : run throughput not computed.")
+        print(run.report())
+
+        for ctrl in ctrl_list:
+            ctrl.reset_io_results()
+        assert_equal(ctrl_list[0].io_results().summary()['count'], 0,
+                     "ERROR : results not reset.")
+        FIO.parse_output(result, FIO_OUTPUT)
+        assert_equal(result.nbytes, 400 * 1024 * 1024 + 2048 * 1024,
+                     "ERROR : fio bytes not parsed.")
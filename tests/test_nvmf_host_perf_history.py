@@ -0,0 +1,206 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF host perf history :-
+
+    1. Record several baseline perf reports into a history file.
+    2. Verify runs are keyed by test, topology, workload and environment.
+    3. Verify a slower run is flagged as regression and a run within the
+       noise is not.
+    4. Verify perf_compare.py exits non-zero on regression.
+    5. On a single namespace topology verify one repetition per run is
+       reported as insufficient samples (exit 2) and repeated runs flag
+       the regression.
+    6. Drop the oldest run and verify the next run gets a fresh id.
+"""
+
+
+import os
+import sys
+import random
+import subprocess
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from utils.diskio import IOResult
+from nvmf.host.host_perf import NVMFPerfReport
+from nvmf.host.host_perf_history import NVMFPerfHistory
+
+
+class TestNVMFHostPerfHistory(NVMFTest):
+
+    """ Represents host perf history testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.nr_ns = 4
+        self.topology = {'target_type': 'loop', 'nr_ctrl': 1,
+                         'nr_ns': [self.nr_ns]}
+        self.workload = NVMFPerfHistory.workload(
+            {'IO_TYPE': 'fio', 'rw': 'randread', 'bs': '4k',
+             'iodepth': '8', 'THREAD': None, 'filename': '/dev/nvme0n1',
+             'RC': 0})
+        self.env = {'kernel': '6.1.0', 'cpus': 8,
+                    'modules': {'nvme_core': {'multipath': 'Y'}}}
+        self.rng = random.Random(3)
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        self.path = self.test_log_dir + "/perf_history.jsonl"
+        for path in [self.path, self.path + ".single",
+                     self.path + ".repeated"]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def tearDown(self):
+        """ Post section of testcase """
+        pass
+
+    def build_report(self, iops, nr_ns):
+        """ Build perf report with read IOPS around a value.
+            - Args :
+                - iops : mean IOPS of each namespace.
+                - nr_ns : number of namespaces.
+            - Returns :
+                - NVMFPerfReport object.
+        """
+        report = NVMFPerfReport("perf")
+        for n in range(nr_ns):
+            result = IOResult('fio', "/dev/nvme0n" + str(n + 1))
+            result.start, result.end, result.rc = 0, 1, 0
+            value = iops * self.rng.uniform(0.98, 1.02)
+            result.metrics = {'read': {
+                'iops': value, 'bw': value * 4096, 'io_bytes': value * 4096,
+                'lat_mean': 8e6 / value, 'p50': 7e6 / value,
+                'p99': 2e7 / value, 'p99.9': 4e7 / value}}
+            report.add("/dev/nvme0", result)
+        return report
+
+    def record(self, history, iops, workload=None, nr_ns=None,
+               nr_repeat=1):
+        """ Record one run.
+            - Args :
+                - history : NVMFPerfHistory object.
+                - iops : mean IOPS of each namespace.
+                - workload : workload, default workload if None.
+                - nr_ns : number of namespaces, self.nr_ns if None.
+                - nr_repeat : number of repetitions of the run.
+            - Returns :
+                - run dictionary.
+        """
+        nr_ns = nr_ns or self.nr_ns
+        topology = dict(self.topology, nr_ns=[nr_ns])
+        reports = [self.build_report(iops, nr_ns) for _ in range(nr_repeat)]
+        return history.record("TestNVMFParallelPerf", topology,
+                              workload or self.workload, reports, self.env)
+
+    def test_host_perf_history(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        env = NVMFPerfHistory.fingerprint(["nvme_core"])
+        assert_equal((env['kernel'], env['cpus']),
+                     (os.uname()[2], os.cpu_count()),
+                     "ERROR : wrong environment fingerprint.")
+        assert_equal('THREAD' in self.workload or
+                     'filename' in self.workload, False,
+                     "ERROR : device specific keys in workload.")
+
+        history = NVMFPerfHistory(self.path)
+        assert_equal(history.compare(), None,
+                     "ERROR : empty history compared.")
+        for i in range(4):
+            self.record(history, 10000)
+        other = dict(self.workload, bs='128k')
+        entry = self.record(history, 1000, other)
+        assert_equal(entry['id'], 5, "ERROR : wrong run id.")
+        assert_equal(entry['key'] != history.load()[0]['key'], True,
+                     "ERROR : workload not part of the key.")
+
+        entry = self.record(history, 10050)
+        current, baseline, findings = history.compare()
+        assert_equal(current['id'], entry['id'], "ERROR : wrong run.")
+        assert_equal([run['id'] for run in baseline], [1, 2, 3, 4],
+                     "ERROR : wrong baseline runs.")
+        assert_equal(len(findings), 4, "ERROR : metrics missing.")
+        assert_equal(any(finding['regression'] for finding in findings),
+                     False, "ERROR : noise flagged as regression.\n" +
+                     NVMFPerfHistory.report(current, baseline, findings))
+
+        self.record(history, 8000)
+        current, baseline, findings = history.compare()
+        print(NVMFPerfHistory.report(current, baseline, findings))
+        flagged = sorted(finding['metric'] for finding in findings
+                         if finding['regression'])
+        assert_equal(flagged, ['bw', 'iops', 'lat_mean', 'p99'],
+                     "ERROR : regression not flagged.")
+        assert_equal(len(history.compare(baseline_id=6)[1]), 1,
+                     "ERROR : chosen baseline not used.")
+
+        ret = subprocess.call([sys.executable, "perf_compare.py",
+                               "--history", self.path],
+                              stdout=subprocess.DEVNULL)
+        assert_equal(ret, 1, "ERROR : regression exit code " + str(ret))
+        ret = subprocess.call([sys.executable, "perf_compare.py",
+                               "--history", self.path, "--current", "6"],
+                              stdout=subprocess.DEVNULL)
+        assert_equal(ret, 0, "ERROR : no regression exit code " + str(ret))
+        ret = subprocess.call([sys.executable, "perf_compare.py",
+                               "--history", self.path + ".missing"],
+                              stdout=subprocess.DEVNULL)
+        assert_equal(ret, 2, "ERROR : empty history exit code " + str(ret))
+
+        # one namespace, one repetition : p can never get below alpha
+        single = NVMFPerfHistory(self.path + ".single")
+        self.record(single, 10000, nr_ns=1)
+        self.record(single, 8000, nr_ns=1)
+        current, baseline, findings = single.compare()
+        assert_equal(all(finding['insufficient'] and
+                         not finding['regression'] for finding in findings),
+                     True, "ERROR : single sample not insufficient.\n" +
+                     NVMFPerfHistory.report(current, baseline, findings))
+        ret = subprocess.call([sys.executable, "perf_compare.py",
+                               "--history", single.path],
+                              stdout=subprocess.DEVNULL)
+        assert_equal(ret, 2, "ERROR : insufficient samples exit code " +
+                     str(ret))
+
+        repeated = NVMFPerfHistory(self.path + ".repeated")
+        self.record(repeated, 10000, nr_ns=1, nr_repeat=5)
+        entry = self.record(repeated, 8000, nr_ns=1, nr_repeat=5)
+        assert_equal((entry['repeat'], len(entry['samples']['read']['iops'])),
+                     (5, 5), "ERROR : repetitions not recorded.")
+        current, baseline, findings = repeated.compare()
+        print(NVMFPerfHistory.report(current, baseline, findings))
+        assert_equal([finding['metric'] for finding in findings
+                      if finding['regression']],
+                     ['iops', 'bw', 'lat_mean', 'p99'],
+                     "ERROR : repeated runs regression not flagged.")
+        ret = subprocess.call([sys.executable, "perf_compare.py",
+                               "--history", repeated.path],
+                              stdout=subprocess.DEVNULL)
+        assert_equal(ret, 1, "ERROR : regression exit code " + str(ret))
+
+        with open(repeated.path) as history:
+            runs = history.readlines()
+        with open(repeated.path, "w") as history:
+            history.writelines(runs[1:])
+        entry = self.record(repeated, 10000, nr_ns=1)
+        assert_equal(entry['id'], 3, "ERROR : run id reused.")
@@ -0,0 +1,143 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF host perf report :-
+
+    1. Parse fio json output of several jobs into per direction IOPS,
+       bandwidth and latency percentiles.
+    2. Build the perf report of namespaces on two controllers.
+    3. Verify controller and run totals and the spread across
+       namespaces.
+    4. Verify the json report and the text table.
+"""
+
+
+import sys
+import json
+import time
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from utils.diskio import FIO
+from utils.diskio import IOResult
+from nvmf.host.host_perf import NVMFPerfReport
+from nvmf.host.host_subsystem import NVMFHostController
+from nvmf.host.host_ns import NVMFHostNamespace
+
+
+def fio_json(read_iops, write_iops=0, nr_jobs=1):
+    """ Build fio json output.
+        - Args :
+            - read_iops : read IOPS of each job.
+            - write_iops : write IOPS of each job, 0 for no writes.
+            - nr_jobs : number of jobs.
+        - Returns :
+            - fio json output string.
+    """
+    jobs = []
+    for i in range(nr_jobs):
+        job = {'jobname': 'test1'}
+        for direction, iops in [('read', read_iops), ('write', write_iops),
+                                ('trim', 0)]:
+            job[direction] = {
+                'iops': iops, 'bw_bytes': iops * 4096,
+                'io_bytes': iops * 4096 * 10, 'total_ios': iops * 10,
+                'clat_ns': {'mean': 1000.0 * (i + 1),
+                            'percentile': {"50.000000": 2000 * (i + 1),
+                                           "99.000000": 8000 * (i + 1),
+                                           "99.900000": 16000 * (i + 1)}}}
+        jobs.append(job)
+    return json.dumps({'fio version': 'fio-3.28', 'jobs': jobs})
+
+
+class TestNVMFHostPerfReport(NVMFTest):
+
+    """ Represents host perf report testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        pass
+
+    def tearDown(self):
+        """ Post section of testcase """
+        pass
+
+    def test_host_perf_report(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        metrics = FIO.parse_json(fio_json(1000, 0, 2))
+        assert_equal(sorted(metrics.keys()), ['read'],
+                     "ERROR : directions without IOs reported.")
+        assert_equal((metrics['read']['iops'], metrics['read']['bw'],
+                      metrics['read']['lat_mean'], metrics['read']['p99']),
+                     (2000, 2000 * 4096, 1.5, 16.0),
+                     "ERROR : fio jobs not merged " + str(metrics))
+        assert_equal(FIO.parse_json("fio: failed to open file"), None,
+                     "ERROR : text output parsed as json.")
+
+        ctrl_list = []
+        iops = [[100, 200, 300], [400, 500, 600]]
+        for c in range(2):
+            ctrl = NVMFHostController("nqn.perf.test", "loop")
+            ctrl.ctrl_dev = "/dev/nvme" + str(c)
+            ctrl.ns_list = []
+            for n in range(3):
+                host_ns = NVMFHostNamespace(ctrl.ctrl_dev + "n" + str(n + 1))
+                result = IOResult('fio', host_ns.ns_dev)
+                result.start = time.time()
+                result.end = result.start + 1
+                result.rc, result.ok = 0, True
+                FIO.parse_output(result, fio_json(iops[c][n], 10))
+                host_ns.io_results.add(result)
+                ctrl.ns_list.append(host_ns)
+            ctrl_list.append(ctrl)
+
+        report = NVMFPerfReport.build("perf", ctrl_list)
+        assert_equal(len(report.rows), 6, "ERROR : namespace rows missing.")
+        assert_equal(report.directions(), ['read', 'write'],
+                     "ERROR : wrong directions.")
+        controllers = report.controllers()
+        assert_equal((controllers['/dev/nvme0']['read']['iops'],
+                      controllers['/dev/nvme1']['read']['iops']),
+                     (600, 1500), "ERROR : wrong controller totals.")
+        totals = report.totals()
+        assert_equal((totals['read']['iops'], totals['write']['iops']),
+                     (2100, 60), "ERROR : wrong run totals.")
+        spread = totals['read']['spread']['iops']
+        assert_equal((spread['min'], spread['max'], spread['mean']),
+                     (100, 600, 350), "ERROR : wrong spread " + str(spread))
+        assert_equal(abs(spread['stddev'] - 170.78) < 0.01, True,
+                     "ERROR : wrong stddev " + str(spread['stddev']))
+
+        path = self.test_log_dir + "/perf.json"
+        report.save(path)
+        with open(path) as report_file:
+            saved = json.load(report_file)
+        assert_equal((saved['totals']['read']['iops'],
+                      len(saved['namespaces'])), (2100, 6),
+                     "ERROR : json report differs.")
+        table = report.table()
+        print(table)
+        assert_equal(len(table.split("\n")), 2 + 6 * 2 + 2 * 2 + 2 * 4,
+                     "ERROR : wrong table lines.")
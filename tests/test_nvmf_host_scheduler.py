@@ -0,0 +1,194 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF host workload scheduler :-
+
+    1. Schedule IO jobs on many controllers and namespaces with a seeded
+       uniform scheduler, verify the jobs in flight limit is reached and
+       not exceeded.
+    2. Verify the same seed gives the same schedule and a saved schedule
+       is replayed exactly, also after the devices got renamed.
+    3. Verify hotset and capacity policies skew the picks.
+    4. Verify scheduling stops on the first failed job.
+    5. Verify scheduling jobs without any namespace fails.
+"""
+
+
+import sys
+import time
+import threading
+from collections import Counter
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from utils.const import Const
+from utils.misc import KeyedExecutor
+from nvmf.host.host_admin_data import IdNs
+from nvmf.host.host_scheduler import NVMFWorkloadScheduler
+from nvmf.host.host_subsystem import NVMFHostController
+from nvmf.host.host_ns import NVMFHostNamespace
+
+
+class SchedJobRecorder(object):
+
+    """ Records concurrency and executed jobs """
+
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    done = []
+
+
+def __sched_job__(iocfg):
+    """ IO job, records concurrency and executed jobs.
+        - Args :
+            - iocfg : io configuration.
+        - Returns :
+            - False for the failing namespace, True otherwise.
+    """
+    with SchedJobRecorder.lock:
+        SchedJobRecorder.active += 1
+        SchedJobRecorder.peak = max(SchedJobRecorder.peak,
+                                    SchedJobRecorder.active)
+    time.sleep(0.002)
+    with SchedJobRecorder.lock:
+        SchedJobRecorder.active -= 1
+        SchedJobRecorder.done.append(iocfg['filename'])
+    return iocfg['filename'] != iocfg['fail']
+
+
+class TestNVMFHostScheduler(NVMFTest):
+
+    """ Represents host workload scheduler testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.nr_ctrl = 4
+        self.nr_ns = 8
+        self.nr_jobs = 4
+        self.nr_ops = 200
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        KeyedExecutor.set_shared(16)
+        self.ctrl_list = []
+        for c in range(self.nr_ctrl):
+            ctrl = NVMFHostController("nqn.sched.test", "loop")
+            ctrl.ctrl_dev = "/dev/nvme" + str(c)
+            ctrl.ns_list = [NVMFHostNamespace(ctrl.ctrl_dev + "n" + str(n))
+                            for n in range(1, self.nr_ns + 1)]
+            self.ctrl_list.append(ctrl)
+        self.iocfg = {'IO_TYPE': 'fio', 'THREAD': __sched_job__, 'RC': 0,
+                      'fail': None}
+
+    def tearDown(self):
+        """ Post section of testcase """
+        pass
+
+    def ns_devs(self, picks):
+        """ Map [ctrl_index, ns_index] picks to namespace devices """
+        return [self.ctrl_list[c].ns_list[n].ns_dev for c, n in picks]
+
+    def test_host_scheduler(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        scheduler = NVMFWorkloadScheduler(Const.SCHED_UNIFORM, 42,
+                                          self.nr_jobs)
+        ret = scheduler.run(self.ctrl_list, self.iocfg, self.nr_ops)
+        assert_equal(ret, True, "ERROR : scheduled IOs failed.")
+        assert_equal(len(SchedJobRecorder.done), self.nr_ops,
+                     "ERROR : scheduled IOs missing.")
+        assert_equal(SchedJobRecorder.peak, self.nr_jobs,
+                     "ERROR : " + str(SchedJobRecorder.peak) +
+                     " jobs in flight.")
+        assert_equal(sorted(SchedJobRecorder.done),
+                     sorted(self.ns_devs(scheduler.runs[0])),
+                     "ERROR : executed IOs differ from the schedule.")
+
+        same = NVMFWorkloadScheduler(Const.SCHED_UNIFORM, 42, self.nr_jobs)
+        assert_equal(same.schedule(self.ctrl_list, self.nr_ops),
+                     scheduler.runs[0], "ERROR : seeded schedule differs.")
+        path = self.test_log_dir + "/schedule.json"
+        scheduler.save(path)
+        replay = NVMFWorkloadScheduler.load(path)
+        assert_equal((replay.seed, replay.nr_jobs), (42, self.nr_jobs),
+                     "ERROR : schedule settings not replayed.")
+        assert_equal(replay.schedule(self.ctrl_list), scheduler.runs[0],
+                     "ERROR : schedule not replayed.")
+        assert_equal(replay.schedule(self.ctrl_list), None,
+                     "ERROR : replayed more runs than recorded.")
+
+        # controllers come back under other names after a reconnect
+        renamed = [NVMFHostController("nqn.sched.test", "loop")
+                   for _ in range(self.nr_ctrl)]
+        for c, ctrl in enumerate(renamed):
+            ctrl.ctrl_dev = "/dev/nvme" + str(self.nr_ctrl + c)
+            ctrl.ns_list = [NVMFHostNamespace(ctrl.ctrl_dev + "n" + str(n))
+                            for n in range(1, self.nr_ns + 1)]
+        SchedJobRecorder.done = []
+        replay = NVMFWorkloadScheduler.load(path)
+        ret = replay.run(renamed, self.iocfg)
+        assert_equal(ret, True, "ERROR : replay on renamed devices failed.")
+        expected = [renamed[c].ns_list[n].ns_dev
+                    for c, n in scheduler.runs[0]]
+        assert_equal(sorted(SchedJobRecorder.done), sorted(expected),
+                     "ERROR : replay on renamed devices picked other "
+                     "namespaces.")
+
+        hotset = NVMFWorkloadScheduler(Const.SCHED_HOTSET, 7, self.nr_jobs,
+                                       0.25, 0.9)
+        picks = Counter(self.ns_devs(hotset.schedule(self.ctrl_list,
+                                                     4000)))
+        hot = sum(count for ns_dev, count in picks.most_common(8))
+        assert_equal(0.85 < hot / 4000.0 < 0.95, True,
+                     "ERROR : hot set got " + str(hot) + " picks.")
+
+        big = self.ctrl_list[1].ns_list[2]
+        for ctrl in self.ctrl_list:
+            for host_ns in ctrl.ns_list:
+                host_ns.id_ns_data = IdNs.decode(IdNs.encode(nsze=1 << 10))
+        big.id_ns_data = IdNs.decode(IdNs.encode(nsze=1 << 20))
+        capacity = NVMFWorkloadScheduler(Const.SCHED_CAPACITY, 7)
+        picks = Counter(self.ns_devs(capacity.schedule(self.ctrl_list,
+                                                       1000)))
+        assert_equal(picks.most_common(1)[0][0], big.ns_dev,
+                     "ERROR : capacity policy ignored namespace size.")
+        assert_equal(picks[big.ns_dev] > 900, True,
+                     "ERROR : capacity policy picked " + big.ns_dev + " " +
+                     str(picks[big.ns_dev]) + " times.")
+
+        SchedJobRecorder.done = []
+        self.iocfg['fail'] = self.ns_devs(scheduler.runs[0])[10]
+        ret = NVMFWorkloadScheduler(Const.SCHED_UNIFORM, 42,
+                                    self.nr_jobs).run(self.ctrl_list,
+                                                      self.iocfg,
+                                                      self.nr_ops)
+        assert_equal(ret, False, "ERROR : failed IO not reported.")
+        assert_equal(len(SchedJobRecorder.done) < self.nr_ops, True,
+                     "ERROR : scheduling did not stop on failure.")
+
+        for ctrl in self.ctrl_list:
+            ctrl.ns_list = []
+        empty = NVMFWorkloadScheduler(Const.SCHED_UNIFORM, 42)
+        assert_equal(empty.schedule(self.ctrl_list, self.nr_ops), None,
+                     "ERROR : jobs scheduled without namespaces.")
+        assert_equal(empty.schedule(self.ctrl_list), [],
+                     "ERROR : one job per namespace without namespaces.")
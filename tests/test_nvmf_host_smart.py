@@ -0,0 +1,116 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF host SMART sampler :-
+
+    1. Replace the ioctl interface with fake controllers returning SMART
+       log pages.
+    2. Verify the sample ring keeps the newest samples once it is full.
+    3. Sample in the background, advance the fake counters inside a
+       phase and verify the device reported IOPS and throughput.
+    4. Verify a controller without SMART log is counted as error.
+"""
+
+
+import sys
+import time
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from utils.const import Const
+from nvmf.host.host_admin import NVMeAdmin
+from nvmf.host.host_admin import FakeAdminBackend
+from nvmf.host.host_admin_data import SmartLog
+from nvmf.host.host_smart import SmartRing
+from nvmf.host.host_smart import SmartSampler
+
+
+class TestNVMFHostSmart(NVMFTest):
+
+    """ Represents host SMART sampler testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.backend = None
+        self.dev_list = ["/dev/nvme1", "/dev/nvme2"]
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        self.backend = FakeAdminBackend()
+        for dev in self.dev_list:
+            self.backend.add_device(dev)
+            self.set_counters(dev, 0, 0)
+        self.backend.add_device("/dev/nvme3")
+        NVMeAdmin.set_backend(self.backend)
+
+    def tearDown(self):
+        """ Post section of testcase """
+        NVMeAdmin.set_backend(None)
+
+    def set_counters(self, dev, reads, writes):
+        """ Set fake SMART counters, 4KB per command """
+        smart = SmartLog.encode(data_units_read=reads * 8 // 1000,
+                                data_units_written=writes * 8 // 1000,
+                                host_read_commands=reads,
+                                host_write_commands=writes)
+        self.backend.add_page(dev, Const.NVME_ADMIN_GET_LOG_PAGE,
+                              Const.NVME_LOG_SMART, Const.NVME_NSID_ALL,
+                              smart)
+
+    def test_host_smart(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        ring = SmartRing(4)
+        for i in range(6):
+            ring.append(float(i), (i, i, i, i))
+        assert_equal([sample[0] for sample in ring.samples()],
+                     [2.0, 3.0, 4.0, 5.0], "ERROR : wrong ring samples.")
+        assert_equal(ring.sample(-1), (5.0, (5, 5, 5, 5)),
+                     "ERROR : wrong newest sample.")
+
+        sampler = SmartSampler(self.dev_list, 0.02, 16)
+        sampler.start()
+        sampler.begin_phase("write")
+        self.set_counters("/dev/nvme1", 0, 1000)
+        self.set_counters("/dev/nvme2", 500, 3000)
+        time.sleep(0.2)
+        stats = sampler.end_phase("write")
+        sampler.stop()
+
+        seconds = stats["/dev/nvme2"]['seconds']
+        assert_equal(round(stats["/dev/nvme2"]['write_iops'] * seconds), 3000,
+                     "ERROR : wrong write IOPS.")
+        assert_equal(round(stats["/dev/nvme2"]['read_bps'] * seconds),
+                     4 * Const.SMART_DATA_UNIT, "ERROR : wrong read bytes.")
+        total = stats['total']
+        assert_equal(round(total['write_iops'] * seconds, -1), 4000,
+                     "ERROR : wrong total write IOPS.")
+        assert_equal(len(sampler.rings["/dev/nvme1"]) > 4, True,
+                     "ERROR : background sampling did not run.")
+        series = sampler.series("/dev/nvme1")
+        assert_equal(round(sum(delta['write_iops'] * delta['seconds']
+                               for _, delta in series)), 1000,
+                     "ERROR : wrong write series.")
+        print(SmartSampler.report("write", stats))
+
+        sampler = SmartSampler(["/dev/nvme3"], 0)
+        sampler.sample()
+        assert_equal(sampler.errors, 1, "ERROR : smart error not counted.")
@@ -0,0 +1,151 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF host sysfs index :-
+
+    1. Build fake fabric controllers in a temporary sysfs class directory.
+    2. Verify nqn to controller and controller to namespace mapping.
+    3. Add a controller, re-create one for another subsystem and remove
+       one, verify a class directory refresh picks up all of them.
+    4. Add a namespace, verify a single controller refresh picks it up.
+    5. Verify forget drops the controller.
+    6. Link controllers into the class directory as sysfs does, verify a
+       class directory refresh after a single controller refresh does not
+       re-read the controller but still picks up a re-created one.
+"""
+
+
+import os
+import sys
+import shutil
+import tempfile
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from nvmf.host.host_sysfs import NVMFSysfsIndex
+
+
+class TestNVMFHostSysfsIndex(NVMFTest):
+
+    """ Represents host sysfs index testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.sysfs_root = None
+        self.sysfs_ctl = None
+        self.sysfs_dev = None
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        self.sysfs_root = tempfile.mkdtemp(prefix="nvmftests-sysfs-") + "/"
+        self.sysfs_ctl = self.sysfs_root + "ctl/"
+        self.sysfs_dev = self.sysfs_root + "devices/"
+        os.makedirs(self.sysfs_ctl)
+        os.makedirs(self.sysfs_dev)
+
+    def tearDown(self):
+        """ Post section of testcase """
+        shutil.rmtree(self.sysfs_root, ignore_errors=True)
+
+    def add_ctrl(self, ctrl, nqn, nr_ns, name=None, link=False):
+        """ Create fake fabric controller directory, with link set create
+            it in the devices directory and link it into the class
+            directory.
+        """
+        name = ctrl if name is None else name
+        ctrl_dir = (self.sysfs_dev if link else self.sysfs_ctl) + name + "/"
+        os.makedirs(ctrl_dir)
+        with open(ctrl_dir + "subsysnqn", "w") as nqn_file:
+            nqn_file.write(nqn + "\n")
+        for i in range(nr_ns):
+            os.makedirs(ctrl_dir + ctrl + "n" + str(i + 1))
+        if link:
+            os.symlink(ctrl_dir, self.sysfs_ctl + ctrl)
+
+    def test_host_sysfs_index(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        self.add_ctrl("nvme0", "testnqn1", 2)
+        self.add_ctrl("nvme1", "testnqn1", 1)
+        self.add_ctrl("nvme10", "testnqn2", 0)
+        index = NVMFSysfsIndex.get(self.sysfs_ctl)
+        assert_equal(NVMFSysfsIndex.get(self.sysfs_ctl) is index, True,
+                     "ERROR : index is not shared.")
+        assert_equal(index.ctrls_of("testnqn1"), ["nvme0", "nvme1"],
+                     "ERROR : wrong controllers of testnqn1.")
+        assert_equal(index.nqn("nvme10"), "testnqn2",
+                     "ERROR : wrong nqn of nvme10.")
+        assert_equal(index.namespaces("nvme0"), ["nvme0n1", "nvme0n2"],
+                     "ERROR : wrong namespaces of nvme0.")
+
+        self.add_ctrl("nvme2", "testnqn2", 1)
+        self.add_ctrl("nvme1", "testnqn3", 0, "nvme1.new")
+        shutil.rmtree(self.sysfs_ctl + "nvme1")
+        os.rename(self.sysfs_ctl + "nvme1.new", self.sysfs_ctl + "nvme1")
+        shutil.rmtree(self.sysfs_ctl + "nvme10")
+        index.refresh()
+        assert_equal(index.ctrls_of("testnqn1"), ["nvme0"],
+                     "ERROR : re-created controller not refreshed.")
+        assert_equal(index.ctrls_of("testnqn2"), ["nvme2"],
+                     "ERROR : removed or new controller not refreshed.")
+        assert_equal(index.ctrls_of("testnqn3"), ["nvme1"],
+                     "ERROR : re-created controller missing.")
+
+        os.makedirs(self.sysfs_ctl + "nvme2/nvme2n2")
+        index.refresh("nvme2")
+        assert_equal(index.namespaces("nvme2"), ["nvme2n1", "nvme2n2"],
+                     "ERROR : new namespace not refreshed.")
+
+        index.forget("nvme2")
+        assert_equal(index.ctrls_of("testnqn2"), [],
+                     "ERROR : forgotten controller still indexed.")
+        assert_equal(index.namespaces("nvme2"), [],
+                     "ERROR : forgotten controller has namespaces.")
+
+    def test_host_sysfs_index_links(self):
+        """ Testcase main for symlinked class directory entries """
+        print("Now Running " + self.__class__.__name__)
+        self.add_ctrl("nvme0", "testnqn1", 1, link=True)
+        index = NVMFSysfsIndex(self.sysfs_ctl)
+        assert_equal(index.ctrls_of("testnqn1"), ["nvme0"],
+                     "ERROR : linked controller not indexed.")
+
+        reads = []
+        read_ctrl = index.read_ctrl
+
+        def count_read(ctrl):
+            reads.append(ctrl)
+            return read_ctrl(ctrl)
+        index.read_ctrl = count_read
+
+        index.refresh("nvme0")
+        index.refresh()
+        assert_equal(reads, ["nvme0"],
+                     "ERROR : refreshed controller read again.")
+
+        os.unlink(self.sysfs_ctl + "nvme0")
+        self.add_ctrl("nvme0", "testnqn2", 1, "nvme0.new", link=True)
+        shutil.rmtree(self.sysfs_dev + "nvme0")
+        index.refresh()
+        assert_equal(reads, ["nvme0", "nvme0"],
+                     "ERROR : re-created controller not read.")
+        assert_equal(index.ctrls_of("testnqn2"), ["nvme0"],
+                     "ERROR : re-created controller not refreshed.")
@@ -0,0 +1,117 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF framework log rate limit and log file switch :-
+
+    1. Drain a subsystem token bucket, verify records beyond the burst
+       are dropped while other subsystems, warnings and records without
+       subsystem still pass.
+    2. Refill the bucket, verify the next record carries the number of
+       suppressed records and the formatter reports it.
+    3. Switch the framework log file twice, verify records queued before
+       each switch land in the previous file.
+"""
+
+
+import sys
+import logging
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from utils.log import Log
+from utils.log.log import LogFormatter
+from utils.log.log import RateLimitFilter
+
+
+class TestNVMFLogRateLimit(NVMFTest):
+
+    """ Represents framework log rate limit testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        pass
+
+    def tearDown(self):
+        """ Post section of testcase """
+        Log.set_log_file(self.test_log_dir + "/" + "framework.log")
+
+    @staticmethod
+    def record(nqn, level=logging.INFO, msg="msg"):
+        """ Build log record for subsystem nqn """
+        record = logging.LogRecord("nvmftests", level, __file__, 0, msg,
+                                   None, None)
+        if nqn is not None:
+            record.subsys = nqn
+        return record
+
+    def test_log_rate_limit(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        burst = 3
+        interval = 3600.0
+        rate_filter = RateLimitFilter(burst, interval)
+        passed = [rate_filter.filter(self.record("testnqn1"))
+                  for _ in range(burst + 2)]
+        assert_equal(passed, [True] * burst + [False] * 2,
+                     "ERROR : token bucket did not limit the burst.")
+        assert_equal(rate_filter.filter(self.record("testnqn2")), True,
+                     "ERROR : other subsystem rate limited.")
+        assert_equal(rate_filter.filter(self.record("testnqn1",
+                                                    logging.WARNING)),
+                     True, "ERROR : warning rate limited.")
+        assert_equal(rate_filter.filter(self.record(None)), True,
+                     "ERROR : record without subsystem rate limited.")
+        assert_equal(rate_filter.buckets["testnqn1"][2], 2,
+                     "ERROR : wrong suppressed count.")
+
+        # pretend one token worth of time went by
+        rate_filter.buckets["testnqn1"][1] -= interval / burst
+        record = self.record("testnqn1")
+        assert_equal(rate_filter.filter(record), True,
+                     "ERROR : bucket not refilled.")
+        assert_equal(record.suppressed, 2,
+                     "ERROR : suppressed count not reported.")
+        assert_equal(rate_filter.filter(self.record("testnqn1")), False,
+                     "ERROR : refill exceeded elapsed time.")
+        msg = LogFormatter("%(message)s").format(record)
+        assert_equal(msg, "msg (2 similar messages suppressed)",
+                     "ERROR : formatter did not note suppressed records.")
+
+        logger = Log.get_logger("nvmftests.log_rate_limit", 'target')
+        logger.setLevel(logging.INFO)
+        log_files = [self.test_log_dir + "/" + name
+                     for name in ["first.log", "second.log"]]
+        for i, log_file in enumerate(log_files):
+            Log.set_log_file(log_file)
+            for j in range(100):
+                logger.info("file " + str(i) + " record " + str(j))
+        Log.set_log_file(None)
+        for i, log_file in enumerate(log_files):
+            with open(log_file) as log:
+                lines = log.read().splitlines()
+            assert_equal(len(lines), 100,
+                         "ERROR : records lost on log file switch.")
+            assert_equal(all(("file " + str(i) + " ") in line
+                             for line in lines), True,
+                         "ERROR : records written to wrong log file.")
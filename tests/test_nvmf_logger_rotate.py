@@ -0,0 +1,100 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF console capture rotation :-
+
+    1. Write through a buffered capture logger, verify nothing reaches
+       the log file or console before the buffer fills or is flushed.
+    2. Write past the maximum log size, verify the log rotates, only
+       backup_count rotated files are kept, no file exceeds the size
+       and the kept files hold the newest output in order.
+    3. Close the logger, verify later writes go to the console only.
+"""
+
+
+import io
+import os
+import sys
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from nvmf_test_logger import NVMFLogger
+
+
+class TestNVMFLoggerRotate(NVMFTest):
+
+    """ Represents console capture rotation testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.logger = None
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        self.logger = None
+
+    def tearDown(self):
+        """ Post section of testcase """
+        if self.logger is not None:
+            self.logger.close()
+
+    def test_logger_rotate(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        log_file = self.test_log_dir + "/" + "capture.log"
+        terminal = io.StringIO()
+        self.logger = NVMFLogger(log_file, terminal, buffer_size=80,
+                                 max_size=100, backup_count=2,
+                                 flush_interval=3600)
+        lines = ["line %02d " % i + "x" * 31 + "\n" for i in range(10)]
+        self.logger.write(lines[0])
+        assert_equal(terminal.getvalue(), "",
+                     "ERROR : write not buffered.")
+        assert_equal(os.path.getsize(log_file), 0,
+                     "ERROR : write not buffered.")
+        self.logger.flush()
+        assert_equal(terminal.getvalue(), lines[0],
+                     "ERROR : flush did not reach console.")
+
+        for line in lines[1:]:
+            self.logger.write(line)
+            self.logger.flush()
+        assert_equal(terminal.getvalue(), "".join(lines),
+                     "ERROR : console output lost.")
+        assert_equal(os.path.exists(log_file + ".3"), False,
+                     "ERROR : more than backup_count files kept.")
+        kept = ""
+        for name in [log_file + ".2", log_file + ".1", log_file]:
+            assert_equal(os.path.getsize(name) <= 100, True,
+                         "ERROR : " + name + " exceeds max size.")
+            with open(name) as log:
+                kept += log.read()
+        assert_equal(kept, "".join(lines[4:]),
+                     "ERROR : rotated files do not hold newest output.")
+
+        self.logger.close()
+        self.logger.write("after close\n")
+        assert_equal(terminal.getvalue().endswith("after close\n"), True,
+                     "ERROR : write after close lost.")
+        with open(log_file) as log:
+            assert_equal("after close" in log.read(), False,
+                         "ERROR : write after close reached log file.")
+        self.logger = None
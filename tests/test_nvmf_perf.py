@@ -22,16 +22,23 @@ NVMF test parallel IOs on all controllers :-
 
     1. From the config file create Target.
     2. From the config file create host and connect to target.
-    3. Run parallel IOs on all available controller(s) and its namespace(s).
-    4. Delete Host.
-    5. Delete Target.
+    3. Run parallel IOs on all available controller(s) and its namespace(s)
+       "perf_history" "repeat" times, write the perf report of each
+       repetition to the log directory.
+    4. Append the run with the reports of all repetitions to the perf
+       history, compare with perf_compare.py.
+    5. Delete Host.
+    6. Delete Target.
 """
 
 
 import sys
 from nose.tools import assert_equal
 sys.path.append("../")
+from utils.config import Config
+from utils.const import Const
 from utils.misc.loopback import Loopback
+from nvmf.host.host_perf_history import NVMFPerfHistory
 from nvmf_test import NVMFTest
 
 
@@ -59,5 +66,22 @@ class TestNVMFParallelPerf(NVMFTest):
     def test_parallel_perf(self):
         """ Testcase main """
         print("Now Running " + self.__class__.__name__)
-        ret = self.host_subsys.run_perf_parallel(self.fio_read)
-        assert_equal(ret, True, "ERROR : running IOs failed.")
+        cfg = Config.session(self.config_file)
+        reports = []
+        for i in range(max(1, cfg.perf_repeat)):
+            report_path = self.test_log_dir + "/perf." + str(i + 1) + ".json"
+            ret = self.host_subsys.run_perf_parallel(self.fio_read,
+                                                     report_path)
+            assert_equal(ret, True, "ERROR : running IOs failed.")
+            print(self.host_subsys.perf_report.table())
+            reports.append(self.host_subsys.perf_report)
+
+        ctrl_list = self.host_subsys.ctrl_list
+        topology = {'target_type': self.target_type,
+                    'nr_ctrl': len(ctrl_list),
+                    'nr_ns': [len(ctrl.ns_list) for ctrl in ctrl_list]}
+        env = NVMFPerfHistory.fingerprint(set(Const.PERF_ENV_MODULES) |
+                                          set(cfg.module_params))
+        NVMFPerfHistory(cfg.perf_history).record(
+            self.__class__.__name__, topology,
+            NVMFPerfHistory.workload(self.fio_read), reports, env)
@@ -46,9 +46,9 @@ def __run_traffic__(iocfg):
     """
     print("Run traffic :- ")
     while True:
-        ret = DD.run_io(iocfg)
+        result = DD.run_io(iocfg)
         # For this testcase we need dd to fail after disabling the ns
-        if ret is False:
+        if result.ok is False:
             return True
 
 
@@ -73,7 +73,7 @@ class TestNVMFHostTraffic(NVMFTest):
                                 "IF": None,
                                 "OF": "/dev/null",
                                 "BS": "4K",
-                                "COUNT": str(self.data_size / self.block_size),
+                                "COUNT": str(self.data_size // self.block_size),
                                 "RC": 0}
         super(TestNVMFHostTraffic, self).common_setup()
 
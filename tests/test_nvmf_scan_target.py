@@ -22,7 +22,7 @@ NVMF scan Target :-
 
     1. From the config file create Target.
     2. From the config file create host and connect to target.
-    3. Scan target subsystem.
+    3. Scan target subsystem and verify it against configfs snapshot.
     4. Delete Host.
     5. Delete Target.
 """
@@ -60,15 +60,28 @@ class TestNVMFScanTarget(NVMFTest):
         """ Testcase main """
         print("Now Running " + self.__class__.__name__)
         success = True
+        snapshot = self.target_subsys.snapshot()
         for target_subsys in iter(self.target_subsys):
             try:
                 print("Target Controller " + target_subsys.nqn)
+                if snapshot.subsys(target_subsys.nqn) is None:
+                    print(self.err_str + target_subsys.nqn + " not found.")
+                    success = False
                 for target_ns in iter(target_subsys):
                     try:
                         print(" Target NS " + target_ns.ns_path)
+                        if snapshot.ns(target_subsys.nqn,
+                                       target_ns.ns_id) is None:
+                            print(self.err_str + target_ns.ns_path +
+                                  " not found.")
+                            success = False
                     except StopIteration:
                         success = False
                         break
+                if len(snapshot.ports_for(target_subsys.nqn)) == 0:
+                    print(self.err_str + target_subsys.nqn +
+                          " not linked to any port.")
+                    success = False
             except StopIteration:
                 success = False
                 break
@@ -0,0 +1,126 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF Apply Target configuration changes :-
+
+    1. From the config file create Target.
+    2. Generate config with one more subsystem and apply it to Target.
+    3. Apply original config to Target again.
+    4. Generate config with one more port, which changes the port
+       addresses, and apply it to Target.
+    5. Apply original config to Target again.
+    6. Delete Target.
+"""
+
+
+import sys
+from nose.tools import assert_equal
+sys.path.append("../")
+from utils.misc.loopback import Loopback
+from nvmf_test import NVMFTest
+from nvmf.target import NVMFTarget
+from nvmf.target import TargetConfig
+from nvmf.target import TargetDiff
+from nvmf.target import TargetSnapshot
+
+
+class TestNVMFTargetApply(NVMFTest):
+
+    """ Represents Apply Target configuration testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.target_subsys = None
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        self.loopdev = Loopback(self.mount_path, self.data_size,
+                                self.block_size, self.nr_dev)
+        self.loopdev.init()
+        self.build_target_config(self.loopdev.dev_list)
+        self.target_subsys = NVMFTarget(self.target_type)
+        ret = self.target_subsys.config(self.target_config_file)
+        assert_equal(ret, True, "ERROR : target config failed")
+
+    def tearDown(self):
+        """ Post section of testcase """
+        self.target_subsys.delete()
+        self.loopdev.delete()
+
+    def apply_and_verify(self, config_file, nr_subsys):
+        """ Apply config and verify configfs matches it """
+        cfgfs = self.target_subsys.cfgfs
+        config = self.target_subsys.read_config(config_file)
+        desired = TargetDiff.normalize(config)
+        diff = TargetDiff(TargetSnapshot.read(cfgfs).state(), desired)
+        assert_equal(diff.is_empty(), False,
+                     "ERROR : config does not change the target.")
+        ret = self.target_subsys.apply(config_file)
+        assert_equal(ret, True, "ERROR : apply target config failed.")
+
+        # read configfs again, the target may have cached a snapshot
+        snapshot = TargetSnapshot.read(cfgfs)
+        diff = TargetDiff(snapshot.state(), desired)
+        assert_equal(diff.is_empty(), True,
+                     "ERROR : target differs after apply " + str(diff))
+        assert_equal(len(snapshot.subsystems), nr_subsys,
+                     "ERROR : configfs subsystem count mismatch.")
+        for pcfg in config.ports:
+            port = snapshot.port(pcfg.port_id)
+            assert_equal(port is None, False,
+                         "ERROR : port " + pcfg.port_id + " not found.")
+            assert_equal(port.attrs.get('addr_traddr', ""),
+                         pcfg.addr['addr_traddr'],
+                         "ERROR : port " + pcfg.port_id +
+                         " traddr mismatch.")
+            assert_equal(sorted(port.subsystems), sorted(pcfg.subsystems),
+                         "ERROR : port " + pcfg.port_id +
+                         " subsystem links mismatch.")
+        assert_equal(len(self.target_subsys.subsys_list), nr_subsys,
+                     "ERROR : in memory subsystem list mismatch.")
+        assert_equal(sorted(port.port_id
+                            for port in self.target_subsys.port_list),
+                     sorted(pcfg.port_id for pcfg in config.ports),
+                     "ERROR : in memory port list mismatch.")
+
+    def test_target_apply(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        grow_config_file = self.test_log_dir + "/grow.json"
+        target_cfg = TargetConfig(grow_config_file,
+                                  self.nr_target_subsys + 1,
+                                  self.nr_ns_per_subsys,
+                                  self.loopdev.dev_list,
+                                  self.nr_target_ports,
+                                  self.port_policy)
+        target_cfg.build_target_subsys()
+        self.apply_and_verify(grow_config_file, self.nr_target_subsys + 1)
+        self.apply_and_verify(self.target_config_file, self.nr_target_subsys)
+        ports_config_file = self.test_log_dir + "/ports.json"
+        target_cfg = TargetConfig(ports_config_file,
+                                  self.nr_target_subsys,
+                                  self.nr_ns_per_subsys,
+                                  self.loopdev.dev_list,
+                                  self.nr_target_ports + 1,
+                                  self.port_policy)
+        target_cfg.build_target_subsys()
+        self.apply_and_verify(ports_config_file, self.nr_target_subsys)
+        self.apply_and_verify(self.target_config_file, self.nr_target_subsys)
@@ -0,0 +1,117 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF target namespace id allocator :-
+
+    1. Allocate ids from the watermark around explicit nsids.
+    2. Verify an id already taken or out of range is refused.
+    3. Free ids and verify they are reused before the watermark grows.
+    4. Allocate and free ids on both sides of a 64 bit word boundary.
+    5. Fail a namespace init in a temporary configfs directory and
+       verify its nsid is released.
+"""
+
+
+import os
+import sys
+import shutil
+import tempfile
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from nvmf.target.target_nsid import NSIDAllocator
+from nvmf.target.target_subsystem import NVMFTargetSubsystem
+
+
+class TestNVMFTargetNSID(NVMFTest):
+
+    """ Represents target namespace id allocator testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.cfgfs = None
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        self.cfgfs = tempfile.mkdtemp(prefix="nvmftests-cfgfs-")
+
+    def tearDown(self):
+        """ Post section of testcase """
+        shutil.rmtree(self.cfgfs, ignore_errors=True)
+
+    def test_target_nsid(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        alloc = NSIDAllocator(max_nsid=200)
+        assert_equal(alloc.alloc(2), 2, "ERROR : explicit nsid refused.")
+        assert_equal(alloc.alloc("4"), 4, "ERROR : explicit nsid refused.")
+        assert_equal([alloc.alloc() for _ in range(3)], [1, 3, 5],
+                     "ERROR : watermark did not skip explicit nsids.")
+
+        assert_equal(alloc.alloc(2), None, "ERROR : taken nsid allocated.")
+        assert_equal(alloc.alloc(0), None, "ERROR : nsid 0 allocated.")
+        assert_equal(alloc.alloc(201), None,
+                     "ERROR : nsid above max_nsid allocated.")
+        assert_equal(alloc.nr_allocated, 5, "ERROR : wrong allocated count.")
+
+        assert_equal(alloc.free(3), True, "ERROR : free failed.")
+        assert_equal(alloc.free(3), False, "ERROR : double free accepted.")
+        assert_equal(alloc.is_allocated(3), False,
+                     "ERROR : freed nsid still allocated.")
+        assert_equal(alloc.alloc(), 3, "ERROR : freed nsid not reused.")
+        assert_equal(alloc.free(1), True, "ERROR : free failed.")
+        assert_equal(alloc.alloc(1), 1, "ERROR : freed nsid not available.")
+        assert_equal(alloc.alloc(), 6, "ERROR : explicitly taken free id "
+                     "handed out again.")
+
+        for nsid in [63, 64, 65, 127, 128]:
+            assert_equal(alloc.alloc(nsid), nsid,
+                         "ERROR : nsid " + str(nsid) + " refused.")
+        assert_equal(sorted(alloc.bitmap), [0, 1, 2],
+                     "ERROR : wrong bitmap words.")
+        assert_equal(alloc.bitmap[1], 1 | 1 << 1 | 1 << 63,
+                     "ERROR : wrong bits around word boundary.")
+        alloc.free(128)
+        assert_equal(sorted(alloc.bitmap), [0, 1],
+                     "ERROR : empty bitmap word kept.")
+        alloc.free(64)
+        assert_equal(alloc.is_allocated(63) and alloc.is_allocated(65) and
+                     not alloc.is_allocated(64), True,
+                     "ERROR : free touched neighbour bits.")
+        assert_equal(alloc.alloc(64), 64,
+                     "ERROR : freed nsid not available.")
+
+        subsys = NVMFTargetSubsystem(self.cfgfs, "testnqn1", "hostnqn", "1")
+        assert_equal(subsys.init(), True, "ERROR : subsystem init failed.")
+        ns_attr = {'device_nguid': "1", 'device_path': "/dev/null",
+                   'enable': '0', 'nsid': "1"}
+        # a file where the namespace directory goes makes init fail
+        ns_path = subsys.subsys_path + "namespaces/1"
+        os.makedirs(os.path.dirname(ns_path))
+        open(ns_path, "w").close()
+        ns = subsys.alloc_ns(**ns_attr)
+        assert_equal(subsys.init_ns(ns), False,
+                     "ERROR : namespace init did not fail.")
+        assert_equal(subsys.nsid_alloc.is_allocated(1), False,
+                     "ERROR : nsid of failed namespace not released.")
+        os.remove(ns_path)
+        assert_equal(subsys.create_ns(**ns_attr) is None, False,
+                     "ERROR : released nsid not reusable.")
@@ -0,0 +1,102 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF multi port Target :-
+
+    1. For each port placement policy generate a multi port target config.
+    2. From the config file create Target.
+    3. Verify subsystem to port links and port traddr against configfs
+       snapshot.
+    4. From the config file create host and connect to target.
+    5. Delete Host.
+    6. Delete Target.
+"""
+
+
+import sys
+from nose.tools import assert_equal
+sys.path.append("../")
+from utils.misc.loopback import Loopback
+from nvmf_test import NVMFTest
+from nvmf.host import NVMFHost
+from nvmf.target import NVMFTarget
+from nvmf.target import TargetConfig
+
+
+class TestNVMFTargetPorts(NVMFTest):
+
+    """ Represents multi port target testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.target_subsys = None
+        self.host_subsys = None
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        self.loopdev = Loopback(self.mount_path, self.data_size,
+                                self.block_size, self.nr_dev)
+        self.loopdev.init()
+
+    def tearDown(self):
+        """ Post section of testcase """
+        self.loopdev.delete()
+
+    def verify_ports(self, config):
+        """ Verify configfs port links match the config """
+        snapshot = self.target_subsys.snapshot()
+        for pcfg in config.ports:
+            port = snapshot.port(pcfg.port_id)
+            assert_equal(port is None, False,
+                         "ERROR : port " + pcfg.port_id + " not found.")
+            assert_equal(sorted(port.subsystems), sorted(pcfg.subsystems),
+                         "ERROR : port " + pcfg.port_id +
+                         " subsystem links mismatch.")
+            assert_equal(port.attrs.get('addr_traddr', ""),
+                         pcfg.addr['addr_traddr'],
+                         "ERROR : port " + pcfg.port_id +
+                         " traddr mismatch.")
+
+    def test_target_ports(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        nr_ports = max(self.nr_target_ports, 2)
+        nr_subsys = max(self.nr_target_subsys, nr_ports)
+        for policy in TargetConfig.PORT_POLICIES:
+            print(" Port policy " + policy)
+            config_file = self.test_log_dir + "/" + policy + ".json"
+            target_cfg = TargetConfig(config_file, nr_subsys,
+                                      self.nr_ns_per_subsys,
+                                      self.loopdev.dev_list,
+                                      nr_ports, policy)
+            target_cfg.build_target_subsys()
+
+            self.target_subsys = NVMFTarget(self.target_type)
+            ret = self.target_subsys.config(config_file)
+            assert_equal(ret, True, "ERROR : target config failed")
+            self.verify_ports(self.target_subsys.read_config(config_file))
+
+            self.host_subsys = NVMFHost(self.target_type)
+            ret = self.host_subsys.config(config_file)
+            assert_equal(ret, True, "ERROR : host config failed")
+
+            self.host_subsys.delete()
+            self.target_subsys.delete(self.keep_modules)
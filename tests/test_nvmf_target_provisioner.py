@@ -0,0 +1,146 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF target provisioner rollback :-
+
+    1. Provision a subsystem and a port which names an unknown subsystem
+       in a temporary configfs directory, verify provisioning fails and
+       everything is rolled back.
+    2. Fail the subsystem attribute write after its directory was
+       created, verify the directory is rolled back.
+    3. Provision over an existing subsystem directory, verify it fails
+       and the existing directory is left in place.
+    4. Provision a port without subsystems, verify its address
+       attributes in configfs match the config.
+"""
+
+
+import os
+import sys
+import shutil
+import tempfile
+from nose.tools import assert_equal
+sys.path.append("../")
+from utils.configfs import Configfs
+from nvmf_test import NVMFTest
+from nvmf.target import NVMFTargetProvisioner
+from nvmf.target.target_model import PortConfig
+from nvmf.target.target_model import SubsystemConfig
+from nvmf.target.target_model import TargetModel
+
+
+class ProvisionTarget(object):
+
+    """ Target holding only what the provisioner uses """
+
+    def __init__(self, cfgfs):
+        self.cfgfs = cfgfs
+        self.subsys_list = []
+        self.port_list = []
+
+
+class TestNVMFTargetProvisioner(NVMFTest):
+
+    """ Represents target provisioner rollback testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.cfgfs = None
+        self.write_attr = Configfs.write_attr
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        self.cfgfs = tempfile.mkdtemp(prefix="nvmftests-cfgfs-")
+
+    def tearDown(self):
+        """ Post section of testcase """
+        Configfs.write_attr = staticmethod(self.write_attr)
+        shutil.rmtree(self.cfgfs, ignore_errors=True)
+
+    @staticmethod
+    def build_model(port_nqn):
+        """ Build port linked to port_nqn and one subsystem with one
+            namespace, port_nqn None builds a lone port """
+        sscfg = {'nqn': "testnqn1", 'allowed_hosts': ["hostnqn"],
+                 'attr': {'allow_any_host': "1"},
+                 'namespaces': [{'nsid': 1, 'enable': 1,
+                                 'device': {'path': "/dev/null",
+                                            'nguid': "1"}}]}
+        pcfg = {'portid': 1,
+                'subsystems': [port_nqn] if port_nqn is not None else [],
+                'addr': {'adrfam': "ipv4", 'traddr': "1",
+                         'treq': "not specified", 'trsvcid': "",
+                         'trtype': "loop"}}
+        if port_nqn is None:
+            return TargetModel([], [PortConfig(pcfg)])
+        return TargetModel([SubsystemConfig(sscfg)], [PortConfig(pcfg)])
+
+    def provision(self, port_nqn):
+        """ Provision model into temporary configfs """
+        target = ProvisionTarget(self.cfgfs)
+        ret = NVMFTargetProvisioner(target).provision(
+            self.build_model(port_nqn))
+        return target, ret
+
+    def test_target_provisioner(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        subsys_path = self.cfgfs + "/nvmet/subsystems/testnqn1"
+        port_path = self.cfgfs + "/nvmet/ports/1"
+
+        target, ret = self.provision("testnqn9")
+        assert_equal(ret, False, "ERROR : unknown port subsystem accepted.")
+        assert_equal(os.path.exists(subsys_path), False,
+                     "ERROR : subsystem not rolled back.")
+        assert_equal(os.path.exists(port_path), False,
+                     "ERROR : port not rolled back.")
+        assert_equal(len(target.subsys_list) + len(target.port_list), 0,
+                     "ERROR : rolled back objects stored in target.")
+
+        def write_attr(path, value):
+            """ Fail allow any host write after subsystem mkdir """
+            if path.endswith("attr_allow_any_host"):
+                return False
+            return self.write_attr(path, value)
+        Configfs.write_attr = staticmethod(write_attr)
+        target, ret = self.provision("testnqn1")
+        Configfs.write_attr = staticmethod(self.write_attr)
+        assert_equal(ret, False, "ERROR : attribute failure not reported.")
+        assert_equal(os.path.exists(subsys_path), False,
+                     "ERROR : partially created subsystem left behind.")
+        assert_equal(os.path.exists(port_path), False,
+                     "ERROR : port not rolled back.")
+
+        os.makedirs(subsys_path)
+        target, ret = self.provision("testnqn1")
+        assert_equal(ret, False, "ERROR : existing subsystem taken over.")
+        assert_equal(os.path.isdir(subsys_path), True,
+                     "ERROR : existing subsystem removed by rollback.")
+        shutil.rmtree(subsys_path)
+
+        target, ret = self.provision(None)
+        assert_equal(ret, True, "ERROR : port provisioning failed.")
+        for attr, value in target.port_list[0].port_conf.items():
+            if not attr.startswith("addr_") or value == "":
+                continue
+            with open(port_path + "/" + attr) as attr_file:
+                assert_equal(attr_file.read(), value,
+                             "ERROR : port " + attr + " mismatch.")
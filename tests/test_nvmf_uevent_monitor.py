@@ -0,0 +1,115 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+"""
+NVMF uevent monitor :-
+
+    1. Create the shared monitor through UEventMonitor.get() with a fake
+       uevent source factory.
+    2. Verify the monitor keeps the default subsystems and uses the
+       re-check interval only as a safety net.
+    3. Inject a block uevent, verify the waiter wakes up on the uevent
+       well before the re-check interval and the listener survives it.
+    4. Verify uevents of other subsystems do not wake waiters.
+"""
+
+
+import sys
+import time
+import threading
+from nose.tools import assert_equal
+sys.path.append("../")
+from nvmf_test import NVMFTest
+from utils.const import Const
+from utils.uevent import FakeUEventSource
+from utils.uevent import NetlinkUEventSource
+from utils.uevent import UEventMonitor
+
+
+class TestNVMFUEventMonitor(NVMFTest):
+
+    """ Represents shared uevent monitor testcase """
+
+    def __init__(self):
+        NVMFTest.__init__(self)
+        self.setup_log_dir(self.__class__.__name__)
+
+    def setUp(self):
+        """ Pre section of testcase """
+        UEventMonitor.set_source(None)
+        with UEventMonitor.lock:
+            UEventMonitor.monitor.stop()
+            UEventMonitor.monitor = None
+        UEventMonitor.source_factory = FakeUEventSource
+
+    def tearDown(self):
+        """ Post section of testcase """
+        UEventMonitor.source_factory = NetlinkUEventSource
+        UEventMonitor.set_source(None)
+
+    def wait_for(self, monitor, source, action, **env):
+        """ Inject uevent after a short delay and wait for it.
+            - Args :
+                - monitor : UEventMonitor object.
+                - source : FakeUEventSource of the monitor.
+                - action : uevent action.
+                - env : uevent environment.
+            - Returns :
+                - seconds the waiter slept.
+        """
+        seq = monitor.seq
+        timer = threading.Timer(0.1, source.add, [action, "/devices/x"],
+                                env)
+        start = time.time()
+        timer.start()
+        monitor.wait(lambda: True if monitor.seq != seq else None,
+                     Const.UEVENT_RECHECK_INTERVAL * 2)
+        timer.join()
+        return time.time() - start
+
+    def test_uevent_monitor(self):
+        """ Testcase main """
+        print("Now Running " + self.__class__.__name__)
+        monitor = UEventMonitor.get()
+        assert_equal(UEventMonitor.get() is monitor, True,
+                     "ERROR : shared monitor not reused.")
+        assert_equal(isinstance(monitor.source, FakeUEventSource), True,
+                     "ERROR : source factory not used.")
+        assert_equal(monitor.subsystems, ("nvme", "block"),
+                     "ERROR : wrong subsystems " + str(monitor.subsystems))
+        assert_equal(monitor.poll_interval, Const.UEVENT_RECHECK_INTERVAL,
+                     "ERROR : wrong re-check interval.")
+
+        elapsed = self.wait_for(monitor, monitor.source, "add",
+                                SUBSYSTEM="block", DEVNAME="nvme0n1")
+        assert_equal(elapsed < Const.UEVENT_RECHECK_INTERVAL / 2.0, True,
+                     "ERROR : waiter not woken by uevent, slept " +
+                     str(elapsed) + " s.")
+        assert_equal(monitor.thread.is_alive(), True,
+                     "ERROR : uevent listener died.")
+        elapsed = self.wait_for(monitor, monitor.source, "add",
+                                SUBSYSTEM="nvme", DEVNAME="nvme0")
+        assert_equal(elapsed < Const.UEVENT_RECHECK_INTERVAL / 2.0, True,
+                     "ERROR : second uevent missed.")
+
+        seq = monitor.seq
+        monitor.source.add("add", "/devices/x", SUBSYSTEM="net")
+        time.sleep(0.2)
+        assert_equal(monitor.seq, seq,
+                     "ERROR : uevent of other subsystem counted.")
@@ -29,4 +29,12 @@ from .misc import Loopback
 from .misc import GenBlk
 from .misc import NVMePCIeBlk
 
+from .config import Config
+
 from .log import Log
+
+from .configfs import Configfs
+
+from .kmod import ModuleManager
+
+from .uevent import UEventMonitor
@@ -0,0 +1,284 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents parsed once, shared test configuration.
+"""
+
+import os
+import json
+import logging
+import threading
+from types import MappingProxyType
+
+from utils.const import Const
+
+
+class IOProfile(object):
+    """
+    Represents one IO profile (dd or fio) from the test config.
+
+        - Attributes :
+            - name : profile name, key in test config.
+            - io_type : 'dd' or 'fio'.
+            - options : read only profile options as in test config.
+    """
+    __slots__ = ['name', 'io_type', 'options']
+
+    def __init__(self, name, options):
+        self.name = name
+        self.io_type = options['IO_TYPE']
+        self.options = MappingProxyType(dict(options))
+
+    def iocfg(self, **overrides):
+        """ Build IO configuration dictionary for a run.
+            - Args :
+                - overrides : values replacing profile options.
+            - Returns :
+                - new IO configuration dictionary.
+        """
+        iocfg = dict(self.options)
+        iocfg.update(overrides)
+        return iocfg
+
+
+class TestConfig(object):
+    """
+    Represents test config file (config/nvmftests.json).
+
+        - Attributes :
+            - mount_path : mount path for loop backing files.
+            - data_size : loop device size in bytes.
+            - block_size : block size in bytes.
+            - nr_dev : number of loop devices.
+            - nr_target_subsys : number of target subsystems.
+            - nr_ns_per_subsys : number of namespaces per subsystem.
+            - nr_target_ports : number of target ports.
+            - port_policy : subsystem to port placement policy.
+            - target_config_file : generated target config file path.
+            - target_config_compact : write target config compact.
+            - target_type : target transport type.
+            - keep_modules : leave kernel modules loaded after testcase.
+            - module_params : module name to desired parameters.
+            - blk_dev_pool : list of nvme pci block devices.
+            - io_profiles : profile name to IOProfile.
+            - log_levels : logger element to logging level.
+            - log_burst : rate limited messages per subsystem burst.
+            - log_interval : seconds to refill a rate limit burst.
+            - capture_buffer_size : stdout/stderr capture buffer in bytes.
+            - capture_max_size : capture file size which triggers
+                                 rotation in bytes, 0 to never rotate.
+            - capture_backup_count : number of rotated capture files kept.
+            - capture_flush_interval : seconds between capture flushes.
+            - nr_host_workers : max concurrent host controller connects.
+            - nr_io_workers : max concurrent host IO jobs.
+            - smart_interval : seconds between SMART samples, 0 disables
+                               background sampling.
+            - smart_ring_size : SMART samples kept per controller.
+    """
+    __slots__ = ['mount_path', 'data_size', 'block_size', 'nr_dev',
+                 'nr_target_subsys', 'nr_ns_per_subsys', 'nr_target_ports',
+                 'port_policy', 'target_config_file',
+                 'target_config_compact', 'target_type', 'keep_modules',
+                 'module_params', 'blk_dev_pool', 'io_profiles',
+                 'log_levels', 'log_burst', 'log_interval',
+                 'capture_buffer_size', 'capture_max_size',
+                 'capture_backup_count', 'capture_flush_interval',
+                 'nr_host_workers', 'nr_io_workers', 'smart_interval',
+                 'smart_ring_size', 'io_mode', 'async_max_jobs',
+                 'async_ctrl_jobs', 'sched_policy', 'sched_seed',
+                 'sched_jobs', 'sched_ops', 'sched_hot_fraction',
+                 'sched_hot_weight', 'sched_record', 'sched_replay',
+                 'perf_history', 'perf_repeat']
+
+    LOG_LEVELS = {"NOTSET": logging.DEBUG,
+                  "DEBUG": logging.DEBUG,
+                  "INFO": logging.INFO,
+                  "WARNING": logging.WARNING,
+                  "ERROR": logging.ERROR,
+                  "CRITICAL": logging.CRITICAL}
+
+    def __init__(self, cfg):
+        self.mount_path = cfg['mount_path']
+        self.data_size = Config.human_to_bytes(cfg['data_size'])
+        self.block_size = Config.human_to_bytes(cfg['block_size'])
+        self.nr_dev = int(cfg['nr_dev'])
+        self.nr_target_subsys = int(cfg['nr_target_subsys'])
+        self.nr_ns_per_subsys = int(cfg['nr_ns_per_subsys'])
+        self.nr_target_ports = int(cfg.get('nr_target_ports',
+                                           Const.TARGET_NR_PORTS))
+        self.port_policy = cfg.get('port_policy',
+                                   Const.PORT_POLICY_ROUND_ROBIN)
+        self.target_config_file = cfg['target_config_file']
+        self.target_config_compact = \
+            cfg.get('target_config_compact', "0") == "1"
+        self.target_type = cfg['target_type']
+        self.keep_modules = cfg.get('keep_modules_loaded', "0") == "1"
+        self.module_params = MappingProxyType(
+            dict((name, MappingProxyType(dict(params)))
+                 for name, params in cfg.get('module_params', {}).items()))
+        self.blk_dev_pool = tuple(cfg['block_dev_pool'])
+        self.io_profiles = MappingProxyType(
+            dict((name, IOProfile(name, value))
+                 for name, value in cfg.items()
+                 if isinstance(value, dict) and 'IO_TYPE' in value))
+        self.log_levels = MappingProxyType(
+            dict((element, TestConfig.LOG_LEVELS[level])
+                 for element, level in cfg['log'].items()
+                 if level in TestConfig.LOG_LEVELS))
+        rate_limit = cfg.get('log_rate_limit', {})
+        self.log_burst = int(rate_limit.get('burst', Const.LOG_BURST))
+        self.log_interval = float(rate_limit.get('interval',
+                                                 Const.LOG_INTERVAL))
+        capture = cfg.get('log_capture', {})
+        self.capture_buffer_size = Config.human_to_bytes(
+            capture.get('buffer_size', Const.CAPTURE_BUFFER_SIZE))
+        self.capture_max_size = Config.human_to_bytes(
+            capture.get('max_size', Const.CAPTURE_MAX_SIZE))
+        self.capture_backup_count = int(
+            capture.get('backup_count', Const.CAPTURE_BACKUP_COUNT))
+        self.capture_flush_interval = float(
+            capture.get('flush_interval', Const.CAPTURE_FLUSH_INTERVAL))
+        self.nr_host_workers = int(cfg.get('nr_host_workers',
+                                           Const.HOST_NR_WORKERS))
+        self.nr_io_workers = int(cfg.get('nr_io_workers',
+                                         Const.HOST_IO_WORKERS))
+        smart = cfg.get('smart_sampler', {})
+        self.smart_interval = float(smart.get('interval',
+                                              Const.SMART_SAMPLE_INTERVAL))
+        self.smart_ring_size = int(smart.get('ring_size',
+                                             Const.SMART_RING_SIZE))
+        self.io_mode = cfg.get('io_mode', Const.IO_MODE_THREAD)
+        async_io = cfg.get('async_io', {})
+        self.async_max_jobs = int(async_io.get('max_jobs',
+                                               Const.HOST_ASYNC_MAX_JOBS))
+        self.async_ctrl_jobs = int(async_io.get('ctrl_jobs',
+                                                Const.HOST_ASYNC_CTRL_JOBS))
+        sched = cfg.get('scheduler', {})
+        self.sched_policy = sched.get('policy', Const.SCHED_UNIFORM)
+        seed = sched.get('seed', "")
+        self.sched_seed = int(seed) if seed != "" else None
+        self.sched_jobs = int(sched.get('nr_jobs', Const.HOST_SCHED_JOBS))
+        self.sched_ops = int(sched.get('nr_ops', "0"))
+        self.sched_hot_fraction = float(sched.get('hot_fraction',
+                                                  Const.SCHED_HOT_FRACTION))
+        self.sched_hot_weight = float(sched.get('hot_weight',
+                                                Const.SCHED_HOT_WEIGHT))
+        self.sched_record = sched.get('record', "")
+        self.sched_replay = sched.get('replay', "")
+        perf = cfg.get('perf_history', {})
+        self.perf_history = perf.get('file', Const.PERF_HISTORY_FILE)
+        self.perf_repeat = int(perf.get('repeat', Const.PERF_REPEAT))
+
+    @staticmethod
+    def read(config_file):
+        """ Parse test config file.
+            - Args :
+                - config_file : test config file path.
+            - Returns :
+                - TestConfig object.
+        """
+        with open(config_file) as cfg_file:
+            return TestConfig(json.load(cfg_file))
+
+    def log_level(self, element):
+        """ Lookup log level of framework element.
+            - Args :
+                - element : NVMe Over Fabrics subsystem element.
+            - Returns :
+                - logging level, None if not configured.
+        """
+        return self.log_levels.get(element)
+
+
+class Config(object):
+    """
+    Represents process wide cache of parsed config files. A file is
+    parsed once and the typed model is shared by target, host and
+    testcases until the file changes on disk or is invalidated.
+
+        - Attributes :
+            - cache : absolute path to (stat stamp, loader, model).
+            - lock : protects cache.
+    """
+    cache = {}
+    lock = threading.Lock()
+
+    @staticmethod
+    def human_to_bytes(num_str):
+        """ Converts human readble format to bytes.
+            - Args :
+                - num_str : human readble string.
+            - Returns :
+                - decimal equivalant of num_str, 0 on invalid suffix.
+        """
+        num_suffix = str(num_str[-2:]).upper()
+        if num_suffix == Const.KB:
+            return int(num_str[:-2]) * Const.ONE_KB
+        elif num_suffix == Const.MB:
+            return int(num_str[:-2]) * Const.ONE_MB
+        elif num_suffix == Const.GB:
+            return int(num_str[:-2]) * Const.ONE_GB
+        return 0
+
+    @staticmethod
+    def load(config_file, loader):
+        """ Return cached model of config file, parse it when new or
+            changed.
+            - Args :
+                - config_file : config file path.
+                - loader : function building the model from file path.
+            - Returns :
+                - model returned by loader.
+        """
+        path = os.path.abspath(config_file)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with Config.lock:
+            entry = Config.cache.get(path)
+        if entry is not None and entry[0] == stamp and entry[1] is loader:
+            return entry[2]
+
+        model = loader(path)
+        with Config.lock:
+            Config.cache[path] = (stamp, loader, model)
+        return model
+
+    @staticmethod
+    def invalidate(config_file=None):
+        """ Drop cached model, call after rewriting a config file.
+            - Args :
+                - config_file : config file path, None for all files.
+            - Returns :
+                - None.
+        """
+        with Config.lock:
+            if config_file is None:
+                Config.cache.clear()
+            else:
+                Config.cache.pop(os.path.abspath(config_file), None)
+
+    @staticmethod
+    def session(config_file=Const.TEST_CONFIG_FILE):
+        """ Return the shared test configuration.
+            - Args :
+                - config_file : test config file path.
+            - Returns :
+                - TestConfig object.
+        """
+        return Config.load(config_file, TestConfig.read)
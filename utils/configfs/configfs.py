@@ -0,0 +1,183 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents direct configfs attribute I/O.
+"""
+import os
+import errno
+
+from utils.log import Log
+
+
+class Configfs(object):
+
+    """
+    Represents configfs attribute access without forking a shell.
+
+    Each attribute is written with a single open(2)/write(2)/close(2)
+    sequence, configfs consumes the whole value in one store() call so the
+    value must never be split across writes. Failures are reported with
+    the exact errno returned by the kernel.
+        - Attributes :
+    """
+
+    logger = None
+
+    @staticmethod
+    def get_logger():
+        """ Lazily create module logger.
+            - Args :
+                - None.
+            - Returns :
+                - logger handle.
+        """
+        if Configfs.logger is None:
+            Configfs.logger = Log.get_logger(__name__, 'configfs')
+        return Configfs.logger
+
+    @staticmethod
+    def strerror(err):
+        """ Format OSError with symbolic errno.
+            - Args :
+                - err : OSError instance.
+            - Returns :
+                - error string e.g. "EBUSY (Device or resource busy)".
+        """
+        name = errno.errorcode.get(err.errno, str(err.errno))
+        return name + " (" + os.strerror(err.errno) + ")"
+
+    @staticmethod
+    def write_attr(path, value):
+        """ Write single configfs attribute.
+            - Args :
+                - path : attribute file path.
+                - value : attribute value.
+            - Returns :
+                - True on success, False on failure.
+        """
+        data = str(value).encode()
+        try:
+            # same open flags as shell "echo > attr"
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        except OSError as err:
+            Configfs.get_logger().error("open " + path + " failed : " +
+                                        Configfs.strerror(err) + ".")
+            return False
+        try:
+            written = os.write(fd, data)
+            if written != len(data):
+                Configfs.get_logger().error("short write " + path + " : " +
+                                            str(written) + "/" +
+                                            str(len(data)) + ".")
+                return False
+        except OSError as err:
+            Configfs.get_logger().error("write '" + str(value) + "' to " +
+                                        path + " failed : " +
+                                        Configfs.strerror(err) + ".")
+            return False
+        finally:
+            os.close(fd)
+        return True
+
+    @staticmethod
+    def write_attrs(attr_list):
+        """ Write list of configfs attributes in order, stop on first error.
+            - Args :
+                - attr_list : list of (path, value) tuples.
+            - Returns :
+                - True on success, False on failure.
+        """
+        for path, value in attr_list:
+            if Configfs.write_attr(path, value) is False:
+                return False
+        return True
+
+    @staticmethod
+    def read_attr(path):
+        """ Read single configfs attribute.
+            - Args :
+                - path : attribute file path.
+            - Returns :
+                - attribute value without trailing newline, None on failure.
+        """
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError as err:
+            Configfs.get_logger().error("open " + path + " failed : " +
+                                        Configfs.strerror(err) + ".")
+            return None
+        try:
+            data = os.read(fd, 4096)
+        except OSError as err:
+            Configfs.get_logger().error("read " + path + " failed : " +
+                                        Configfs.strerror(err) + ".")
+            return None
+        finally:
+            os.close(fd)
+        return data.decode().rstrip('\n')
+
+    @staticmethod
+    def mkdir(path):
+        """ Create configfs group directory.
+            - Args :
+                - path : directory path.
+            - Returns :
+                - True on success, False on failure.
+        """
+        try:
+            os.makedirs(path)
+        except OSError as err:
+            Configfs.get_logger().error("mkdir " + path + " failed : " +
+                                        Configfs.strerror(err) + ".")
+            return False
+        return True
+
+    @staticmethod
+    def link(src, dest):
+        """ Create configfs symlink.
+            - Args :
+                - src : link target.
+                - dest : link path.
+            - Returns :
+                - True on success, False on failure.
+        """
+        try:
+            os.symlink(src, dest)
+        except OSError as err:
+            Configfs.get_logger().error("link " + src + " -> " + dest +
+                                        " failed : " +
+                                        Configfs.strerror(err) + ".")
+            return False
+        return True
+
+    @staticmethod
+    def unlink(path):
+        """ Remove configfs symlink.
+            - Args :
+                - path : link path.
+            - Returns :
+                - True on success, False on failure.
+        """
+        try:
+            os.unlink(path)
+        except OSError as err:
+            Configfs.get_logger().error("unlink " + path + " failed : " +
+                                        Configfs.strerror(err) + ".")
+            return False
+        return True
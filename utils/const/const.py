@@ -44,7 +44,71 @@ class Const:
     SMART_LOG_VALUE = 1
     ALLOW_HOST_VALUE = 0
 
+    NVME_MAX_NSID = 0xFFFFFFFE
+
+    TEST_CONFIG_FILE = "config/nvmftests.json"
+
+    LOG_BURST = 20
+    LOG_INTERVAL = 1
+
+    CAPTURE_BUFFER_SIZE = "64KB"
+    CAPTURE_MAX_SIZE = "100MB"
+    CAPTURE_BACKUP_COUNT = 3
+    CAPTURE_FLUSH_INTERVAL = 1
+
+    TARGET_NR_WORKERS = 8
+    TARGET_NR_PORTS = 1
+
+    PORT_POLICY_ROUND_ROBIN = "round_robin"
+    PORT_POLICY_HASH = "hash"
+    PORT_POLICY_ALL = "all"
+    HOST_NR_WORKERS = 8
+    HOST_IO_WORKERS = 64
+    HOST_ASYNC_MAX_JOBS = 256
+    HOST_ASYNC_CTRL_JOBS = 32
+    HOST_ASYNC_POLL_INTERVAL = 0.01
+    HOST_SCHED_JOBS = 8
+    SCHED_UNIFORM = "uniform"
+    SCHED_CAPACITY = "capacity"
+    SCHED_HOTSET = "hotset"
+    SCHED_HOT_FRACTION = 0.2
+    SCHED_HOT_WEIGHT = 0.8
+    PERF_HISTORY_FILE = "./logs/perf_history.jsonl"
+    PERF_ALPHA = 0.05
+    PERF_THRESHOLD = 5
+    PERF_PERMUTATIONS = 10000
+    PERF_REPEAT = 5
+    PERF_ENV_MODULES = ["nvme_core", "nvme_fabrics", "nvme_loop", "nvmet"]
+    IO_MODE_THREAD = "thread"
+    IO_MODE_ASYNC = "async"
+
     SYSFS_DEFAULT_MOUNT_PATH = "/sys/kernel/config/"
     SYSFS_NVMET = "/nvmet/"
     SYSFS_NVMET_SUBSYS = SYSFS_NVMET + "/subsystems/"
     SYSFS_NVMET_SUBSYS_NS = "/namespaces/"
+    SYSFS_NVMET_PORTS = SYSFS_NVMET + "/ports/"
+    SYSFS_NVMET_HOSTS = SYSFS_NVMET + "/hosts/"
+
+    SYSFS_NVME_FABRICS_CTL = "/sys/class/nvme-fabrics/ctl/"
+    DEV_PATH = "/dev/"
+    NVME_FABRICS_DEV = "/dev/nvme-fabrics"
+    NVME_FABRICS_REPLY_SIZE = 4096
+
+    NVME_IOCTL_ID = 0x4E40
+    NVME_IOCTL_ADMIN_CMD = 0xC0484E41
+    NVME_ADMIN_GET_LOG_PAGE = 0x02
+    NVME_ADMIN_IDENTIFY = 0x06
+    NVME_ID_CNS_NS = 0x00
+    NVME_ID_CNS_CTRL = 0x01
+    NVME_ID_CNS_NS_DESC_LIST = 0x03
+    NVME_LOG_SMART = 0x02
+    NVME_NSID_ALL = 0xFFFFFFFF
+    NVME_SC_INVALID_FIELD = 0x2
+    # SMART data units are thousands of 512 byte units
+    SMART_DATA_UNIT = 512000
+    SMART_SAMPLE_INTERVAL = 1
+    SMART_RING_SIZE = 3600
+
+    HOST_DISCOVERY_TIMEOUT = 10
+    UEVENT_POLL_INTERVAL = 0.05
+    UEVENT_RECHECK_INTERVAL = 1
@@ -19,3 +19,5 @@
 #
 from .dd import DD
 from .fio import FIO
+from .result import IOResult
+from .result import IOResultSet
@@ -20,31 +20,89 @@
 """ Represents dd(1) wrapper
 """
 
-import subprocess
+import re
+
+from .result import IOResult
 
 
 class DD(object):
 
     """
     Represents dd command wrapper.
+        - Attributes :
+            - CAPTURE : dd statistics are captured from stderr.
+            - BYTES_RE : bytes copied line of the dd statistics.
     """
+    CAPTURE = True
+    BYTES_RE = re.compile(r"^(\d+) bytes", re.MULTILINE)
 
     @staticmethod
-    def run_io(iocfg):
-        """ Executes dd command based on the config argument.
+    def build_cmd(iocfg):
+        """ Build dd command line from the config argument.
+            - Args :
+                - IO Configuration for dd command.
+            - Returns :
+                - dd argument list.
+        """
+        return ["dd", "if=" + iocfg['IF'], "of=" + iocfg['OF'],
+                "bs=" + iocfg['BS'], "count=" + iocfg['COUNT']]
+
+    @staticmethod
+    def device(iocfg):
+        """ Device the job reads or writes.
             - Args :
                 - IO Configuration for dd command.
             - Returns :
-                - True on success, False on failure.
+                - input file for reads, output file otherwise.
         """
-        cmd = "dd if=" + iocfg['IF'] + " of=" + iocfg['OF'] + \
-            " bs=" + iocfg['BS'] + " count=" + iocfg['COUNT'] + \
-            " > /tmp/op 2>&1"
+        if iocfg.get('IODIR') == "read":
+            return iocfg['IF']
+        return iocfg['OF']
 
-        proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE)
-        ret = True
-        rc = proc.wait()
-        if rc != iocfg['RC']:
-            ret = False
+    @staticmethod
+    def new_result(iocfg):
+        """ Result record of a dd job, output is captured to
+            iocfg['OUTPUT'] or <device>_dd.log.
+            - Args :
+                - IO Configuration for dd command.
+            - Returns :
+                - IOResult object.
+        """
+        dev = DD.device(iocfg)
+        output = iocfg.get('OUTPUT', dev.split('/')[-1] + "_dd.log")
+        return IOResult('dd', dev, output, iocfg['RC'])
 
-        return ret
+    @staticmethod
+    def parse_bytes(text):
+        """ Bytes copied from dd statistics.
+            - Args :
+                - text : dd output.
+            - Returns :
+                - bytes copied, 0 if not reported.
+        """
+        match = DD.BYTES_RE.search(text)
+        if match is None:
+            return 0
+        return int(match.group(1))
+
+    @staticmethod
+    def parse_output(result, text):
+        """ Record bytes copied from dd statistics.
+            - Args :
+                - result : IOResult of the job.
+                - text : dd output.
+            - Returns :
+                - None.
+        """
+        result.nbytes = DD.parse_bytes(text)
+
+    @staticmethod
+    def run_io(iocfg):
+        """ Executes dd command based on the config argument.
+            - Args :
+                - IO Configuration for dd command.
+            - Returns :
+                - IOResult object, result.ok is True on success.
+        """
+        return DD.new_result(iocfg).run(DD.build_cmd(iocfg), DD.CAPTURE,
+                                        DD.parse_output)
@@ -20,55 +20,150 @@
 """ Represents FIO wrapper
 """
 
-import subprocess
+import json
+
+from .result import IOResult
 
 
 class FIO(object):
 
     """
     Represents fio command wrapper.
+        - Attributes :
+            - CAPTURE : fio writes its own output file.
+            - DIRS : reported IO directions.
+            - PERCENTILES : metric name to fio completion latency
+                            percentile key.
     """
+    CAPTURE = False
+    DIRS = ['read', 'write', 'trim']
+    PERCENTILES = [('p50', "50.000000"), ('p99', "99.000000"),
+                   ('p99.9', "99.900000")]
 
     @staticmethod
-    def run_io(iocfg):
-        """ Executes fio command based on the config argument.
+    def build_cmd(iocfg):
+        """ Build fio command line from the config argument.
             - Args :
                 - IO Configuration for fio command.
             - Returns :
-                - True on success, False on failure.
+                - fio argument list.
         """
-        cmd = "fio "
-        cmd += " --group_reporting=" + iocfg['group_reporting']
-        cmd += " --rw=" + iocfg['rw']
-        cmd += " --bs=" + iocfg['bs']
-        cmd += " --numjobs=" + iocfg['numjobs']
-        cmd += " --iodepth=" + iocfg['iodepth']
-        cmd += " --runtime=" + iocfg['runtime']
-        cmd += " --loops=" + iocfg['loop']
-        cmd += " --ioengine=" + iocfg['ioengine']
-        cmd += " --direct=" + iocfg['direct']
-        cmd += " --invalidate=" + iocfg['invalidate']
-        cmd += " --randrepeat=" + iocfg['randrepeat']
-        cmd += " --time_based "
-        cmd += " --norandommap"
-        cmd += " --exitall"
-        cmd += " --size=" + iocfg['size']
+        cmd = ["fio"]
+        cmd.append("--group_reporting=" + iocfg['group_reporting'])
+        cmd.append("--rw=" + iocfg['rw'])
+        cmd.append("--bs=" + iocfg['bs'])
+        cmd.append("--numjobs=" + iocfg['numjobs'])
+        cmd.append("--iodepth=" + iocfg['iodepth'])
+        cmd.append("--runtime=" + iocfg['runtime'])
+        cmd.append("--loops=" + iocfg['loop'])
+        cmd.append("--ioengine=" + iocfg['ioengine'])
+        cmd.append("--direct=" + iocfg['direct'])
+        cmd.append("--invalidate=" + iocfg['invalidate'])
+        cmd.append("--randrepeat=" + iocfg['randrepeat'])
+        cmd.append("--time_based")
+        cmd.append("--norandommap")
+        cmd.append("--exitall")
+        cmd.append("--size=" + iocfg['size'])
         if 'filename' in iocfg:
-            cmd += " --filename=" + iocfg['filename']
-            cmd += " --output=" + iocfg['filename'].split('/')[-1] + "_fio.log"
+            cmd.append("--filename=" + iocfg['filename'])
         else:
-            cmd += " --directory=" + iocfg['directory']
-            cmd += " --output=" + iocfg['directory'].split('/')[-2] + \
-                   "_fio.log"
-        cmd += " --name=" + iocfg['name']
-        ret = True
-        proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE)
-        rc = proc.wait()
+            cmd.append("--directory=" + iocfg['directory'])
+        cmd.append("--output-format=json")
+        cmd.append("--output=" + FIO.output_path(iocfg))
+        cmd.append("--name=" + iocfg['name'])
+        return cmd
+
+    @staticmethod
+    def output_path(iocfg):
+        """ fio output file of the job.
+            - Args :
+                - IO Configuration for fio command.
+            - Returns :
+                - <device>_fio.json or <directory>_fio.json.
+        """
+        if 'filename' in iocfg:
+            return iocfg['filename'].split('/')[-1] + "_fio.json"
+        return iocfg['directory'].split('/')[-2] + "_fio.json"
+
+    @staticmethod
+    def new_result(iocfg):
+        """ Result record of a fio job.
+            - Args :
+                - IO Configuration for fio command.
+            - Returns :
+                - IOResult object.
+        """
+        dev = iocfg['filename'] if 'filename' in iocfg \
+            else iocfg['directory']
+        return IOResult('fio', dev, FIO.output_path(iocfg), iocfg['RC'])
+
+    @staticmethod
+    def parse_json(text):
+        """ Per direction metrics from fio json output, jobs are summed,
+            latency percentiles are the worst of the jobs.
+            - Args :
+                - text : fio output.
+            - Returns :
+                - dictionary direction to iops, bw (bytes/s), io_bytes,
+                  lat_mean, p50, p99 and p99.9 (usec), None if the output
+                  is not fio json.
+        """
+        start = text.find('{')
+        if start < 0:
+            return None
+        try:
+            output = json.loads(text[start:])
+        except ValueError:
+            return None
+        metrics = {}
+        for direction in FIO.DIRS:
+            total = {'iops': 0.0, 'bw': 0, 'io_bytes': 0, 'lat_mean': 0.0}
+            total.update((name, 0.0) for name, key in FIO.PERCENTILES)
+            nr_ios = 0
+            for job in output.get('jobs', []):
+                stats = job.get(direction)
+                if not stats or stats.get('total_ios', 0) == 0:
+                    continue
+                total['iops'] += stats.get('iops', 0)
+                # bw is KiB/s, bw_bytes is reported since fio 3.0
+                total['bw'] += stats.get('bw_bytes',
+                                         stats.get('bw', 0) * 1024)
+                total['io_bytes'] += stats.get('io_bytes', 0)
+                clat = stats.get('clat_ns', {})
+                total['lat_mean'] += clat.get('mean', 0) * stats['total_ios']
+                nr_ios += stats['total_ios']
+                percentile = clat.get('percentile', {})
+                for name, key in FIO.PERCENTILES:
+                    total[name] = max(total[name],
+                                      percentile.get(key, 0) / 1000.0)
+            if nr_ios == 0:
+                continue
+            total['lat_mean'] = total['lat_mean'] / nr_ios / 1000.0
+            metrics[direction] = total
+        return metrics
+
+    @staticmethod
+    def parse_output(result, text):
+        """ Record metrics and bytes moved from fio json output.
+            - Args :
+                - result : IOResult of the job.
+                - text : fio output.
+            - Returns :
+                - None.
         """
+        result.metrics = FIO.parse_json(text) or {}
+        result.nbytes = sum(stats['io_bytes']
+                            for stats in result.metrics.values())
+
+    @staticmethod
+    def run_io(iocfg):
+        """ Executes fio command based on the config argument.
             some testcases expect fio to fail which is success for the
-            testcase so we test against RC value before deciding success and
-            failure of fio execution
+            testcase so the exit code is tested against RC value.
+            - Args :
+                - IO Configuration for fio command.
+            - Returns :
+                - IOResult object, result.ok is True on success.
         """
-        if rc != iocfg['RC']:
-            ret = False
-        return ret
+        return FIO.new_result(iocfg).run(FIO.build_cmd(iocfg), FIO.CAPTURE,
+                                         FIO.parse_output)
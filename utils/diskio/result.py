@@ -0,0 +1,251 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents result records of IO jobs.
+"""
+
+import os
+import time
+import threading
+import subprocess
+
+from utils.const import Const
+
+
+class IOResult(object):
+
+    """
+    Represents result record of one dd/fio job.
+        - Attributes :
+            - io_type : dd or fio.
+            - dev : device or directory the job ran on.
+            - output : captured output file, None if not captured.
+            - expected_rc : exit code of a successful job.
+            - start : start timestamp.
+            - end : end timestamp.
+            - rc : exit code, negative signal number if killed.
+            - ok : True if rc matches expected_rc.
+            - nbytes : bytes moved as reported by the job.
+            - metrics : per direction metrics reported by the job, e.g.
+                        fio iops, bandwidth and latency percentiles.
+            - utime : child user cpu seconds.
+            - stime : child system cpu seconds.
+            - maxrss : child max resident set size in KB.
+    """
+    def __init__(self, io_type, dev, output=None, expected_rc=0):
+        self.io_type = io_type
+        self.dev = dev
+        self.output = output
+        self.expected_rc = expected_rc
+        self.start = None
+        self.end = None
+        self.rc = None
+        self.ok = False
+        self.nbytes = 0
+        self.metrics = {}
+        self.utime = None
+        self.stime = None
+        self.maxrss = None
+
+    @staticmethod
+    def exit_code(status):
+        """ Exit code of wait status, same convention as subprocess.
+            - Args :
+                - status : wait status.
+            - Returns :
+                - exit code, negative signal number if killed.
+        """
+        if os.WIFSIGNALED(status):
+            return -os.WTERMSIG(status)
+        return os.WEXITSTATUS(status)
+
+    def elapsed(self):
+        """ Job wall time.
+            - Args :
+                - None.
+            - Returns :
+                - seconds between start and end, 0 if not finished.
+        """
+        if self.start is None or self.end is None:
+            return 0
+        return self.end - self.start
+
+    def spawn(self, argv, capture):
+        """ Start the job process.
+            - Args :
+                - argv : command line.
+                - capture : write stdout and stderr to output.
+            - Returns :
+                - subprocess.Popen object.
+        """
+        self.start = time.time()
+        if not capture:
+            return subprocess.Popen(argv, stdout=subprocess.DEVNULL)
+        with open(self.output, "w") as output:
+            return subprocess.Popen(argv, stdout=output,
+                                    stderr=subprocess.STDOUT)
+
+    def finish(self, proc, status, rusage, parse_output):
+        """ Record exit status and resource usage of the reaped process.
+            - Args :
+                - proc : subprocess.Popen object.
+                - status : wait status returned by os.wait4().
+                - rusage : resource usage returned by os.wait4().
+                - parse_output : function recording bytes moved and
+                                 metrics from the output text.
+            - Returns :
+                - None.
+        """
+        self.end = time.time()
+        self.rc = proc.returncode = IOResult.exit_code(status)
+        self.ok = self.rc == self.expected_rc
+        self.utime = rusage.ru_utime
+        self.stime = rusage.ru_stime
+        self.maxrss = rusage.ru_maxrss
+        if self.output is not None and os.path.exists(self.output):
+            with open(self.output, errors="replace") as output:
+                parse_output(self, output.read())
+
+    def run(self, argv, capture, parse_output):
+        """ Run the job process and wait for completion.
+            - Args :
+                - argv : command line.
+                - capture : write stdout and stderr to output.
+                - parse_output : function recording bytes moved and
+                                 metrics from the output text.
+            - Returns :
+                - self.
+        """
+        proc = self.spawn(argv, capture)
+        status, rusage = os.wait4(proc.pid, 0)[1:]
+        self.finish(proc, status, rusage, parse_output)
+        return self
+
+    def to_dict(self):
+        """ Result record as dictionary.
+            - Args :
+                - None.
+            - Returns :
+                - dictionary of the attributes.
+        """
+        ret = dict(self.__dict__)
+        ret['metrics'] = dict(self.metrics)
+        return ret
+
+
+class IOResultSet(object):
+
+    """
+    Represents result records aggregated per namespace, controller or
+    run, safe to add to from many threads.
+        - Attributes :
+            - name : aggregate name.
+            - results : list of IOResult.
+            - lock : protects results.
+    """
+    def __init__(self, name, results=None):
+        self.name = name
+        self.results = list(results or [])
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def merge(name, result_sets):
+        """ Aggregate several result sets.
+            - Args :
+                - name : aggregate name.
+                - result_sets : list of IOResultSet.
+            - Returns :
+                - IOResultSet with the records of all sets.
+        """
+        results = []
+        for result_set in result_sets:
+            results.extend(result_set.snapshot())
+        return IOResultSet(name, results)
+
+    def add(self, result):
+        """ Add job result record.
+            - Args :
+                - result : IOResult object.
+            - Returns :
+                - None.
+        """
+        with self.lock:
+            self.results.append(result)
+
+    def reset(self):
+        """ Drop all result records.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        with self.lock:
+            self.results = []
+
+    def snapshot(self):
+        """ Copy of the result records.
+            - Args :
+                - None.
+            - Returns :
+                - list of IOResult.
+        """
+        with self.lock:
+            return list(self.results)
+
+    def summary(self):
+        """ Aggregated result of the finished jobs.
+            - Args :
+                - None.
+            - Returns :
+                - dictionary with count, failed, bytes, wall (first start
+                  to last end), busy (sum of job times), bps (bytes per
+                  wall second), utime and stime.
+        """
+        results = [result for result in self.snapshot()
+                   if result.end is not None]
+        summary = {'count': len(results),
+                   'failed': len([result for result in results
+                                  if not result.ok]),
+                   'bytes': sum(result.nbytes for result in results),
+                   'wall': 0, 'busy': 0, 'bps': 0, 'utime': 0, 'stime': 0}
+        if len(results) == 0:
+            return summary
+        summary['wall'] = max(result.end for result in results) - \
+            min(result.start for result in results)
+        summary['busy'] = sum(result.elapsed() for result in results)
+        summary['utime'] = sum(result.utime or 0 for result in results)
+        summary['stime'] = sum(result.stime or 0 for result in results)
+        if summary['wall'] > 0:
+            summary['bps'] = summary['bytes'] / summary['wall']
+        return summary
+
+    def report(self):
+        """ One line summary of the aggregate.
+            - Args :
+                - None.
+            - Returns :
+                - summary string.
+        """
+        summary = self.summary()
+        return self.name + " : %d jobs %d failed, %.2f MB in %.3f s " \
+            "%.2f MB/s, cpu user %.3f s sys %.3f s" % \
+            (summary['count'], summary['failed'],
+             summary['bytes'] / Const.ONE_MB, summary['wall'],
+             summary['bps'] / Const.ONE_MB, summary['utime'],
+             summary['stime'])
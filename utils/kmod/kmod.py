@@ -0,0 +1,289 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents kernel module state management.
+"""
+
+import os
+import time
+import threading
+
+from utils.shell import Cmd
+
+
+class ModuleManager(object):
+
+    """
+    Represents process wide kernel module state. Module state is checked
+    in /sys/module before running modprobe, a module is only reloaded when
+    its desired parameters differ from the ones it is loaded with, and time
+    spent in module operations is accounted per testcase.
+        - Attributes :
+            - sysfs_module : sysfs module directory.
+            - desired : module name to desired parameter dictionary.
+            - stats : operation to [count, seconds] accounting.
+    """
+
+    sysfs_module = "/sys/module/"
+    desired = {}
+    stats = {}
+    lock = threading.RLock()
+
+    @staticmethod
+    def sysfs_name(name):
+        """ Convert module name to its /sys/module name.
+            - Args :
+                - name : module name.
+            - Returns :
+                - sysfs module name.
+        """
+        return name.replace('-', '_')
+
+    @staticmethod
+    def account(op, start):
+        """ Account time spent in module operation.
+            - Args :
+                - op : operation name.
+                - start : operation start time.
+            - Returns :
+                - None.
+        """
+        entry = ModuleManager.stats.setdefault(op, [0, 0.0])
+        entry[0] += 1
+        entry[1] += time.time() - start
+
+    @staticmethod
+    def reset_stats():
+        """ Reset module operation accounting.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        with ModuleManager.lock:
+            ModuleManager.stats = {}
+
+    @staticmethod
+    def get_stats():
+        """ Module operation accounting.
+            - Args :
+                - None.
+            - Returns :
+                - dictionary operation -> (count, seconds).
+        """
+        with ModuleManager.lock:
+            return dict((op, tuple(entry)) for op, entry in
+                        ModuleManager.stats.items())
+
+    @staticmethod
+    def set_params(name, **params):
+        """ Record desired parameters for module, applied on next load().
+            - Args :
+                - name : module name.
+                - params : module parameters.
+            - Returns :
+                - None.
+        """
+        with ModuleManager.lock:
+            ModuleManager.desired[ModuleManager.sysfs_name(name)] = \
+                dict((key, str(val)) for key, val in params.items())
+
+    @staticmethod
+    def is_loaded(name):
+        """ Check if module is loaded or built in.
+            - Args :
+                - name : module name.
+            - Returns :
+                - True if module is present in /sys/module, False otherwise.
+        """
+        return os.path.isdir(ModuleManager.sysfs_module +
+                             ModuleManager.sysfs_name(name))
+
+    @staticmethod
+    def is_builtin(name):
+        """ Check if module is built into the kernel.
+            - Args :
+                - name : module name.
+            - Returns :
+                - True if module is present but not loadable, False otherwise.
+        """
+        path = ModuleManager.sysfs_module + ModuleManager.sysfs_name(name)
+        return os.path.isdir(path) and \
+            not os.path.exists(path + "/initstate")
+
+    @staticmethod
+    def get_param(name, param):
+        """ Read current module parameter.
+            - Args :
+                - name : module name.
+                - param : parameter name.
+            - Returns :
+                - parameter value, None if not readable.
+        """
+        path = ModuleManager.sysfs_module + ModuleManager.sysfs_name(name) + \
+            "/parameters/" + param
+        try:
+            with open(path, "r") as param_file:
+                return param_file.read().strip()
+        except (IOError, OSError):
+            return None
+
+    @staticmethod
+    def get_params(name):
+        """ Read all current module parameters.
+            - Args :
+                - name : module name.
+            - Returns :
+                - parameter name to value dictionary, empty if the module
+                  is not loaded.
+        """
+        path = ModuleManager.sysfs_module + ModuleManager.sysfs_name(name) + \
+            "/parameters/"
+        try:
+            names = os.listdir(path)
+        except (IOError, OSError):
+            return {}
+        params = {}
+        for param in names:
+            value = ModuleManager.get_param(name, param)
+            if value is not None:
+                params[param] = value
+        return params
+
+    @staticmethod
+    def same_value(current, wanted):
+        """ Compare sysfs parameter value with desired value.
+            - Args :
+                - current : value read from sysfs.
+                - wanted : desired value.
+            - Returns :
+                - True if values are equivalent, False otherwise.
+        """
+        if current == wanted:
+            return True
+        bools = {'y': 'Y', '1': 'Y', 'true': 'Y', 'on': 'Y',
+                 'n': 'N', '0': 'N', 'false': 'N', 'off': 'N'}
+        if current in ('Y', 'N'):
+            return bools.get(wanted.lower()) == current
+        return False
+
+    @staticmethod
+    def params_match(name, params):
+        """ Check if loaded module runs with desired parameters.
+            - Args :
+                - name : module name.
+                - params : desired parameters.
+            - Returns :
+                - True if all parameters match, False otherwise.
+        """
+        for param, wanted in params.items():
+            current = ModuleManager.get_param(name, param)
+            if current is None or \
+               not ModuleManager.same_value(current, wanted):
+                return False
+        return True
+
+    @staticmethod
+    def wanted_params(name, params):
+        """ Merge explicit parameters over recorded desired parameters.
+            - Args :
+                - name : module name.
+                - params : explicit module parameters.
+            - Returns :
+                - parameter dictionary.
+        """
+        wanted = dict(ModuleManager.desired.get(
+            ModuleManager.sysfs_name(name), {}))
+        wanted.update((key, str(val)) for key, val in params.items())
+        return wanted
+
+    @staticmethod
+    def up_to_date(name, **params):
+        """ Check if load() would be a no-op.
+            - Args :
+                - name : module name.
+                - params : module parameters, merged over set_params().
+            - Returns :
+                - True if module is loaded with desired parameters.
+        """
+        with ModuleManager.lock:
+            return ModuleManager.is_loaded(name) and \
+                ModuleManager.params_match(
+                    name, ModuleManager.wanted_params(name, params))
+
+    @staticmethod
+    def load(name, **params):
+        """ Load module with desired parameters, reload it if it is loaded
+            with different parameters, do nothing otherwise.
+            - Args :
+                - name : module name.
+                - params : module parameters, merged over set_params().
+            - Returns :
+                - True on success, False on failure.
+        """
+        with ModuleManager.lock:
+            wanted = ModuleManager.wanted_params(name, params)
+
+            if ModuleManager.is_loaded(name):
+                if ModuleManager.params_match(name, wanted):
+                    return True
+                if ModuleManager.is_builtin(name):
+                    # can't reload built in module
+                    return False
+                if ModuleManager.unload(name) is False:
+                    return False
+                op = "reload"
+            else:
+                op = "load"
+
+            start = time.time()
+            cmd = "modprobe " + name
+            for key in sorted(wanted):
+                cmd += " " + key + "=" + wanted[key]
+            ret = Cmd.exec_cmd(cmd)
+            ModuleManager.account(op, start)
+            return ret
+
+    @staticmethod
+    def unload(name):
+        """ Unload module and the modules holding it.
+            - Args :
+                - name : module name.
+            - Returns :
+                - True on success, False on failure.
+        """
+        with ModuleManager.lock:
+            if not ModuleManager.is_loaded(name):
+                return True
+            if ModuleManager.is_builtin(name):
+                return False
+            holders = ModuleManager.sysfs_module + \
+                ModuleManager.sysfs_name(name) + "/holders/"
+            try:
+                holder_list = os.listdir(holders)
+            except OSError:
+                holder_list = []
+            for holder in holder_list:
+                if ModuleManager.unload(holder) is False:
+                    return False
+
+            start = time.time()
+            ret = Cmd.exec_cmd("modprobe -r " + name)
+            ModuleManager.account("unload", start)
+            return ret
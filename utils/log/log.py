@@ -19,40 +19,233 @@
 #
 """ Represents Testcaes Logging setup.
 """
-import json
+import sys
+import time
+import atexit
 import logging
+import threading
+from queue import Queue
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+
+from utils.config import Config
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    Represents queue handler for IO issuing threads. Records are queued
+    as is, message formatting is left to the listener thread.
+    """
+    def prepare(self, record):
+        """ Prepare record for queuing.
+            - Args :
+                - record : log record.
+            - Returns :
+                - unmodified log record.
+        """
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Represents per subsystem token bucket for noisy messages. Records
+    logged with extra={'subsys': nqn} below WARNING are limited to burst
+    messages per interval for each nqn, the next record let through
+    carries the number of records dropped meanwhile.
+
+        - Attributes :
+            - burst : messages allowed back to back per subsystem.
+            - interval : seconds to refill a full burst.
+            - buckets : nqn to [tokens, last update, suppressed].
+            - lock : protects buckets.
+    """
+    def __init__(self, burst, interval):
+        super(RateLimitFilter, self).__init__()
+        self.burst = burst
+        self.interval = interval
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        """ Decide if record is logged.
+            - Args :
+                - record : log record.
+            - Returns :
+                - True to log record, False to drop it.
+        """
+        key = getattr(record, 'subsys', None)
+        if key is None or record.levelno >= logging.WARNING or \
+           self.burst <= 0:
+            return True
+
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [self.burst, now, 0]
+            refill = (now - bucket[1]) * self.burst / self.interval
+            bucket[0] = min(self.burst, bucket[0] + refill)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class LogFormatter(logging.Formatter):
+    """
+    Represents formatter noting rate limited records.
+    """
+    def format(self, record):
+        """ Format record.
+            - Args :
+                - record : log record.
+            - Returns :
+                - formatted message.
+        """
+        msg = super(LogFormatter, self).format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed != 0:
+            msg += " (" + str(suppressed) + " similar messages suppressed)"
+        return msg
+
+
+class StderrHandler(logging.StreamHandler):
+    """
+    Represents console handler writing to the current sys.stderr, which
+    testcases redirect to their own log directory.
+    """
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
 
 
 class Log(object):
 
     """
-    Represents a console logger setup helper for a module.
+    Represents centralized, non blocking logging setup. Framework loggers
+    only put records on a queue, a listener thread formats them and
+    writes warnings to the console and everything to the testcase log
+    file.
         - Attributes :
+            - queue : log record queue.
+            - handler : queue handler shared by framework loggers.
+            - console : console handler, warnings and above.
+            - file_handler : testcase log file handler.
+            - listener : background writer.
+            - levels : cached element to log level.
+            - lock : protects setup and handler attach.
     """
+    FORMAT = "%(asctime)s %(threadName)s %(levelname)s %(name)s : " + \
+        "%(message)s"
+
+    queue = None
+    handler = None
+    console = None
+    file_handler = None
+    listener = None
+    levels = {}
+    lock = threading.Lock()
 
     @staticmethod
-    def get_logger(name, element):
-        """ Returns the log level from config file.
+    def setup():
+        """ Create queue, handlers and start listener once per process.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        with Log.lock:
+            if Log.listener is not None:
+                return
+            cfg = Config.session()
+            Log.queue = Queue(-1)
+            Log.handler = LogQueueHandler(Log.queue)
+            Log.handler.addFilter(RateLimitFilter(cfg.log_burst,
+                                                  cfg.log_interval))
+            Log.console = StderrHandler()
+            Log.console.setLevel(logging.WARNING)
+            Log.console.setFormatter(LogFormatter(Log.FORMAT))
+            Log.listener = QueueListener(Log.queue, Log.console,
+                                         respect_handler_level=True)
+            Log.listener.start()
+            atexit.register(Log.shutdown)
+
+    @staticmethod
+    def set_log_file(log_file_path):
+        """ Send all framework records to a new log file, records queued
+            so far are written to the previous one.
+            - Args :
+                - log_file_path : log file path, None to stop file logging.
+            - Returns :
+                - None.
+        """
+        Log.setup()
+        with Log.lock:
+            Log.listener.stop()
+            if Log.file_handler is not None:
+                Log.file_handler.close()
+                Log.file_handler = None
+            handlers = [Log.console]
+            if log_file_path is not None:
+                Log.file_handler = logging.FileHandler(log_file_path, "w")
+                Log.file_handler.setFormatter(LogFormatter(Log.FORMAT))
+                handlers.append(Log.file_handler)
+            Log.listener.handlers = tuple(handlers)
+            Log.listener.start()
+
+    @staticmethod
+    def shutdown():
+        """ Write out queued records and close log file.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        with Log.lock:
+            if Log.listener is None:
+                return
+            Log.listener.stop()
+            Log.listener = None
+            if Log.file_handler is not None:
+                Log.file_handler.close()
+                Log.file_handler = None
+
+    @staticmethod
+    def level(element):
+        """ Returns cached log level of element from test config.
             - Args :
                 - element : NVMe Over Fabrics subsystem element.
             - Returns :
-                - Valid Log level on success, None otherwise.
-        """
-        logger = None
-        with open('config/nvmftests.json') as cfg_file:
-            cfg = json.load(cfg_file)
-            logger = logging.getLogger(name)
-            if cfg['log'][element] == "NOTSET":
-                logger.setLevel(logging.DEBUG)
-            elif cfg['log'][element] == "DEBUG":
-                logger.setLevel(logging.DEBUG)
-            elif cfg['log'][element] == "INFO":
-                logger.setLevel(logging.INFO)
-            elif cfg['log'][element] == "WARNING":
-                logger.setLevel(logging.WARNING)
-            elif cfg['log'][element] == "ERROR":
-                logger.setLevel(logging.ERROR)
-            elif cfg['log'][element] == "CRITICAL":
-                logger.setLevel(logging.CRITICAL)
+                - log level, None if not configured.
+        """
+        if element not in Log.levels:
+            Log.levels[element] = Config.session().log_level(element)
+        return Log.levels[element]
 
+    @staticmethod
+    def get_logger(name, element):
+        """ Returns logger feeding the shared log queue.
+            - Args :
+                - name : logger name.
+                - element : NVMe Over Fabrics subsystem element.
+            - Returns :
+                - logger object.
+        """
+        Log.setup()
+        logger = logging.getLogger(name)
+        level = Log.level(element)
+        if level is not None:
+            logger.setLevel(level)
+        with Log.lock:
+            if Log.handler not in logger.handlers:
+                logger.addHandler(Log.handler)
+                logger.propagate = False
         return logger
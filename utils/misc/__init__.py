@@ -21,3 +21,6 @@
 from .loopback import Loopback
 from .generic_blk_dev import GenBlk
 from .nvme_pci import NVMePCIeBlk
+from .parallel import Parallel
+from .latency import LatencyStats
+from .executor import KeyedExecutor
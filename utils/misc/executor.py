@@ -0,0 +1,164 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents bounded executor with per key ordering.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.const import Const
+
+
+class KeyedExecutor(object):
+
+    """
+    Represents a bounded thread pool where jobs submitted with the same key
+    run one at a time in submission order, jobs of different keys run
+    concurrently on at most nr_workers threads. A key only holds a pool
+    thread while one of its jobs runs, after each job the key goes back
+    to the end of the pool queue so keys share the workers fairly.
+        - Attributes :
+            - nr_workers : maximum number of concurrent jobs.
+            - pool : thread pool.
+            - queues : key to deque of pending (future, func, args), a key
+                       is present while it has queued or running jobs.
+            - lock : protects queues and closed.
+            - closed : set by shutdown(), the pool is shut down once the
+                       queued jobs finish.
+            - shared_executor : executor shared by host namespaces.
+    """
+    shared_executor = None
+    shared_lock = threading.Lock()
+
+    def __init__(self, nr_workers, name="io"):
+        self.nr_workers = nr_workers
+        self.pool = ThreadPoolExecutor(max_workers=nr_workers,
+                                       thread_name_prefix=name)
+        self.queues = {}
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def submit(self, key, func, *args):
+        """ Queue job behind the other jobs of key.
+            - Args :
+                - key : ordering key, e.g. namespace device.
+                - func : job function.
+                - args : job arguments.
+            - Returns :
+                - Future with the return value of func.
+        """
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("cannot submit to a shut down executor")
+            job_queue = self.queues.get(key)
+            idle = job_queue is None
+            if idle:
+                job_queue = self.queues[key] = deque()
+            job_queue.append((future, func, args))
+        if idle:
+            self.pool.submit(self.run_next, key)
+        return future
+
+    def run_next(self, key):
+        """ Run the oldest job of key and schedule the next one.
+            - Args :
+                - key : ordering key.
+            - Returns :
+                - None.
+        """
+        with self.lock:
+            future, func, args = self.queues[key][0]
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(func(*args))
+            except BaseException as err:
+                future.set_exception(err)
+        with self.lock:
+            job_queue = self.queues[key]
+            job_queue.popleft()
+            more = len(job_queue) > 0
+            if not more:
+                del self.queues[key]
+            drained = self.closed and len(self.queues) == 0
+        if more:
+            self.pool.submit(self.run_next, key)
+        elif drained:
+            self.pool.shutdown(wait=False)
+
+    def shutdown(self):
+        """ Stop accepting jobs, pool threads exit once the queued jobs
+            finish.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        with self.lock:
+            self.closed = True
+            idle = len(self.queues) == 0
+        if idle:
+            self.pool.shutdown(wait=False)
+
+    def pending(self, key=None):
+        """ Number of queued and running jobs.
+            - Args :
+                - key : ordering key, None for all keys.
+            - Returns :
+                - number of jobs.
+        """
+        with self.lock:
+            if key is not None:
+                return len(self.queues.get(key, ()))
+            return sum(len(job_queue) for job_queue in self.queues.values())
+
+    @staticmethod
+    def shared():
+        """ Return shared executor, create it on first use.
+            - Args :
+                - None.
+            - Returns :
+                - KeyedExecutor object.
+        """
+        with KeyedExecutor.shared_lock:
+            if KeyedExecutor.shared_executor is None:
+                KeyedExecutor.shared_executor = \
+                    KeyedExecutor(Const.HOST_IO_WORKERS)
+            return KeyedExecutor.shared_executor
+
+    @staticmethod
+    def set_shared(nr_workers):
+        """ Size shared executor, jobs already queued finish on the
+            executor they were submitted to.
+            - Args :
+                - nr_workers : maximum number of concurrent jobs.
+            - Returns :
+                - KeyedExecutor object.
+        """
+        with KeyedExecutor.shared_lock:
+            executor = KeyedExecutor.shared_executor
+            if executor is not None and executor.nr_workers == nr_workers:
+                return executor
+            KeyedExecutor.shared_executor = KeyedExecutor(nr_workers)
+        if executor is not None:
+            executor.shutdown()
+        return KeyedExecutor.shared_executor
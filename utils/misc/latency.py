@@ -0,0 +1,102 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents latency accounting of repeated operations.
+"""
+
+import threading
+
+
+class LatencyStats(object):
+
+    """
+    Represents latency samples of one operation, safe to record from many
+    threads, reported as nearest rank percentiles.
+        - Attributes :
+            - name : operation name.
+            - samples : latencies in seconds.
+            - lock : protects samples.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        """ Record latency of one operation.
+            - Args :
+                - seconds : operation latency.
+            - Returns :
+                - None.
+        """
+        with self.lock:
+            self.samples.append(seconds)
+
+    def reset(self):
+        """ Drop all recorded latencies.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        with self.lock:
+            self.samples = []
+
+    @staticmethod
+    def percentile(samples, pct):
+        """ Nearest rank percentile of sorted samples.
+            - Args :
+                - samples : sorted latencies.
+                - pct : percentile between 0 and 100.
+            - Returns :
+                - latency at percentile, None if there are no samples.
+        """
+        if len(samples) == 0:
+            return None
+        rank = -(-len(samples) * pct // 100)
+        return samples[max(int(rank), 1) - 1]
+
+    def summary(self):
+        """ Latency summary.
+            - Args :
+                - None.
+            - Returns :
+                - dictionary with count, p50, p99 and max in seconds.
+        """
+        with self.lock:
+            samples = sorted(self.samples)
+        return {'count': len(samples),
+                'p50': LatencyStats.percentile(samples, 50),
+                'p99': LatencyStats.percentile(samples, 99),
+                'max': samples[-1] if len(samples) else None}
+
+    def report(self):
+        """ One line latency summary in milliseconds.
+            - Args :
+                - None.
+            - Returns :
+                - summary string.
+        """
+        summary = self.summary()
+        if summary['count'] == 0:
+            return self.name + " : 0"
+        return self.name + " : " + str(summary['count']) + \
+            "".join(" " + key + " %.3f ms" % (summary[key] * 1000)
+                    for key in ['p50', 'p99', 'max'])
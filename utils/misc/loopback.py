@@ -24,6 +24,7 @@ import os
 import logging
 
 from utils.shell import Cmd
+from utils.kmod import ModuleManager
 from utils.log import Log
 
 
@@ -48,8 +49,8 @@ class Loopback(object):
         self.logger.setLevel(logging.DEBUG)
 
         Cmd.exec_cmd("losetup -D")
-        Cmd.exec_cmd("modprobe -qr loop")
-        Cmd.exec_cmd("modprobe loop max_loop=" + str(max_loop))
+        # loop module is only reloaded when max_loop changes
+        ModuleManager.load("loop", max_loop=max_loop)
 
     def init(self):
         """ Create and initialize Loopback.
@@ -59,10 +60,10 @@ class Loopback(object):
                 - True on success, False on failure.
         """
         if self.dev_size == 0 or self.block_size == 0:
-            self.logger.err("invalid device size or block size")
+            self.logger.error("invalid device size or block size")
             return False
 
-        count = self.dev_size / self.block_size
+        count = self.dev_size // self.block_size
 
         for i in range(0, self.max_loop):
             file_path = self.path + "/test" + str(i)
@@ -71,7 +72,8 @@ class Loopback(object):
             self.logger.info(cmd)
             ret = Cmd.exec_cmd(cmd)
             if ret is False:
-                self.logger.error("lookback file creation " + self.dev_list[i])
+                self.logger.error("loopback file creation " + file_path +
+                                  " failed.")
                 self.delete()
                 return False
             dev = "/dev/loop" + str(i)
@@ -100,4 +102,5 @@ class Loopback(object):
             os.remove(file_path)
             loop_cnt += 1
 
-        return Cmd.exec_cmd("modprobe -qr loop")
+        # keep loop module loaded for the next user, see __init__
+        return True
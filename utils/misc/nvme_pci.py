@@ -27,6 +27,7 @@ from natsort import natsorted
 
 sys.path.append('../../')
 from utils.shell import Cmd
+from utils.kmod import ModuleManager
 from utils.log import Log
 
 
@@ -45,10 +46,11 @@ class NVMePCIeBlk(object):
         self.dev_list = []
         self.logger = Log.get_logger(__name__, 'nvme_pci')
 
-        Cmd.exec_cmd("modprobe -r nvme")
-        Cmd.exec_cmd("modprobe nvme")
-        # allow devices to appear in /dev/
-        time.sleep(1)
+        settle = not ModuleManager.up_to_date("nvme")
+        ModuleManager.load("nvme")
+        if settle:
+            # allow devices to appear in /dev/
+            time.sleep(1)
 
     def is_pci_ctrl(self, ctrl):
         """ Validate underlaying device belongs to pci subsystem.
@@ -71,7 +73,7 @@ class NVMePCIeBlk(object):
         ctrl = "XXX "
         try:
             dev_list = os.listdir("/dev/")
-        except Exception, err:
+        except Exception as err:
             self.logger.error(str(err) + ".")
             return False
         dev_list = natsorted(dev_list, key=lambda y: y.lower())
@@ -90,7 +92,7 @@ class NVMePCIeBlk(object):
         # find namespace(s) associated with ctrl
         try:
             dir_list = os.listdir("/dev/")
-        except Exception, err:
+        except Exception as err:
             self.logger.error(str(err))
             return False
         pat = re.compile("^" + ctrl + "+n[0-9]+$")
@@ -111,4 +113,4 @@ class NVMePCIeBlk(object):
             -Returns :
                 - True on success, False on failure.
         """
-        return Cmd.exec_cmd("modprobe -qr nvme")
+        return ModuleManager.unload("nvme")
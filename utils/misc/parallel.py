@@ -0,0 +1,89 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents bounded parallel execution helper.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+
+from utils.log import Log
+
+
+class Parallel(object):
+
+    """
+    Represents running the same operation on many objects concurrently.
+    An exception raised for one object is logged and counted as failure
+    so the remaining objects are still processed.
+        - Attributes :
+    """
+
+    logger = None
+
+    @staticmethod
+    def get_logger():
+        """ Lazily create module logger.
+            - Args :
+                - None.
+            - Returns :
+                - logger handle.
+        """
+        if Parallel.logger is None:
+            Parallel.logger = Log.get_logger(__name__, 'parallel')
+        return Parallel.logger
+
+    @staticmethod
+    def call(func, item):
+        """ Call func on item, report an exception as failure.
+            - Args :
+                - func : operation, returns False on failure.
+                - item : operation argument.
+            - Returns :
+                - func result, False if func raised an exception.
+        """
+        try:
+            return func(item)
+        except Exception as err:
+            Parallel.get_logger().error("operation on " + str(item) +
+                                        " failed : " + repr(err) + ".")
+            return False
+
+    @staticmethod
+    def run(func, items, nr_workers):
+        """ Call func on every item on at most nr_workers threads.
+            - Args :
+                - func : operation, returns False on failure.
+                - items : list of operation arguments.
+                - nr_workers : maximum number of concurrent operations.
+            - Returns :
+                - True if no operation returned False or raised, False
+                  otherwise.
+        """
+        items = list(items)
+        if len(items) == 0:
+            return True
+        if nr_workers <= 1 or len(items) == 1:
+            results = [Parallel.call(func, item) for item in items]
+        else:
+            nr_workers = min(nr_workers, len(items))
+            with ThreadPoolExecutor(max_workers=nr_workers) as pool:
+                results = list(pool.map(Parallel.call, repeat(func),
+                                        items))
+        return False not in results
@@ -0,0 +1,326 @@
+# Copyright (c) 2016-2017 Western Digital Corporation or its affiliates.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+#
+#   Author: Chaitanya Kulkarni <chaitanya.kulkarni@wdc.com>
+#
+""" Represents kernel uevent listener used to wait for devices.
+"""
+
+import time
+import queue
+import select
+import socket
+import threading
+
+from utils.const import Const
+from utils.log import Log
+
+
+class UEvent(object):
+    """
+    Represents one kernel uevent.
+
+        - Attributes :
+            - action : 'add', 'remove', 'change' ...
+            - devpath : sysfs device path.
+            - env : uevent environment, SUBSYSTEM, DEVNAME ...
+    """
+    __slots__ = ['action', 'devpath', 'env']
+
+    def __init__(self, action, devpath, env):
+        self.action = action
+        self.devpath = devpath
+        self.env = env
+
+    @staticmethod
+    def parse(data):
+        """ Parse kernel netlink uevent message.
+            - Args :
+                - data : raw message, "action@devpath\\0KEY=VALUE\\0...".
+            - Returns :
+                - UEvent on success, None for non kernel messages.
+        """
+        fields = data.decode("utf-8", "replace").split("\0")
+        if "@" not in fields[0]:
+            return None
+        action, devpath = fields[0].split("@", 1)
+        env = {}
+        for field in fields[1:]:
+            if "=" in field:
+                key, value = field.split("=", 1)
+                env[key] = value
+        return UEvent(action, devpath, env)
+
+    def __str__(self):
+        return self.action + "@" + self.devpath + " " + \
+            self.env.get('DEVNAME', "")
+
+
+class NetlinkUEventSource(object):
+    """
+    Represents kernel uevent source on a raw NETLINK_KOBJECT_UEVENT
+    socket.
+
+        - Attributes :
+            - sock : netlink socket bound to kernel uevent group.
+    """
+    NETLINK_KOBJECT_UEVENT = 15
+    KERNEL_GROUP = 1
+    RCVBUF = 1024 * 1024
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK,
+                                  socket.SOCK_RAW | socket.SOCK_CLOEXEC,
+                                  NetlinkUEventSource.NETLINK_KOBJECT_UEVENT)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                 NetlinkUEventSource.RCVBUF)
+            self.sock.bind((0, NetlinkUEventSource.KERNEL_GROUP))
+        except OSError:
+            self.sock.close()
+            raise
+
+    def recv(self, timeout):
+        """ Receive next uevent.
+            - Args :
+                - timeout : seconds to wait.
+            - Returns :
+                - UEvent, None on timeout.
+        """
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        if len(readable) == 0:
+            return None
+        return UEvent.parse(self.sock.recv(64 * 1024))
+
+    def close(self):
+        """ Close netlink socket.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        self.sock.close()
+
+
+class FakeUEventSource(object):
+    """
+    Represents in process uevent source for testcases.
+
+        - Attributes :
+            - events : queue of injected uevents.
+    """
+    def __init__(self):
+        self.events = queue.Queue()
+
+    def add(self, action, devpath, **env):
+        """ Inject uevent.
+            - Args :
+                - action : uevent action.
+                - devpath : sysfs device path.
+                - env : uevent environment.
+            - Returns :
+                - None.
+        """
+        self.events.put(UEvent(action, devpath, env))
+
+    def recv(self, timeout):
+        """ Receive next injected uevent.
+            - Args :
+                - timeout : seconds to wait.
+            - Returns :
+                - UEvent, None on timeout.
+        """
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """ Nothing to release.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        pass
+
+
+class UEventMonitor(object):
+    """
+    Represents process wide uevent listener. Waiters re-check device
+    state (sysfs) whenever an uevent of interest arrives, so they wake
+    up as soon as the device shows up instead of sleeping a fixed time.
+    Without a netlink socket waiters fall back to polling.
+
+        - Attributes :
+            - source : uevent source, None to poll only.
+            - subsystems : uevent subsystems which wake up waiters.
+            - poll_interval : longest wait between state re-checks.
+            - seq : number of uevents of interest seen.
+            - cond : condition variable waiters sleep on.
+            - thread : listener thread.
+            - source_factory : builds the uevent source of the shared
+                               monitor.
+            - listeners : functions called with every uevent of interest,
+                          shared by all monitors.
+    """
+    monitor = None
+    lock = threading.Lock()
+    source_factory = NetlinkUEventSource
+    listeners = []
+
+    def __init__(self, source, subsystems=("nvme", "block"),
+                 poll_interval=Const.UEVENT_POLL_INTERVAL):
+        self.source = source
+        self.subsystems = subsystems
+        self.poll_interval = poll_interval
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.logger = Log.get_logger(__name__, 'host')
+
+    def start(self):
+        """ Start listener thread.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        if self.source is None:
+            return
+        self.thread = threading.Thread(target=self.listen,
+                                       name="UEventMonitor")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def listen(self):
+        """ Listener thread function.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        while not self.stop_event.is_set():
+            try:
+                event = self.source.recv(0.5)
+            except OSError as err:
+                # ENOBUFS on overrun, waiters re-check state anyway
+                self.logger.warning("uevent recv failed : " + str(err))
+                event = UEvent("overrun", "", {})
+            if event is None:
+                continue
+            if event.action != "overrun" and \
+               event.env.get('SUBSYSTEM') not in self.subsystems:
+                continue
+            self.logger.debug("uevent %s", event)
+            for listener in list(UEventMonitor.listeners):
+                listener(event)
+            with self.cond:
+                self.seq += 1
+                self.cond.notify_all()
+
+    def wait(self, check, timeout):
+        """ Wait until check() returns a value other than None.
+            - Args :
+                - check : function evaluating device state.
+                - timeout : seconds to wait.
+            - Returns :
+                - result of check(), None on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            # sample seq before check() so an event arriving while it runs
+            # is not missed, check() itself runs without the lock held
+            with self.cond:
+                seq = self.seq
+            result = check()
+            if result is not None:
+                return result
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with self.cond:
+                self.cond.wait_for(lambda: self.seq != seq,
+                                   min(remaining, self.poll_interval))
+
+    def stop(self):
+        """ Stop listener thread and close source.
+            - Args :
+                - None.
+            - Returns :
+                - None.
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        if self.source is not None:
+            self.source.close()
+
+    @staticmethod
+    def get():
+        """ Return shared monitor, create it on first use.
+            - Args :
+                - None.
+            - Returns :
+                - UEventMonitor object.
+        """
+        with UEventMonitor.lock:
+            if UEventMonitor.monitor is None:
+                try:
+                    source = UEventMonitor.source_factory()
+                    # uevents wake waiters, re-check only as a safety net
+                    interval = Const.UEVENT_RECHECK_INTERVAL
+                except OSError as err:
+                    Log.get_logger(__name__, 'host').warning(
+                        "uevent socket unavailable, polling : " + str(err))
+                    source = None
+                    interval = Const.UEVENT_POLL_INTERVAL
+                UEventMonitor.monitor = UEventMonitor(
+                    source, poll_interval=interval)
+                UEventMonitor.monitor.start()
+            return UEventMonitor.monitor
+
+    @staticmethod
+    def add_listener(listener):
+        """ Call listener with every uevent of interest, an "overrun"
+            event means uevents were lost.
+            - Args :
+                - listener : function taking an UEvent.
+            - Returns :
+                - None.
+        """
+        with UEventMonitor.lock:
+            if listener not in UEventMonitor.listeners:
+                UEventMonitor.listeners.append(listener)
+
+    @staticmethod
+    def set_source(source, poll_interval=Const.UEVENT_POLL_INTERVAL):
+        """ Replace shared monitor, e.g. with FakeUEventSource in tests.
+            - Args :
+                - source : uevent source, None to poll only.
+                - poll_interval : longest wait between state re-checks.
+            - Returns :
+                - new UEventMonitor object.
+        """
+        with UEventMonitor.lock:
+            if UEventMonitor.monitor is not None:
+                UEventMonitor.monitor.stop()
+            UEventMonitor.monitor = UEventMonitor(source,
+                                                  poll_interval=poll_interval)
+            UEventMonitor.monitor.start()
+            return UEventMonitor.monitor